@@ -0,0 +1 @@
+"""Performance benchmarks for the pipeline services (run with ``python -m benchmarks.<name>``)."""
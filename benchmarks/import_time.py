@@ -0,0 +1,184 @@
+"""Start-up cost of the CLI entry points.
+
+For each entry point this records the ``python -X importtime`` cumulative
+import cost of its module, the heaviest imported packages, and the wall
+time of ``--help``.  Results are written as JSON; pass ``--baseline`` to
+fail (exit 1) when an entry point got slower than the allowed tolerance.
+
+    python -m benchmarks.import_time --output import_time.json
+    python -m benchmarks.import_time --baseline import_time.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = {
+    "video-pipeline": "video_pipeline_service.cli",
+    "voice-gen": "voice_gen_service.cli",
+    "scene-plan": "text_extraction_service.cli",
+}
+
+# Imports that must stay lazy: loading any of them at start-up is a regression.
+HEAVY_MODULES = ["openai", "gradium", "fal_client", "imageio_ffmpeg", "requests"]
+
+
+def _env() -> Dict[str, str]:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(ROOT_DIR), env.get("PYTHONPATH", "")]
+    ).rstrip(os.pathsep)
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` output into ``{module, self_us, cumulative_us}`` rows."""
+    rows: List[Dict[str, Any]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append(
+            {
+                # Leading spaces (after the separator) encode nesting depth.
+                "module": name[1:].rstrip(),
+                "self_us": int(self_us.strip()),
+                "cumulative_us": int(cumulative_us.strip()),
+            }
+        )
+    return rows
+
+
+def measure_imports(module: str) -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        cwd=ROOT_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed: {result.stderr.strip()[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    top_level = [row for row in rows if not row["module"].startswith(" ")]
+    module_row = next((row for row in rows if row["module"] == module), None)
+    loaded = {row["module"].strip() for row in rows}
+    return {
+        "module_cumulative_ms": (module_row["cumulative_us"] / 1000.0) if module_row else None,
+        "total_ms": sum(row["cumulative_us"] for row in top_level) / 1000.0,
+        "heaviest": [
+            {"module": row["module"], "cumulative_ms": row["cumulative_us"] / 1000.0}
+            for row in sorted(top_level, key=lambda r: r["cumulative_us"], reverse=True)[:10]
+        ],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def measure_help(module: str, repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", module, "--help"],
+            capture_output=True,
+            env=_env(),
+            cwd=ROOT_DIR,
+            check=True,
+        )
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def run_benchmark(repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, module in ENTRY_POINTS.items():
+        entry = measure_imports(module)
+        entry["help"] = measure_help(module, repeat)
+        results[name] = entry
+    return {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entry_points": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return human-readable regressions of *current* against *baseline*."""
+    failures: List[str] = []
+    for name, entry in current["entry_points"].items():
+        if entry["heavy_modules_loaded"]:
+            failures.append(
+                f"{name}: eagerly imports {', '.join(entry['heavy_modules_loaded'])}"
+            )
+        base = baseline.get("entry_points", {}).get(name)
+        if not base:
+            continue
+        for label, now, before in (
+            ("import", entry["total_ms"], base["total_ms"]),
+            ("--help", entry["help"]["median_ms"], base["help"]["median_ms"]),
+        ):
+            if before and now > before * (1.0 + tolerance):
+                failures.append(
+                    f"{name}: {label} {now:.1f}ms vs baseline {before:.1f}ms "
+                    f"(+{(now / before - 1.0) * 100:.0f}%)"
+                )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure start-up import cost of the CLI entry points."
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown vs baseline as a fraction (default: 0.25).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of --help invocations per entry point (default: 5).",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat)
+    for name, entry in results["entry_points"].items():
+        print(
+            f"{name:15s} import {entry['total_ms']:8.1f}ms  "
+            f"--help {entry['help']['median_ms']:8.1f}ms  "
+            f"heavy: {', '.join(entry['heavy_modules_loaded']) or '-'}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION: {failure}", file=sys.stderr)
+        if failures:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""Load test for the ``/generate`` API.
+
+Starts the FastAPI app (uvicorn subprocess) against a mock OpenAI HTTP
+server (``OPENAI_BASE_URL``) and the Gradium/fal stub providers, then
+submits ``--requests`` runs with ``--concurrency`` clients, each uploading
+a realistic text, photo and voice sample.  Reports throughput, queue wait,
+end-to-end p50/p95/p99 and per-stage percentiles from the run index.
+
+    python -m benchmarks.load_test --requests 20 --concurrency 5 --output load.json
+    python -m benchmarks.load_test --baseline load.json --tolerance 0.2
+
+``--url`` targets an already running API instead (provider setup is then
+up to that deployment).  With ``--baseline`` the run fails (exit 1) when
+throughput drops or a latency percentile grows beyond the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+SAMPLE_TEXT = (
+    "Mara grew up in a fishing village where the tide decided everything. "
+    "Every morning she watched the boats leave before sunrise and counted them "
+    "again at dusk. One winter a storm kept the fleet ashore for eleven days, "
+    "and the village began to run out of salt, oil and patience. Mara repaired "
+    "her grandfather's old radio and heard a trawler calling for help beyond "
+    "the reef. She rowed out with her brother through the last of the swell. "
+    "They guided the crew around the rocks by lantern light. When the storm "
+    "finally broke, the whole village met them on the pier. Years later the "
+    "harbour still keeps a lantern burning on the reef, and children still ask "
+    "Mara how she found the way in the dark."
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: List[float], pct: float) -> float | None:
+    """Nearest-rank percentile of *samples* (None when empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summary(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(samples),
+        **{f"p{pct}": percentile(samples, pct) for pct in PERCENTILES},
+    }
+
+
+def _parse_range(raw: str) -> tuple[float, float]:
+    low, sep, high = raw.partition("-")
+    return (float(low), float(high)) if sep else (float(low), float(low))
+
+
+# ---------------------------------------------------------------------------
+# Mock OpenAI Responses API
+# ---------------------------------------------------------------------------
+
+class MockOpenAIServer:
+    """Local HTTP server answering ``POST /v1/responses`` like the stub LLM."""
+
+    def __init__(self, latency: tuple[float, float]) -> None:
+        from stub_providers.llm import answer
+
+        low, high = latency
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802 (http.server API)
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(random.uniform(low, high))
+                user_prompt = next(
+                    (
+                        item.get("content", "")
+                        for item in body.get("input", [])
+                        if item.get("role") == "user"
+                    ),
+                    "",
+                )
+                schema_name = body.get("text", {}).get("format", {}).get("name", "")
+                text = json.dumps(answer(schema_name, user_prompt))
+                payload = json.dumps(
+                    {
+                        "id": f"resp_{uuid.uuid4().hex}",
+                        "object": "response",
+                        "created_at": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "status": "completed",
+                        "output": [
+                            {
+                                "type": "message",
+                                "id": f"msg_{uuid.uuid4().hex}",
+                                "status": "completed",
+                                "role": "assistant",
+                                "content": [
+                                    {"type": "output_text", "text": text, "annotations": []}
+                                ],
+                            }
+                        ],
+                        "parallel_tool_calls": False,
+                        "tool_choice": "none",
+                        "tools": [],
+                    }
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *_: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "MockOpenAIServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# API under test
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(workdir: Path, openai_url: str, args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    import requests
+
+    port = _free_port()
+    env = os.environ.copy()
+    env.update(
+        {
+            "PYTHONPATH": os.pathsep.join([str(ROOT_DIR), env.get("PYTHONPATH", "")]).rstrip(os.pathsep),
+            "OPENAI_BASE_URL": openai_url,
+            "OPENAI_API_KEY": "mock",
+            "PIPELINE_PROVIDERS": "gradium=stub,fal=stub",
+            "PIPELINE_STUB_LATENCY": args.stub_latency,
+            "PIPELINE_OUTPUT_ROOT": str(workdir / "output"),
+            "PIPELINE_RUN_INDEX": str(workdir / "runs.sqlite3"),
+            "PIPELINE_SLOT_DIR": str(workdir / "slots"),
+            "PIPELINE_METRICS_DIR": str(workdir / "metrics"),
+            "PIPELINE_STUB_DIR": str(workdir / "stubs"),
+            "PIPELINE_RETENTION_INTERVAL": "0",
+            # Every submission carries the same inputs; run each one.
+            "PIPELINE_DEDUPE_SECONDS": "0",
+            "PIPELINE_WORKERS": str(args.workers),
+        }
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "video_pipeline_service.api:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited during start-up (code {process.returncode})")
+        try:
+            if requests.get(f"{base_url}/styles", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API did not become ready within 60s")
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def make_payloads(workdir: Path) -> tuple[bytes, bytes]:
+    """Return (photo PNG, voice WAV) bytes for the uploads."""
+    from stub_providers.fal import write_png
+    from stub_providers.tts import sine_wav
+
+    photo_path = workdir / "photo.png"
+    write_png(str(photo_path), "load-test-photo", (640, 640))
+    return photo_path.read_bytes(), sine_wav(8.0)
+
+
+def submit(base_url: str, index: int, photo: bytes, voice: bytes, scenes: int) -> Dict[str, Any]:
+    import requests
+
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/generate",
+        data={"text": SAMPLE_TEXT, "number_of_scenes": str(scenes)},
+        files={
+            "photo": (f"photo_{index}.png", photo, "image/png"),
+            "voice": (f"voice_{index}.wav", voice, "audio/wav"),
+        },
+        timeout=3600,
+    )
+    elapsed = time.perf_counter() - start
+    result: Dict[str, Any] = {"status_code": response.status_code, "seconds": elapsed}
+    if response.ok:
+        result["run_id"] = response.json()["run_id"]
+    else:
+        result["error"] = response.text[-500:]
+    return result
+
+
+def stage_breakdown(base_url: str, run_ids: List[str]) -> tuple[List[float], Dict[str, List[float]]]:
+    """Queue waits and per-stage durations from ``GET /runs/{run_id}``."""
+    import requests
+
+    queue_waits: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    for run_id in run_ids:
+        response = requests.get(f"{base_url}/runs/{run_id}", timeout=30)
+        if not response.ok:
+            continue
+        run = response.json()
+        started = [stage["started_at"] for stage in run["stages"]]
+        if started:
+            queue_waits.append(min(started) - run["created_at"])
+        for stage in run["stages"]:
+            if stage["seconds"] is not None:
+                stages.setdefault(stage["stage"], []).append(stage["seconds"])
+    return queue_waits, stages
+
+
+def run_load(base_url: str, workdir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    photo, voice = make_payloads(workdir)
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(submit, base_url, index, photo, voice, args.scenes)
+            for index in range(args.requests)
+        ]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    succeeded = [r for r in results if "run_id" in r]
+    queue_waits, stages = stage_breakdown(base_url, [r["run_id"] for r in succeeded])
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scenes": args.scenes,
+            "workers": args.workers,
+            "openai_latency": args.openai_latency,
+            "stub_latency": args.stub_latency,
+        },
+        "wall_seconds": wall,
+        "throughput_per_min": len(succeeded) / wall * 60.0 if wall else 0.0,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "errors": sorted({r.get("error", "")[:200] for r in results if "error" in r}),
+        "end_to_end": _summary([r["seconds"] for r in succeeded]),
+        "queue_wait": _summary(queue_waits),
+        "stages": {name: _summary(samples) for name, samples in sorted(stages.items())},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return human-readable regressions of *current* against *baseline*."""
+    failures: List[str] = []
+    before = baseline.get("throughput_per_min")
+    now = current["throughput_per_min"]
+    if before and now < before * (1.0 - tolerance):
+        failures.append(f"throughput {now:.2f}/min vs baseline {before:.2f}/min")
+    for section in ("end_to_end", "queue_wait"):
+        for pct in PERCENTILES:
+            key = f"p{pct}"
+            now_value = current[section].get(key)
+            before_value = baseline.get(section, {}).get(key)
+            # Sub-second queue waits are noise; only compare meaningful values.
+            if now_value is None or not before_value or before_value < 0.5:
+                continue
+            if now_value > before_value * (1.0 + tolerance):
+                failures.append(
+                    f"{section} {key} {now_value:.2f}s vs baseline {before_value:.2f}s "
+                    f"(+{(now_value / before_value - 1.0) * 100:.0f}%)"
+                )
+    return failures
+
+
+def _fmt(summary: Dict[str, Any]) -> str:
+    return "  ".join(
+        f"p{pct} {summary[f'p{pct}']:7.2f}s" if summary.get(f"p{pct}") is not None else f"p{pct}       -"
+        for pct in PERCENTILES
+    )
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(
+        f"{results['succeeded']} ok / {results['failed']} failed in "
+        f"{results['wall_seconds']:.1f}s  ->  {results['throughput_per_min']:.2f} runs/min"
+    )
+    print(f"{'end-to-end':12s} {_fmt(results['end_to_end'])}")
+    print(f"{'queue wait':12s} {_fmt(results['queue_wait'])}")
+    for name, summary in results["stages"].items():
+        print(f"  {name:10s} {_fmt(summary)}")
+    for error in results["errors"]:
+        print(f"error: {error}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Drive concurrent /generate submissions and report latency percentiles."
+    )
+    parser.add_argument("--requests", type=int, default=20, help="Total runs (default: 20).")
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent clients (default: 5).")
+    parser.add_argument("--scenes", type=int, default=4, help="Scenes per run (default: 4).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="PIPELINE_WORKERS for the API under test (default: 0, process per run).",
+    )
+    parser.add_argument(
+        "--openai-latency",
+        default="0.3-1.0",
+        help="Mock OpenAI latency in seconds, fixed or min-max (default: 0.3-1.0).",
+    )
+    parser.add_argument(
+        "--stub-latency",
+        default="0.5-2.0",
+        help="Gradium/fal stub latency in seconds, fixed or min-max (default: 0.5-2.0).",
+    )
+    parser.add_argument("--url", help="Target an already running API instead of starting one.")
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed regression vs baseline as a fraction (default: 0.25).",
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.0,
+        help="Fail when more than this fraction of runs fail (default: 0).",
+    )
+    args = parser.parse_args()
+    if args.requests < 1 or args.concurrency < 1:
+        raise SystemExit("--requests and --concurrency must be >= 1.")
+
+    with tempfile.TemporaryDirectory(prefix="pipeline-load-") as tmp:
+        workdir = Path(tmp)
+        if args.url:
+            results = run_load(args.url.rstrip("/"), workdir, args)
+        else:
+            with MockOpenAIServer(_parse_range(args.openai_latency)) as openai_server:
+                process, base_url = start_api(workdir, openai_server.base_url, args)
+                try:
+                    results = run_load(base_url, workdir, args)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    failures: List[str] = []
+    error_rate = results["failed"] / args.requests
+    if error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.0%} exceeds {args.max_error_rate:.0%}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        failures.extend(compare(results, baseline, args.tolerance))
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
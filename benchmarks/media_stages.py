@@ -0,0 +1,348 @@
+"""Micro-benchmarks for the local media stages.
+
+Times the hot paths of assembly on synthetic inputs generated locally
+(ffmpeg ``testsrc`` clips and sine-tone WAVs), for each clip count and clip
+duration and for each installed assembly engine:
+
+- ``retime``: ``storyboard_pipeline._adjust_clip_speed`` over every clip
+- ``mux``: ``video_pipeline_service.cli.mux_video_audio`` over every clip
+- ``concat``: ``video_pipeline_service.cli.concat_videos`` of all clips
+- ``concat_storyboard``: ``storyboard_pipeline._concatenate_videos`` of all clips
+- ``wav_probe``: ``voice_gen_service.cli.wav_duration`` over every WAV
+- ``manifest_json``: writing and reading a scene plan and voice manifest
+
+Results are written as JSON; pass ``--baseline`` to fail (exit 1) when a
+case got slower than the allowed tolerance.
+
+    python -m benchmarks.media_stages --output media_stages.json
+    python -m benchmarks.media_stages --counts 6,50 --baseline media_stages.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("PIPELINE_METRICS", "off")
+
+from fal_integration_service.storyboard_pipeline import (  # noqa: E402
+    _adjust_clip_speed,
+    _concatenate_videos,
+)
+from media_service.assembly import get_engine, run_ffmpeg, set_default_engine  # noqa: E402
+from stub_providers.tts import sine_wav  # noqa: E402
+from video_pipeline_service.cli import concat_videos, mux_video_audio, write_json  # noqa: E402
+from voice_gen_service.cli import wav_duration  # noqa: E402
+
+DEFAULT_COUNTS = "6,50,500"
+DEFAULT_DURATIONS = "2,5"
+CLIP_SIZE = "320x180"
+CLIP_FPS = 24
+
+# Cases that touch every clip once; concat and JSON are timed as one call.
+PER_CLIP_CASES = ("retime", "mux", "wav_probe")
+
+
+def _engines(requested: str) -> List[str]:
+    if requested != "all":
+        return [name.strip() for name in requested.split(",") if name.strip()]
+    engines = ["ffmpeg"]
+    try:
+        get_engine("pyav")
+    except Exception:
+        return engines
+    return engines + ["pyav"]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+def make_clip(path: str, seconds: float) -> None:
+    run_ffmpeg(
+        [
+            "-f", "lavfi",
+            "-i", f"testsrc=duration={seconds:g}:size={CLIP_SIZE}:rate={CLIP_FPS}",
+            "-c:v", "libx264",
+            "-pix_fmt", "yuv420p",
+            path,
+        ],
+        "benchmark clip",
+    )
+
+
+@dataclass
+class Inputs:
+    dir: str
+    clips: List[str]
+    wavs: List[str]
+
+
+def make_inputs(work_dir: str, count: int, seconds: float) -> Inputs:
+    """Return ``count`` clip and WAV paths of *seconds* each (copies of one source)."""
+    source_dir = os.path.join(work_dir, "sources")
+    os.makedirs(source_dir, exist_ok=True)
+    clip_source = os.path.join(source_dir, f"clip_{seconds:g}s.mp4")
+    wav_source = os.path.join(source_dir, f"audio_{seconds:g}s.wav")
+    if not os.path.exists(clip_source):
+        make_clip(clip_source, seconds)
+    if not os.path.exists(wav_source):
+        with open(wav_source, "wb") as handle:
+            handle.write(sine_wav(seconds))
+
+    case_dir = os.path.join(work_dir, f"n{count}_{seconds:g}s")
+    os.makedirs(case_dir, exist_ok=True)
+    clips: List[str] = []
+    wavs: List[str] = []
+    for index in range(count):
+        clip = os.path.join(case_dir, f"clip_{index:04d}.mp4")
+        wav = os.path.join(case_dir, f"audio_{index:04d}.wav")
+        if not os.path.exists(clip):
+            shutil.copyfile(clip_source, clip)
+        if not os.path.exists(wav):
+            shutil.copyfile(wav_source, wav)
+        clips.append(clip)
+        wavs.append(wav)
+    return Inputs(dir=case_dir, clips=clips, wavs=wavs)
+
+
+def make_plan(count: int, seconds: float) -> Dict[str, Dict[str, Any]]:
+    scenes = [
+        {
+            "scene_id": index + 1,
+            "title": f"Scene {index + 1}",
+            "summary": "A fox crosses a river at dawn. " * 4,
+            "narration": "The fox swims across the cold river and reaches the meadow. " * 3,
+            "prompt": "Sketched style, pencil lines, a fox swimming across a river.",
+        }
+        for index in range(count)
+    ]
+    items = [
+        {
+            "scene_id": index + 1,
+            "title": f"Scene {index + 1}",
+            "text": scene["narration"],
+            "audio_path": f"audio/scene_{index + 1:03d}.wav",
+            "request_id": f"req-{index:06d}",
+            "sample_rate": 24000,
+            "duration_sec": seconds,
+        }
+        for index, scene in enumerate(scenes)
+    ]
+    return {
+        "scene_plan": {"title": "Benchmark", "scenes": scenes},
+        "voice_manifest": {"voice_id": "bench", "items": items},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def _time(fn: Callable[[], None], repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples)}
+
+
+def bench_media(
+    engine: str,
+    inputs: Inputs,
+    seconds: float,
+    repeat: int,
+) -> Dict[str, Dict[str, float]]:
+    set_default_engine(engine)
+    clips = inputs.clips
+    wavs = inputs.wavs
+    out_dir = os.path.join(inputs.dir, f"out_{engine}")
+    os.makedirs(out_dir, exist_ok=True)
+    retimed = [os.path.join(out_dir, f"retimed_{i:04d}.mp4") for i in range(len(clips))]
+    muxed = [os.path.join(out_dir, f"muxed_{i:04d}.mp4") for i in range(len(clips))]
+
+    def retime() -> None:
+        for clip, out in zip(clips, retimed):
+            _adjust_clip_speed(clip, out, seconds * 1.1)
+
+    def mux() -> None:
+        for clip, wav, out in zip(clips, wavs, muxed):
+            mux_video_audio(clip, wav, out)
+
+    return {
+        "retime": _time(retime, repeat),
+        "mux": _time(mux, repeat),
+        "concat": _time(
+            lambda: concat_videos(muxed, os.path.join(out_dir, "final.mp4")), repeat,
+        ),
+        "concat_storyboard": _time(
+            lambda: _concatenate_videos(retimed, os.path.join(out_dir, "combined.mp4")),
+            repeat,
+        ),
+    }
+
+
+def bench_local(
+    inputs: Inputs,
+    count: int,
+    seconds: float,
+    repeat: int,
+) -> Dict[str, Dict[str, float]]:
+    payloads = make_plan(count, seconds)
+    json_dir = os.path.join(inputs.dir, "json")
+    os.makedirs(json_dir, exist_ok=True)
+
+    def probe() -> None:
+        for wav in inputs.wavs:
+            wav_duration(wav)
+
+    def manifests() -> None:
+        for name, payload in payloads.items():
+            path = os.path.join(json_dir, f"{name}.json")
+            write_json(path, payload)
+            with open(path, "r", encoding="utf-8") as handle:
+                json.load(handle)
+
+    return {
+        "wav_probe": _time(probe, repeat),
+        "manifest_json": _time(manifests, repeat),
+    }
+
+
+def _per_clip(results: Dict[str, Dict[str, float]], count: int) -> None:
+    for name in PER_CLIP_CASES:
+        if name in results:
+            results[name]["per_clip_ms"] = results[name]["median_s"] / count * 1000.0
+
+
+def run_benchmark(
+    counts: List[int],
+    durations: List[float],
+    engines: List[str],
+    repeat: int,
+    work_dir: str,
+) -> Dict[str, Any]:
+    cases: Dict[str, Any] = {}
+    for seconds in durations:
+        for count in counts:
+            inputs = make_inputs(work_dir, count, seconds)
+            local = bench_local(inputs, count, seconds, repeat)
+            _per_clip(local, count)
+            cases[f"local/n{count}/{seconds:g}s"] = local
+            for engine in engines:
+                media = bench_media(engine, inputs, seconds, repeat)
+                _per_clip(media, count)
+                cases[f"{engine}/n{count}/{seconds:g}s"] = media
+                print(_format_row(f"{engine}/n{count}/{seconds:g}s", {**media, **local}))
+    return {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "engines": engines,
+        "cases": cases,
+    }
+
+
+def _format_row(label: str, results: Dict[str, Dict[str, float]]) -> str:
+    cells = "  ".join(
+        f"{name} {entry['median_s'] * 1000.0:9.1f}ms" for name, entry in results.items()
+    )
+    return f"{label:22s} {cells}"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return human-readable regressions of *current* against *baseline*."""
+    failures: List[str] = []
+    for case, results in current["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if not base:
+            continue
+        for name, entry in results.items():
+            before = base.get(name, {}).get("median_s")
+            now = entry["median_s"]
+            if before and now > before * (1.0 + tolerance):
+                failures.append(
+                    f"{case} {name}: {now * 1000.0:.1f}ms vs baseline "
+                    f"{before * 1000.0:.1f}ms (+{(now / before - 1.0) * 100:.0f}%)"
+                )
+    return failures
+
+
+def _parse_list(raw: str, cast: Callable[[str], Any]) -> List[Any]:
+    return [cast(item) for item in raw.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the local media stages on synthetic clips."
+    )
+    parser.add_argument(
+        "--counts",
+        default=DEFAULT_COUNTS,
+        help=f"Comma-separated clip counts (default: {DEFAULT_COUNTS}).",
+    )
+    parser.add_argument(
+        "--durations",
+        default=DEFAULT_DURATIONS,
+        help=f"Comma-separated clip durations in seconds (default: {DEFAULT_DURATIONS}).",
+    )
+    parser.add_argument(
+        "--engines",
+        default="all",
+        help="Comma-separated assembly engines, or 'all' installed ones (default: all).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed repetitions per case; the median is reported (default: 3).",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Keep synthetic inputs here and reuse them across invocations "
+        "(default: a temporary directory).",
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown vs baseline as a fraction (default: 0.25).",
+    )
+    args = parser.parse_args()
+
+    counts = _parse_list(args.counts, int)
+    durations = _parse_list(args.durations, float)
+    engines = _engines(args.engines)
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmark(counts, durations, engines, args.repeat, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="media-bench-") as work_dir:
+            results = run_benchmark(counts, durations, engines, args.repeat, work_dir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION: {failure}", file=sys.stderr)
+        if failures:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Deadline planning for the image and video stage.
+
+The planner picks the fastest-needed point on a quality ladder so that all
+scenes' images and clips are done, and the remaining local assembly fits,
+before an absolute deadline:
+
+- ``full``: Flux Dev images, clip durations matched to the narration
+- ``fast-images``: Flux Schnell images
+- ``short-clips``: Flux Schnell images and the shortest clip duration, which
+  is then stretched to the narration length
+
+Estimates come from the latency of earlier calls per model (the run index's
+``calls`` table, see :meth:`RunIndex.call_seconds`), falling back to
+built-in defaults.  During the run every finished call refines the
+estimate; when the projected finish slips past the deadline, scenes that
+have not started yet move down the ladder.  Models are never upgraded
+again within a run.
+
+Without a deadline the planner only records call latencies, which build
+the history later deadline runs plan with.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .fal_image import DEFAULT_IMAGE_MODEL, PULID_IMAGE_MODEL
+
+FAST_IMAGE_MODEL = "fal-ai/flux/schnell"
+
+# Shortest clip each video family is asked for in the ``short-clips`` level.
+SHORT_KLING_DURATION = "5"
+SHORT_REFERENCE_DURATION = 4
+
+
+@dataclass(frozen=True)
+class Level:
+    name: str
+    image_model: str
+    short_clips: bool
+
+
+LEVELS = (
+    Level("full", DEFAULT_IMAGE_MODEL, False),
+    Level("fast-images", FAST_IMAGE_MODEL, False),
+    Level("short-clips", FAST_IMAGE_MODEL, True),
+)
+
+# Used until the run index has history for a model.
+DEFAULT_IMAGE_SECONDS = {
+    DEFAULT_IMAGE_MODEL: 12.0,
+    FAST_IMAGE_MODEL: 4.0,
+    PULID_IMAGE_MODEL: 20.0,
+}
+DEFAULT_IMAGE_FALLBACK_SECONDS = 15.0
+# fal video models take roughly this long per second of generated clip.
+DEFAULT_VIDEO_SECONDS_PER_CLIP_SECOND = 20.0
+
+
+def video_key(model: str, duration: int | str) -> str:
+    return f"{model}@{duration}"
+
+
+class DeadlinePlanner:
+    """Choose models, clip durations and concurrency to meet *deadline_at*.
+
+    *deadline_at* is an absolute ``time.time()`` value, or None to only
+    record latencies.  *history* maps ``kind:model`` to seconds, and
+    *reserve_seconds* is the time kept back for the work after this stage
+    (muxing and concatenation).
+    """
+
+    def __init__(
+        self,
+        deadline_at: float | None = None,
+        *,
+        history: dict[str, float] | None = None,
+        reserve_seconds: float = 0.0,
+        max_concurrency: int | None = None,
+    ) -> None:
+        self.deadline_at = deadline_at
+        self.history = dict(history or {})
+        self.reserve_seconds = reserve_seconds
+        self.max_concurrency = max_concurrency
+        self.level = 0
+        self.concurrency: int | None = None
+        self.switches: list[dict[str, Any]] = []
+        self.calls: list[tuple[str, str, float]] = []
+        self._observed: dict[str, list[float]] = {}
+        self._pending = {"image": 0, "video": 0}
+        self._face_mode = False
+        self._video_model = ""
+        self._durations: list[int | str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Level:
+        return LEVELS[self.level]
+
+    # -- estimates ------------------------------------------------------------
+
+    def _seconds(self, kind: str, model: str) -> float:
+        observed = self._observed.get(f"{kind}:{model}")
+        if observed:
+            return sum(observed) / len(observed)
+        known = self.history.get(f"{kind}:{model}")
+        if known is not None:
+            return known
+        if kind == "image":
+            return DEFAULT_IMAGE_SECONDS.get(model, DEFAULT_IMAGE_FALLBACK_SECONDS)
+        clip_seconds = float(model.rpartition("@")[2] or 5)
+        return clip_seconds * DEFAULT_VIDEO_SECONDS_PER_CLIP_SECOND
+
+    def _image_seconds(self, level: Level) -> float:
+        model = PULID_IMAGE_MODEL if self._face_mode else level.image_model
+        return self._seconds("image", model)
+
+    def _video_seconds(self, level: Level) -> float:
+        """Slowest clip of the run at *level* (clips run in parallel waves)."""
+        durations = self._durations or [SHORT_KLING_DURATION]
+        return max(
+            self._seconds(
+                "video", video_key(self._video_model, self._clip(level, duration)),
+            )
+            for duration in durations
+        )
+
+    def _clip(self, level: Level, duration: int | str) -> int | str:
+        if not level.short_clips:
+            return duration
+        if isinstance(duration, str):
+            return SHORT_KLING_DURATION
+        return min(duration, SHORT_REFERENCE_DURATION)
+
+    def _estimate(self, level: Level, images: int, videos: int, concurrency: int) -> float:
+        return (
+            math.ceil(images / concurrency) * self._image_seconds(level)
+            + math.ceil(videos / concurrency) * self._video_seconds(level)
+            + self.reserve_seconds
+        )
+
+    # -- planning -------------------------------------------------------------
+
+    def plan(
+        self,
+        *,
+        num_scenes: int,
+        face_mode: bool,
+        video_model: str,
+        durations: list[int | str],
+        concurrency: int,
+    ) -> int:
+        """Pick the starting level and return the FAL concurrency to use."""
+        self._face_mode = face_mode
+        self._video_model = video_model
+        self._durations = list(durations)
+        self._pending = {"image": num_scenes, "video": num_scenes}
+        self.concurrency = concurrency
+        if self.deadline_at is None or num_scenes == 0:
+            return concurrency
+
+        budget = self.deadline_at - time.time()
+        ceiling = max(concurrency, min(num_scenes, self.max_concurrency or concurrency))
+        for index, level in enumerate(LEVELS):
+            for candidate in range(concurrency, ceiling + 1):
+                estimate = self._estimate(level, num_scenes, num_scenes, candidate)
+                if estimate <= budget:
+                    self.level, self.concurrency = index, candidate
+                    logging.info(
+                        "Deadline: %.0fs left, planning '%s' at concurrency %d "
+                        "(estimated %.0fs)",
+                        budget, level.name, candidate, estimate,
+                    )
+                    return candidate
+        self.level, self.concurrency = len(LEVELS) - 1, ceiling
+        logging.warning(
+            "Deadline: %.0fs left but even '%s' at concurrency %d needs ~%.0fs",
+            budget,
+            self.current.name,
+            ceiling,
+            self._estimate(self.current, num_scenes, num_scenes, ceiling),
+        )
+        return ceiling
+
+    def image_model(self) -> str:
+        return self.current.image_model
+
+    def clip_duration(self, duration: int | str) -> int | str:
+        return self._clip(self.current, duration)
+
+    def call_timeout(self, fallback_seconds: float) -> float | None:
+        """Seconds one call may still take, leaving time for a local fallback."""
+        if self.deadline_at is None:
+            return None
+        remaining = self.deadline_at - time.time() - self.reserve_seconds
+        return max(0.0, remaining - fallback_seconds)
+
+    def observe(self, kind: str, model: str, seconds: float | None) -> None:
+        """Record a finished call and step down the ladder if behind schedule.
+
+        *seconds* is None for a call that failed without a usable latency.
+        """
+        with self._lock:
+            if seconds is not None:
+                self.calls.append((kind, model, seconds))
+                self._observed.setdefault(f"{kind}:{model}", []).append(seconds)
+            self._pending[kind] = max(0, self._pending[kind] - 1)
+            if self.deadline_at is None:
+                return
+            while self.level < len(LEVELS) - 1:
+                projected = time.time() + self._estimate(
+                    self.current,
+                    self._pending["image"],
+                    self._pending["video"],
+                    self.concurrency or 1,
+                )
+                if projected <= self.deadline_at:
+                    return
+                self.level += 1
+                self.switches.append(
+                    {
+                        "at": time.time(),
+                        "level": self.current.name,
+                        "behind_s": round(projected - self.deadline_at, 1),
+                    }
+                )
+                logging.warning(
+                    "Deadline: projected %.0fs late, switching remaining scenes to '%s'",
+                    projected - self.deadline_at,
+                    self.current.name,
+                )
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "deadline_at": self.deadline_at,
+            "level": self.current.name,
+            "concurrency": self.concurrency,
+            "switches": self.switches,
+        }
@@ -1,14 +1,18 @@
 """Thin wrapper around the fal-client SDK for face swapping."""
 
+import hashlib
 import os
-import fal_client
+
+from pipeline_runtime import providers, recording, tracing
+
+from .fal_queue import subscribe
 
 
 DEFAULT_FACE_SWAP_MODEL = "fal-ai/face-swap"
 
 
 def _ensure_api_key() -> None:
-    if not os.environ.get("FAL_KEY"):
+    if providers.missing_api_keys(("fal",)):
         raise RuntimeError(
             "FAL_KEY environment variable is not set. "
             "Copy .env.example to .env and add your key."
@@ -18,7 +22,16 @@ def _ensure_api_key() -> None:
 def upload_local_image(path: str) -> str:
     """Upload a local image file to fal storage and return its URL."""
     _ensure_api_key()
-    url = fal_client.upload_file(path)
+    fal_client = providers.fal_sdk()
+    with open(path, "rb") as handle:
+        digest = hashlib.sha256(handle.read()).hexdigest()
+    with tracing.span("fal.upload", "fal", resource="fal.upload"):
+        url = recording.call(
+            "fal",
+            "upload_file",
+            {"name": os.path.basename(path), "sha256": digest},
+            lambda: fal_client.upload_file(path),
+        )
     return url
 
 
@@ -38,14 +51,12 @@ def face_swap(
     Returns the URL of the face-swapped image.
     """
     _ensure_api_key()
-
-    result = fal_client.subscribe(
+    result = subscribe(
         model,
         arguments={
             "base_image_url": base_image_url,
             "swap_image_url": swap_image_url,
         },
-        with_logs=True,
     )
 
     # Response format: {"image": {"url": "..."}} or {"image": "url"}
@@ -2,10 +2,10 @@
 
 from __future__ import annotations
 
-import os
-import fal_client
+from pipeline_runtime import providers
 
 from .art_styles import ArtStyle, get_style
+from .fal_queue import subscribe
 
 # Default image model — Flux Dev produces high-quality stylized images.
 # Alternatives:
@@ -20,7 +20,7 @@ PULID_IMAGE_MODEL = "fal-ai/flux-pulid"
 
 
 def _ensure_api_key() -> None:
-    if not os.environ.get("FAL_KEY"):
+    if providers.missing_api_keys(("fal",)):
         raise RuntimeError(
             "FAL_KEY environment variable is not set. "
             "Copy .env.example to .env and add your key."
@@ -102,10 +102,9 @@ def generate_image(
             "image_size": image_size,
         }
 
-    result = fal_client.subscribe(
+    result = subscribe(
         active_model,
         arguments=arguments,
-        with_logs=True,
     )
 
     return _extract_image_url(result)
@@ -0,0 +1,60 @@
+"""Queue-aware wrapper around ``fal_client.subscribe``.
+
+fal runs every request through a queue; the time a request spends queued
+and the time it spends running on fal's GPUs are recorded as separate
+``fal.queue`` / ``fal.run`` trace spans (see :mod:`pipeline_runtime.tracing`)
+so slow runs can be attributed to queueing versus model time.  Calls go
+through :mod:`pipeline_runtime.recording`, so they can be captured and
+replayed.  Queued requests are registered with
+:mod:`pipeline_runtime.cancellation`, so cancelling the run cancels them
+on fal too.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from pipeline_runtime import cancellation, providers, recording, tracing
+
+
+def subscribe(application: str, arguments: dict[str, Any]) -> dict:
+    """Submit *arguments* to *application*, wait for and return the result."""
+    cancellation.check()
+    fal_client = providers.fal_sdk()
+    first = "fal.replay" if recording.is_replaying() else "fal.submit"
+    phase = {"name": first, "start": tracing.mark()}
+
+    def _enter(name: str) -> None:
+        tracing.record(
+            phase["name"], "fal", phase["start"],
+            resource=phase["name"], model=application,
+        )
+        phase["name"] = name
+        phase["start"] = tracing.mark()
+
+    def _on_enqueue(request_id: str) -> None:
+        _enter("fal.queue")
+        track(request_id)
+
+    def _on_queue_update(status: Any) -> None:
+        if isinstance(status, fal_client.InProgress) and phase["name"] == "fal.queue":
+            _enter("fal.run")
+        elif isinstance(status, fal_client.Completed) and phase["name"] != "fal.result":
+            _enter("fal.result")
+
+    try:
+        with cancellation.fal_request(application) as track:
+            return recording.call(
+                "fal",
+                application,
+                arguments,
+                lambda: fal_client.subscribe(
+                    application,
+                    arguments=arguments,
+                    with_logs=True,
+                    on_enqueue=_on_enqueue,
+                    on_queue_update=_on_queue_update,
+                ),
+            )
+    finally:
+        _enter("done")
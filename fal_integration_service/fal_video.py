@@ -1,7 +1,8 @@
 """Thin wrapper around the fal-client SDK for video generation."""
 
-import os
-import fal_client
+from pipeline_runtime import providers
+
+from .fal_queue import subscribe
 
 # Default text-to-video model.
 # Alternatives:
@@ -21,7 +22,7 @@ DEFAULT_REF_I2V_MODEL = "fal-ai/vidu/q1/reference-to-video"
 
 
 def _ensure_api_key() -> None:
-    if not os.environ.get("FAL_KEY"):
+    if providers.missing_api_keys(("fal",)):
         raise RuntimeError(
             "FAL_KEY environment variable is not set. "
             "Copy .env.example to .env and add your key."
@@ -39,10 +40,9 @@ def generate_video(
     """
     _ensure_api_key()
 
-    result = fal_client.subscribe(
+    result = subscribe(
         model,
         arguments={"prompt": prompt},
-        with_logs=True,
     )
     return result
 
@@ -62,7 +62,7 @@ def generate_video_from_image(
     """
     _ensure_api_key()
 
-    result = fal_client.subscribe(
+    result = subscribe(
         model,
         arguments={
             "image_url": image_url,
@@ -70,7 +70,6 @@ def generate_video_from_image(
             "duration": duration,
             "aspect_ratio": aspect_ratio,
         },
-        with_logs=True,
     )
     return result
 
@@ -127,9 +126,8 @@ def generate_video_from_reference(
             "aspect_ratio": aspect_ratio,
         }
 
-    result = fal_client.subscribe(
+    result = subscribe(
         model,
         arguments=arguments,
-        with_logs=True,
     )
     return result
@@ -1,18 +1,28 @@
 """Pipeline: Storyboard JSON → fal.ai image per scene → fal.ai video → combined output."""
 
 import asyncio
+import contextvars
+import functools
 import json
 import logging
 import math
 import os
-import subprocess
+import shutil
 import tempfile
-import requests
-import imageio_ffmpeg
+import threading
+import time
 
+from media_service.assembly import DEFAULT_RETIME_MODE, get_engine
+from media_service.kenburns import render_kenburns
+from media_service.segments import SegmentConcat
+from pipeline_runtime import metrics, recording, tracing
+from pipeline_runtime.slots import async_slot
+
+from .deadline import DeadlinePlanner, video_key
 from .scenes import Scene, Storyboard
-from .fal_image import generate_image
+from .fal_image import PULID_IMAGE_MODEL, generate_image
 from .fal_video import (
+    DEFAULT_I2V_MODEL,
     DEFAULT_REF_I2V_MODEL,
     generate_video_from_image,
     generate_video_from_reference,
@@ -24,16 +34,46 @@ OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "output")
 # Kling only supports these clip durations (image-to-video).
 KLING_DURATIONS = [5, 10]
 
-# Default max concurrent FAL API calls.  Keeps us under typical rate limits.
+# Default max concurrent FAL API calls per run.  The global budget shared by
+# all runs is enforced separately by the slot broker (pipeline_runtime.slots).
 DEFAULT_FAL_CONCURRENCY = 3
 
+# Time kept back per run for rendering Ken Burns fallbacks under a deadline.
+FALLBACK_RESERVE_SECONDS = 5.0
+# Fallback clip length when the scene has no narration target.
+FALLBACK_DEFAULT_SECONDS = 5.0
+
+# Extra attempts per scene for a failed image or video call.
+DEFAULT_SCENE_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SEC = 2.0
+
 
 def _download_file(url: str, dest: str) -> None:
-    resp = requests.get(url, stream=True, timeout=120)
-    resp.raise_for_status()
-    with open(dest, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
-            f.write(chunk)
+    import requests
+
+    with metrics.stage_timer("download"), tracing.span(
+        "download", "download", resource="download",
+    ) as span_args:
+        local = recording.replay_file(url)
+        if local is None and url.startswith("file://"):
+            local = url[len("file://"):]
+        if local is not None:
+            # Local results (stub providers, replays): copy instead of fetching.
+            shutil.copyfile(local, dest)
+            recording.keep_file(url, dest)
+            span_args["bytes"] = downloaded = os.path.getsize(dest)
+            metrics.inc("pipeline_downloaded_bytes_total", downloaded)
+            return
+        resp = requests.get(url, stream=True, timeout=120)
+        resp.raise_for_status()
+        downloaded = 0
+        with open(dest, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=8192):
+                f.write(chunk)
+                downloaded += len(chunk)
+        recording.keep_file(url, dest)
+        span_args["bytes"] = downloaded
+    metrics.inc("pipeline_downloaded_bytes_total", downloaded)
 
 
 def _extract_video_url(response: dict) -> str | None:
@@ -64,82 +104,84 @@ def _pick_reference_duration(target_seconds: float) -> int:
     return min(8, max(1, rounded))
 
 
-def _adjust_clip_speed(input_path: str, output_path: str, target_seconds: float) -> None:
-    """Re-time a video clip to exactly target_seconds using ffmpeg setpts filter."""
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+def _adjust_clip_speed(
+    input_path: str,
+    output_path: str,
+    target_seconds: float,
+    mode: str = DEFAULT_RETIME_MODE,
+) -> None:
+    """Re-time a video clip to exactly target_seconds.
 
-    # Probe the actual clip duration
-    probe = subprocess.run(
-        [ffmpeg, "-i", input_path],
-        capture_output=True, text=True,
-    )
-    # ffmpeg prints info to stderr
-    duration_actual = None
-    for line in probe.stderr.splitlines():
-        if "Duration:" in line:
-            # Format: Duration: HH:MM:SS.ms
-            parts = line.split("Duration:")[1].split(",")[0].strip()
-            h, m, s = parts.split(":")
-            duration_actual = int(h) * 3600 + int(m) * 60 + float(s)
-            break
-
-    if duration_actual is None or duration_actual == 0:
-        # Can't determine duration, just copy as-is
-        os.rename(input_path, output_path)
-        return
-
-    speed_factor = duration_actual / target_seconds
-
-    # setpts adjusts video, atempo adjusts audio
-    # atempo only accepts values between 0.5 and 100.0
-    video_filter = f"setpts={1/speed_factor}*PTS"
-
-    cmd = [
-        ffmpeg, "-y",
-        "-i", input_path,
-        "-filter:v", video_filter,
-    ]
-
-    # Handle audio tempo if present (chain atempo filters for extreme values)
-    if 0.5 <= speed_factor <= 100.0:
-        cmd += ["-filter:a", f"atempo={speed_factor}"]
-    else:
-        cmd += ["-an"]  # drop audio if factor is out of range
+    The default ``timestamps`` mode rewrites container timestamps without
+    decoding; ``reencode`` applies setpts and re-encodes the frames.
+    """
+    get_engine().retime(input_path, output_path, target_seconds, mode)
 
-    cmd += ["-preset", "fast", output_path]
 
-    subprocess.run(cmd, check=True, capture_output=True, text=True)
+def _concatenate_videos(clip_paths: list[str], output_path: str) -> None:
+    """Concatenate video clips into a single file.
 
+    Clips with matching stream parameters are joined by stream copy;
+    otherwise they are re-encoded to a common format.
+    """
+    get_engine().concat(clip_paths, output_path)
 
-def _concatenate_videos(clip_paths: list[str], output_path: str) -> None:
-    """Concatenate video clips into a single file using ffmpeg."""
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        for path in clip_paths:
-            f.write(f"file '{path}'\n")
-        list_file = f.name
+def _render_fallback(
+    scene: Scene,
+    image_url: str,
+    seconds: float,
+    output_root: str,
+) -> tuple[str, str]:
+    """Animate the scene image into a clip of *seconds*; return (clip, image)."""
+    extension = os.path.splitext(image_url.split("?", 1)[0])[1] or ".png"
+    image_path = os.path.join(output_root, f"scene_{scene.scene_id:03d}_still{extension}")
+    with tracing.scene(scene.scene_id):
+        _download_file(image_url, image_path)
+        clip = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False, dir=output_root)
+        clip.close()
+        render_kenburns(image_path, clip.name, seconds, variant=scene.scene_id)
+    return clip.name, image_path
+
+
+async def _call_with_timeout(call, timeout: float | None):
+    """Run blocking *call* in a thread, giving up after *timeout* seconds.
+
+    With a timeout the call runs on a daemon thread rather than the loop's
+    executor: an abandoned fal request must not keep ``asyncio.run`` (or the
+    process) waiting for it to return.
+    """
+    if timeout is None:
+        return await asyncio.to_thread(call)
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    context = contextvars.copy_context()
+
+    def _resolve(result, error) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
 
-    try:
-        subprocess.run(
-            [
-                ffmpeg, "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", list_file,
-                "-c", "copy",
-                output_path,
-            ],
-            check=True,
-            capture_output=True,
-            text=True,
-        )
-    finally:
-        os.unlink(list_file)
+    def _target() -> None:
+        try:
+            result, error = context.run(call), None
+        except BaseException as exc:
+            result, error = None, exc
+        try:
+            loop.call_soon_threadsafe(_resolve, result, error)
+        except RuntimeError:
+            pass  # loop already closed: the caller gave up on this call
+
+    threading.Thread(target=_target, name="fal-call", daemon=True).start()
+    return await asyncio.wait_for(future, timeout)
 
 
 # ---------------------------------------------------------------------------
 # Async helpers – wrap blocking fal_client.subscribe calls with a semaphore
+# (per-run cap) and a global FAL slot (cross-process budget)
 # ---------------------------------------------------------------------------
 
 async def _generate_image_async(
@@ -150,43 +192,57 @@ async def _generate_image_async(
     progress_lock: asyncio.Lock,
     total: int,
     style_key: str | None = None,
+    planner: DeadlinePlanner | None = None,
 ) -> tuple[Scene, str]:
     """Generate an image for a single scene, bounded by *semaphore*."""
-    async with semaphore:
-        async with progress_lock:
-            progress["images_started"] += 1
-            logging.info(
-                "VideoGen: [img] started %d/%d",
-                progress["images_started"],
-                total,
-            )
-        if face_swap_url:
+    with tracing.scene(scene.scene_id), tracing.span("image", "scene"):
+        async with semaphore, async_slot("fal"):
+            async with progress_lock:
+                progress["images_started"] += 1
+                logging.info(
+                    "VideoGen: [img] started %d/%d",
+                    progress["images_started"],
+                    total,
+                )
+            if face_swap_url:
+                logging.info(
+                    "VideoGen: Scene %s - [img] generating (PuLID Flux, face-conditioned)",
+                    scene.scene_id,
+                )
+            else:
+                logging.info("VideoGen: Scene %s - [img] generating (Flux)", scene.scene_id)
+
+            image_kwargs: dict = {}
+            if planner is not None:
+                image_kwargs["model"] = planner.image_model()
+            started = time.perf_counter()
+            with metrics.stage_timer("image"), metrics.provider_call("fal"):
+                image_url = await asyncio.to_thread(
+                    generate_image,
+                    scene.scene_prompt,
+                    reference_face_url=face_swap_url,
+                    style_key=style_key,
+                    **image_kwargs,
+                )
+            if planner is not None:
+                planner.observe(
+                    "image",
+                    PULID_IMAGE_MODEL if face_swap_url else image_kwargs["model"],
+                    time.perf_counter() - started,
+                )
+            async with progress_lock:
+                progress["images_done"] += 1
+                logging.info(
+                    "VideoGen: [img] done %d/%d",
+                    progress["images_done"],
+                    total,
+                )
             logging.info(
-                "VideoGen: Scene %s - [img] generating (PuLID Flux, face-conditioned)",
+                "VideoGen: Scene %s - [img] ready: %s...",
                 scene.scene_id,
+                image_url[:80],
             )
-        else:
-            logging.info("VideoGen: Scene %s - [img] generating (Flux)", scene.scene_id)
-
-        image_url = await asyncio.to_thread(
-            generate_image,
-            scene.scene_prompt,
-            reference_face_url=face_swap_url,
-            style_key=style_key,
-        )
-        async with progress_lock:
-            progress["images_done"] += 1
-            logging.info(
-                "VideoGen: [img] done %d/%d",
-                progress["images_done"],
-                total,
-            )
-        logging.info(
-            "VideoGen: Scene %s - [img] ready: %s...",
-            scene.scene_id,
-            image_url[:80],
-        )
-        return scene, image_url
+            return scene, image_url
 
 
 async def _generate_video_async(
@@ -199,60 +255,304 @@ async def _generate_video_async(
     progress: dict,
     progress_lock: asyncio.Lock,
     total: int,
+    planner: DeadlinePlanner | None = None,
+    timeout: float | None = None,
 ) -> tuple[Scene, str, dict]:
     """Animate an image into a video for a single scene, bounded by *semaphore*."""
-    async with semaphore:
-        async with progress_lock:
-            progress["videos_started"] += 1
+    with tracing.scene(scene.scene_id), tracing.span("video", "scene"):
+        async with semaphore, async_slot("fal"):
+            async with progress_lock:
+                progress["videos_started"] += 1
+                logging.info(
+                    "VideoGen: [vid] started %d/%d",
+                    progress["videos_started"],
+                    total,
+                )
+            if planner is not None:
+                duration = planner.clip_duration(duration)
             logging.info(
-                "VideoGen: [vid] started %d/%d",
-                progress["videos_started"],
-                total,
+                "VideoGen: Scene %s - [vid] animating (%ss clip)",
+                scene.scene_id,
+                duration,
             )
-        logging.info(
-            "VideoGen: Scene %s - [vid] animating (%ss clip)",
+
+            if reference_element:
+                reference_model = video_model or DEFAULT_REF_I2V_MODEL
+                active_model = reference_model
+                ref_prompt = (
+                    scene.scene_prompt
+                    if reference_model.startswith("fal-ai/vidu/")
+                    else (
+                        f"{scene.scene_prompt}\n"
+                        "Main character: @Element1. Use @Image1 as style reference."
+                    )
+                )
+                call = functools.partial(
+                    generate_video_from_reference,
+                    elements=[reference_element],
+                    image_urls=[image_url],
+                    prompt=ref_prompt,
+                    model=reference_model,
+                    duration=duration,
+                )
+            else:
+                i2v_kwargs: dict = {"duration": duration}
+                if video_model:
+                    i2v_kwargs["model"] = video_model
+                active_model = video_model or DEFAULT_I2V_MODEL
+                call = functools.partial(
+                    generate_video_from_image,
+                    image_url,
+                    scene.scene_prompt,
+                    **i2v_kwargs,
+                )
+            if planner is not None:
+                planner_timeout = planner.call_timeout(FALLBACK_RESERVE_SECONDS)
+                if planner_timeout is not None:
+                    timeout = min(timeout or planner_timeout, planner_timeout)
+            started = time.perf_counter()
+            try:
+                with metrics.stage_timer("video"), metrics.provider_call("fal"):
+                    video_response = await _call_with_timeout(call, timeout)
+            except asyncio.TimeoutError as exc:
+                raise TimeoutError(f"timed out after {timeout:.0f}s") from exc
+            if planner is not None:
+                planner.observe(
+                    "video", video_key(active_model, duration), time.perf_counter() - started,
+                )
+            async with progress_lock:
+                progress["videos_done"] += 1
+                logging.info(
+                    "VideoGen: [vid] done %d/%d",
+                    progress["videos_done"],
+                    total,
+                )
+
+            logging.info("VideoGen: Scene %s - [vid] ready", scene.scene_id)
+            return scene, image_url, video_response
+
+
+# ---------------------------------------------------------------------------
+# Per-scene failure isolation – retries, then fallback or a recorded failure
+# ---------------------------------------------------------------------------
+
+class SceneFailure(RuntimeError):
+    """A scene's image or video stage failed after all its attempts."""
+
+    def __init__(self, scene: Scene, stage: str, attempts: int, error: BaseException) -> None:
+        super().__init__(
+            f"Scene {scene.scene_id} {stage} failed after {attempts} attempt(s): "
+            f"{type(error).__name__}: {error}"
+        )
+        self.scene = scene
+        self.stage = stage
+        self.attempts = attempts
+        self.error = error
+
+    def as_dict(self) -> dict:
+        return {
+            "scene_id": self.scene.scene_id,
+            "stage": self.stage,
+            "attempts": self.attempts,
+            "error": f"{type(self.error).__name__}: {self.error}",
+        }
+
+
+async def _retrying(
+    scene: Scene,
+    stage: str,
+    attempt_fn,
+    *,
+    retries: int,
+    backoff_sec: float,
+):
+    """Await ``attempt_fn()`` up to ``retries + 1`` times; raise SceneFailure.
+
+    Each attempt re-acquires its FAL slot, so a scene waiting to retry does
+    not hold capacity other scenes could use.  Timeouts are not retried:
+    they mean the scene's time budget is already spent.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await attempt_fn()
+        except Exception as exc:
+            if attempt > retries or isinstance(exc, TimeoutError):
+                raise SceneFailure(scene, stage, attempt, exc) from exc
+            metrics.inc("pipeline_provider_retries_total", provider="fal")
+            sleep_for = backoff_sec * (2 ** (attempt - 1))
+            logging.warning(
+                "VideoGen: Scene %s - [%s] attempt %d/%d failed: %s. Retrying in %.1fs",
+                scene.scene_id,
+                stage,
+                attempt,
+                retries + 1,
+                exc,
+                sleep_for,
+            )
+            await asyncio.sleep(sleep_for)
+
+
+async def _video_scene(
+    scene: Scene,
+    image_url: str,
+    attempt_fn,
+    *,
+    retries: int,
+    backoff_sec: float,
+    planner: DeadlinePlanner | None,
+    fallback: bool,
+    fallback_seconds: float,
+    output_root: str,
+) -> tuple[Scene, str, dict]:
+    """Generate one scene's clip with retries, falling back to Ken Burns.
+
+    With *fallback*, a scene whose attempts are exhausted doesn't fail:
+    once its FAL slot is released a Ken Burns clip of *fallback_seconds* is
+    rendered and returned as ``{"fallback_reason", "fallback_clip",
+    "fallback_image"}``.
+    """
+    try:
+        return await _retrying(
+            scene, "video", attempt_fn, retries=retries, backoff_sec=backoff_sec,
+        )
+    except SceneFailure as failure:
+        if planner is not None:
+            planner.observe("video", "", None)
+        if not fallback:
+            raise
+        reason = f"{type(failure.error).__name__}: {failure.error}"
+        logging.warning(
+            "VideoGen: Scene %s - [vid] failed (%s); rendering a Ken Burns fallback",
             scene.scene_id,
-            duration,
+            reason,
+        )
+    try:
+        clip, image_path = await asyncio.to_thread(
+            _render_fallback, scene, image_url, fallback_seconds, output_root,
         )
+    except Exception as exc:
+        raise SceneFailure(scene, "fallback", 1, exc) from exc
+    return scene, image_url, {
+        "fallback_reason": reason,
+        "fallback_clip": clip,
+        "fallback_image": image_path,
+    }
 
-        if reference_element:
-            reference_model = video_model or DEFAULT_REF_I2V_MODEL
-            ref_prompt = (
-                scene.scene_prompt
-                if reference_model.startswith("fal-ai/vidu/")
-                else (
-                    f"{scene.scene_prompt}\n"
-                    "Main character: @Element1. Use @Image1 as style reference."
+
+def _finish_scene(
+    scene: Scene,
+    image_url: str,
+    video_response: dict,
+    *,
+    target_duration: float | None,
+    output_root: str,
+    retime_mode: str,
+    fallback: bool,
+    return_clips: bool,
+    failed_scenes: list[dict],
+) -> tuple[dict | None, str | None]:
+    """Download and retime one scene's clip, or use its Ken Burns fallback.
+
+    Returns ``(scene_result, clip_path)``; ``clip_path`` is None when the
+    response had no clip, and ``scene_result`` is None when the download
+    failed (the failure is appended to *failed_scenes*).
+    """
+    video_url = _extract_video_url(video_response)
+    scene_result: dict = {
+        "scene": scene,
+        "image_url": image_url,
+        "video_url": video_url,
+    }
+
+    final_clip = None
+    if video_url:
+        tmp = tempfile.NamedTemporaryFile(
+            suffix=".mp4", delete=False, dir=output_root,
+        )
+        tmp.close()
+        try:
+            logging.info("VideoGen: Scene %s - downloading clip", scene.scene_id)
+            with tracing.scene(scene.scene_id):
+                _download_file(video_url, tmp.name)
+
+            # Speed-adjust if duration target is set
+            final_clip = tmp.name
+            if target_duration:
+                adjusted = tmp.name + ".adj.mp4"
+                logging.info(
+                    "VideoGen: Scene %s - adjusting clip to %.1fs",
+                    scene.scene_id,
+                    target_duration,
                 )
-            )
-            video_response = await asyncio.to_thread(
-                generate_video_from_reference,
-                elements=[reference_element],
-                image_urls=[image_url],
-                prompt=ref_prompt,
-                model=reference_model,
-                duration=duration,
-            )
+                with tracing.scene(scene.scene_id):
+                    _adjust_clip_speed(
+                        tmp.name, adjusted, target_duration, retime_mode,
+                    )
+                os.unlink(tmp.name)
+                final_clip = adjusted
+        except Exception as exc:
+            # The clip is paid for; keep its URL so it can be fetched later.
+            failure = SceneFailure(scene, "download", 1, exc)
+            logging.error("VideoGen: %s", failure)
+            failed_scenes.append({**failure.as_dict(), "video_url": video_url})
+            for path in (tmp.name, tmp.name + ".adj.mp4"):
+                if os.path.exists(path):
+                    os.unlink(path)
+            return None, None
+    elif fallback:
+        reason = video_response.get("fallback_reason", "no video URL in response")
+        logging.info(
+            "VideoGen: Scene %s - using Ken Burns fallback (%s)",
+            scene.scene_id,
+            reason,
+        )
+        if "fallback_clip" in video_response:
+            final_clip = video_response["fallback_clip"]
+            image_path = video_response["fallback_image"]
         else:
-            i2v_kwargs: dict = {"duration": duration}
-            if video_model:
-                i2v_kwargs["model"] = video_model
-            video_response = await asyncio.to_thread(
-                generate_video_from_image,
+            final_clip, image_path = _render_fallback(
+                scene,
                 image_url,
-                scene.scene_prompt,
-                **i2v_kwargs,
-            )
-        async with progress_lock:
-            progress["videos_done"] += 1
-            logging.info(
-                "VideoGen: [vid] done %d/%d",
-                progress["videos_done"],
-                total,
+                target_duration or FALLBACK_DEFAULT_SECONDS,
+                output_root,
             )
+        scene_result["fallback"] = {
+            "kind": "kenburns",
+            "reason": reason,
+            "image_path": image_path,
+        }
+    else:
+        logging.warning("VideoGen: Scene %s - no video URL in response.", scene.scene_id)
+        logging.warning(
+            "VideoGen: response: %s",
+            json.dumps(video_response, indent=2, default=str),
+        )
 
-        logging.info("VideoGen: Scene %s - [vid] ready", scene.scene_id)
-        return scene, image_url, video_response
+    if final_clip:
+        if return_clips:
+            named = os.path.join(
+                output_root, f"scene_{scene.scene_id:03d}.mp4",
+            )
+            os.replace(final_clip, named)
+            final_clip = named
+        logging.info("VideoGen: Scene %s clip ready", scene.scene_id)
+    return scene_result, final_clip
+
+
+def _split_failures(results: list, failed_scenes: list[dict]) -> list:
+    """Keep successful gather results; record SceneFailures in *failed_scenes*."""
+    succeeded = []
+    for result in results:
+        if isinstance(result, SceneFailure):
+            logging.error("VideoGen: %s", result)
+            failed_scenes.append(result.as_dict())
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            succeeded.append(result)
+    return succeeded
 
 
 # ---------------------------------------------------------------------------
@@ -272,6 +572,14 @@ async def _process_storyboard_parallel(
     reference_element: dict | None,
     fal_concurrency: int,
     style_key: str | None = None,
+    retime_mode: str = DEFAULT_RETIME_MODE,
+    planner: DeadlinePlanner | None = None,
+    video_timeout: float | None = None,
+    fallback: bool = True,
+    scene_retries: int = DEFAULT_SCENE_RETRIES,
+    retry_backoff_sec: float = DEFAULT_RETRY_BACKOFF_SEC,
+    stream_window: int | None = None,
+    on_scene=None,
 ) -> dict:
     output_root = output_dir or OUTPUT_DIR
     os.makedirs(output_root, exist_ok=True)
@@ -288,6 +596,40 @@ async def _process_storyboard_parallel(
     else:
         default_per_scene = None
 
+    def _target_duration(scene: Scene) -> float | None:
+        target_duration = None
+        if per_scene_durations:
+            target_duration = per_scene_durations.get(scene.scene_id)
+        if target_duration is None:
+            target_duration = default_per_scene
+        return target_duration
+
+    clip_durations: dict[int, int | str] = {}
+    for scene in storyboard.scenes:
+        target_duration = _target_duration(scene)
+        if reference_element:
+            clip_durations[scene.scene_id] = (
+                _pick_reference_duration(target_duration)
+                if target_duration
+                else 5
+            )
+        else:
+            clip_durations[scene.scene_id] = (
+                _pick_kling_duration(target_duration)
+                if target_duration
+                else "5"
+            )
+
+    if planner is not None:
+        fal_concurrency = planner.plan(
+            num_scenes=num_scenes,
+            face_mode=bool(face_swap_url),
+            video_model=video_model
+            or (DEFAULT_REF_I2V_MODEL if reference_element else DEFAULT_I2V_MODEL),
+            durations=list(clip_durations.values()),
+            concurrency=fal_concurrency,
+        )
+
     semaphore = asyncio.Semaphore(fal_concurrency)
     progress_lock = asyncio.Lock()
     progress = {
@@ -302,136 +644,149 @@ async def _process_storyboard_parallel(
         fal_concurrency,
     )
 
-    # ------------------------------------------------------------------
-    # Phase 1 – generate all images in parallel
-    # ------------------------------------------------------------------
-    logging.info("VideoGen: Phase 1/2 – generating images for all scenes")
-    image_tasks = [
-        _generate_image_async(
-            semaphore,
+    failed_scenes: list[dict] = []
+
+    def _image_scene(scene: Scene):
+        return _retrying(
             scene,
-            face_swap_url,
-            progress,
-            progress_lock,
-            num_scenes,
-            style_key=style_key,
+            "image",
+            functools.partial(
+                _generate_image_async,
+                semaphore,
+                scene,
+                face_swap_url,
+                progress,
+                progress_lock,
+                num_scenes,
+                style_key=style_key,
+                planner=planner,
+            ),
+            retries=scene_retries,
+            backoff_sec=retry_backoff_sec,
         )
-        for scene in storyboard.scenes
-    ]
-    image_results: list[tuple[Scene, str]] = await asyncio.gather(*image_tasks)
 
-    # ------------------------------------------------------------------
-    # Phase 2 – generate all videos in parallel
-    # ------------------------------------------------------------------
-    logging.info("VideoGen: Phase 2/2 – generating videos for all scenes")
-    video_tasks = []
-    for scene, image_url in image_results:
-        target_duration = None
-        if per_scene_durations:
-            target_duration = per_scene_durations.get(scene.scene_id)
-        if target_duration is None:
-            target_duration = default_per_scene
+    def _image_failed() -> None:
+        if planner is not None:
+            planner.observe("image", "", None)
+            planner.observe("video", "", None)
 
-        if reference_element:
-            duration = (
-                _pick_reference_duration(target_duration)
-                if target_duration
-                else 5
-            )
-        else:
-            duration = (
-                _pick_kling_duration(target_duration)
-                if target_duration
-                else "5"
-            )
-        video_tasks.append(
-            _generate_video_async(
+    def _animate_scene(scene: Scene, image_url: str):
+        return _video_scene(
+            scene,
+            image_url,
+            functools.partial(
+                _generate_video_async,
                 semaphore,
                 scene,
                 image_url,
-                duration,
+                clip_durations[scene.scene_id],
                 video_model,
                 reference_element,
                 progress,
                 progress_lock,
                 num_scenes,
-            )
+                planner=planner,
+                timeout=video_timeout,
+            ),
+            retries=scene_retries,
+            backoff_sec=retry_backoff_sec,
+            planner=planner,
+            fallback=fallback,
+            fallback_seconds=_target_duration(scene) or FALLBACK_DEFAULT_SECONDS,
+            output_root=output_root,
+        )
+
+    def _finish(scene: Scene, image_url: str, video_response: dict):
+        return _finish_scene(
+            scene,
+            image_url,
+            video_response,
+            target_duration=_target_duration(scene),
+            output_root=output_root,
+            retime_mode=retime_mode,
+            fallback=fallback,
+            return_clips=return_clips,
+            failed_scenes=failed_scenes,
         )
-    video_results: list[tuple[Scene, str, dict]] = await asyncio.gather(*video_tasks)
+
+    if stream_window:
+        return await _process_storyboard_streaming(
+            storyboard,
+            image_scene=_image_scene,
+            image_failed=_image_failed,
+            animate_scene=_animate_scene,
+            finish=_finish,
+            window=stream_window,
+            on_scene=on_scene,
+            output_root=output_root,
+            output_filename=output_filename,
+            return_clips=return_clips,
+            failed_scenes=failed_scenes,
+        )
+
+    # ------------------------------------------------------------------
+    # Phase 1 – generate all images in parallel
+    # ------------------------------------------------------------------
+    logging.info("VideoGen: Phase 1/2 – generating images for all scenes")
+    image_results: list[tuple[Scene, str]] = _split_failures(
+        await asyncio.gather(
+            *(_image_scene(scene) for scene in storyboard.scenes),
+            return_exceptions=True,
+        ),
+        failed_scenes,
+    )
+    for _ in range(num_scenes - len(image_results)):
+        _image_failed()
+
+    # ------------------------------------------------------------------
+    # Phase 2 – generate all videos in parallel
+    # ------------------------------------------------------------------
+    logging.info("VideoGen: Phase 2/2 – generating videos for all scenes")
+    video_results: list[tuple[Scene, str, dict]] = _split_failures(
+        await asyncio.gather(
+            *(_animate_scene(scene, image_url) for scene, image_url in image_results),
+            return_exceptions=True,
+        ),
+        failed_scenes,
+    )
 
     # ------------------------------------------------------------------
     # Phase 3 – download, speed-adjust, concatenate (local / sequential)
     # ------------------------------------------------------------------
     scene_results: list[dict] = []
     temp_clips: list[str] = []
+    temp_stills: list[str] = []
 
     try:
         for scene, image_url, video_response in video_results:
-            video_url = _extract_video_url(video_response)
-
-            scene_result: dict = {
-                "scene": scene,
-                "image_url": image_url,
-                "video_url": video_url,
-            }
-
-            if video_url:
-                tmp = tempfile.NamedTemporaryFile(
-                    suffix=".mp4", delete=False, dir=output_root,
-                )
-                tmp.close()
-                logging.info("VideoGen: Scene %s - downloading clip", scene.scene_id)
-                _download_file(video_url, tmp.name)
-
-                # Speed-adjust if duration target is set
-                target_duration = None
-                if per_scene_durations:
-                    target_duration = per_scene_durations.get(scene.scene_id)
-                if target_duration is None:
-                    target_duration = default_per_scene
-
-                final_clip = tmp.name
-                if target_duration:
-                    adjusted = tmp.name + ".adj.mp4"
-                    logging.info(
-                        "VideoGen: Scene %s - adjusting clip to %.1fs",
-                        scene.scene_id,
-                        target_duration,
-                    )
-                    _adjust_clip_speed(tmp.name, adjusted, target_duration)
-                    os.unlink(tmp.name)
-                    final_clip = adjusted
-
-                if return_clips:
-                    named = os.path.join(
-                        output_root, f"scene_{scene.scene_id:03d}.mp4",
-                    )
-                    os.replace(final_clip, named)
-                    final_clip = named
-
+            scene_result, final_clip = _finish(scene, image_url, video_response)
+            if scene_result is None:
+                continue
+            if "fallback" in scene_result and not return_clips:
+                temp_stills.append(scene_result["fallback"]["image_path"])
+            if final_clip:
                 temp_clips.append(final_clip)
-                logging.info("VideoGen: Scene %s clip ready", scene.scene_id)
-            else:
-                logging.warning("VideoGen: Scene %s - no video URL in response.", scene.scene_id)
-                logging.warning(
-                    "VideoGen: response: %s",
-                    json.dumps(video_response, indent=2, default=str),
-                )
-
             scene_results.append(scene_result)
 
+        failed_scenes.sort(key=lambda item: item["scene_id"])
+
         # Concatenate all clips
         output_path = os.path.join(output_root, output_filename)
 
         if len(temp_clips) == 0:
             logging.warning("VideoGen: no scene clips were generated")
-            return {"scenes": scene_results, "output_path": None}
+            return {
+                "scenes": scene_results,
+                "output_path": None,
+                "failed_scenes": failed_scenes,
+            }
 
         if return_clips:
             return {
                 "scenes": scene_results,
                 "output_path": None,
                 "clip_paths": temp_clips,
+                "failed_scenes": failed_scenes,
             }
 
         if len(temp_clips) == 1:
@@ -445,15 +800,149 @@ async def _process_storyboard_parallel(
             _concatenate_videos(temp_clips, output_path)
 
         logging.info("VideoGen: final video saved: %s", output_path)
-        return {"scenes": scene_results, "output_path": output_path}
+        return {
+            "scenes": scene_results,
+            "output_path": output_path,
+            "failed_scenes": failed_scenes,
+        }
 
     finally:
         if not return_clips:
-            for path in temp_clips:
+            for path in temp_clips + temp_stills:
                 if os.path.exists(path):
                     os.unlink(path)
 
 
+# ---------------------------------------------------------------------------
+# Streaming mode – bounded window, results flushed in scene order
+# ---------------------------------------------------------------------------
+
+async def _run_in_order(items: list, run_item, emit, window: int) -> None:
+    """Run ``run_item(item)`` for *items*, passing outcomes to *emit* in order.
+
+    An item only starts while it is fewer than *window* places after the
+    oldest outcome not yet emitted, so in-flight tasks and buffered
+    outcomes both stay within *window* however long *items* is.  *emit*
+    runs in a worker thread and gets the result or the raised exception.
+    """
+    pending: dict[asyncio.Task, int] = {}
+    outcomes: dict[int, object] = {}
+    next_start = next_emit = 0
+    try:
+        while next_emit < len(items):
+            while next_start < len(items) and next_start < next_emit + window:
+                task = asyncio.ensure_future(run_item(items[next_start]))
+                pending[task] = next_start
+                next_start += 1
+            finished, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in finished:
+                index = pending.pop(task)
+                outcomes[index] = task.exception() or task.result()
+            while next_emit in outcomes:
+                await asyncio.to_thread(emit, items[next_emit], outcomes.pop(next_emit))
+                next_emit += 1
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _process_storyboard_streaming(
+    storyboard: Storyboard,
+    *,
+    image_scene,
+    image_failed,
+    animate_scene,
+    finish,
+    window: int,
+    on_scene,
+    output_root: str,
+    output_filename: str,
+    return_clips: bool,
+    failed_scenes: list[dict],
+) -> dict:
+    """Run each scene image → video → clip with at most *window* in flight.
+
+    Finished scenes are appended to ``scene_results.jsonl`` and handed to
+    ``on_scene(scene, scene_result, clip_path)`` in scene order (both None
+    when the scene failed) instead of being collected.  Without *on_scene*
+    the clips are joined into *output_filename* through a
+    :class:`SegmentConcat`.
+    """
+    logging.info(
+        "VideoGen: streaming %d scenes (window %d)", len(storyboard.scenes), window,
+    )
+
+    async def _run_scene(scene: Scene):
+        try:
+            _, image_url = await image_scene(scene)
+        except SceneFailure:
+            image_failed()
+            raise
+        _, image_url, video_response = await animate_scene(scene, image_url)
+        return await asyncio.to_thread(finish, scene, image_url, video_response)
+
+    assembler = None
+    if on_scene is None and not return_clips:
+        assembler = SegmentConcat(os.path.join(output_root, "segments"))
+    results_path = os.path.join(output_root, "scene_results.jsonl")
+    counts = {"scenes": 0, "clips": 0}
+
+    with open(results_path, "w", encoding="utf-8") as results_file:
+
+        def _emit(scene: Scene, outcome) -> None:
+            scene_result, clip = None, None
+            if isinstance(outcome, SceneFailure):
+                logging.error("VideoGen: %s", outcome)
+                failed_scenes.append(outcome.as_dict())
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                scene_result, clip = outcome
+            if scene_result is not None:
+                counts["scenes"] += 1
+                record = {
+                    "scene_id": scene.scene_id,
+                    "image_url": scene_result["image_url"],
+                    "video_url": scene_result["video_url"],
+                    "clip_path": clip if return_clips else None,
+                }
+                if "fallback" in scene_result:
+                    record["fallback"] = scene_result["fallback"]
+                results_file.write(json.dumps(record) + "\n")
+                results_file.flush()
+            if clip:
+                counts["clips"] += 1
+            if on_scene is not None:
+                on_scene(scene, scene_result, clip)
+            elif assembler is not None:
+                if clip:
+                    assembler.add(clip)
+                if scene_result is not None and "fallback" in scene_result:
+                    os.unlink(scene_result["fallback"]["image_path"])
+
+        await _run_in_order(storyboard.scenes, _run_scene, _emit, window)
+
+    failed_scenes.sort(key=lambda item: item["scene_id"])
+    result = {
+        "scenes": [],
+        "scene_results_path": results_path,
+        "output_path": None,
+        "failed_scenes": failed_scenes,
+    }
+    if counts["clips"] == 0:
+        logging.warning("VideoGen: no scene clips were generated")
+    elif assembler is not None:
+        output_path = os.path.join(output_root, output_filename)
+        await asyncio.to_thread(assembler.finish, output_path)
+        logging.info("VideoGen: final video saved: %s", output_path)
+        result["output_path"] = output_path
+    return result
+
+
 # ---------------------------------------------------------------------------
 # Public API  (unchanged signature + new fal_concurrency kwarg)
 # ---------------------------------------------------------------------------
@@ -471,6 +960,14 @@ def process_storyboard(
     reference_element: dict | None = None,
     fal_concurrency: int = DEFAULT_FAL_CONCURRENCY,
     style_key: str | None = None,
+    retime_mode: str = DEFAULT_RETIME_MODE,
+    planner: DeadlinePlanner | None = None,
+    video_timeout: float | None = None,
+    fallback: bool = True,
+    scene_retries: int = DEFAULT_SCENE_RETRIES,
+    retry_backoff_sec: float = DEFAULT_RETRY_BACKOFF_SEC,
+    stream_window: int | None = None,
+    on_scene=None,
 ) -> dict:
     """Generate a video for each scene and combine into one final video.
 
@@ -497,10 +994,38 @@ def process_storyboard(
                           this is used for identity conditioning during video
                           generation.
         fal_concurrency: Maximum number of concurrent FAL API calls.
+        retime_mode: ``timestamps`` (stream-copy timestamp rewrite, default)
+                     or ``reencode`` (setpts filter + re-encode).
+        planner: Optional :class:`DeadlinePlanner`; picks image models, clip
+                 durations and concurrency to meet its deadline and records
+                 per-call latencies.
+        video_timeout: Seconds to wait for one video call (the planner's
+                       deadline can shorten it); None waits indefinitely.
+        fallback: Replace clips whose generation fails, times out or returns
+                  no URL with a Ken Burns pan over the scene image, rendered
+                  locally at the target duration.  The scene result then
+                  carries ``fallback`` (reason and image path) so the clip
+                  can be re-rendered later.
+        scene_retries: Extra attempts per scene for a failed image or video
+                       call; each scene retries on its own, and a scene that
+                       still fails is dropped and listed in
+                       ``failed_scenes`` while the others carry on.
+        stream_window: Streaming mode for long storyboards.  Each scene runs
+                       image → video → clip on its own, at most this many
+                       scenes are in flight, and finished scenes are
+                       written to ``scene_results.jsonl`` instead of kept
+                       in memory.  ``scenes`` is then empty and clips go
+                       to *on_scene* (or are concatenated incrementally).
+        on_scene: With *stream_window*, called in scene order from a
+                  worker thread as ``on_scene(scene, scene_result,
+                  clip_path)``; *scene_result* and *clip_path* are None for
+                  a failed scene.
 
     Returns a result dict containing:
         - scenes: list of per-scene results (scene, image_url, video_url)
         - output_path: path to the combined video file
+        - failed_scenes: scenes dropped after their attempts ran out
+          (scene_id, stage, attempts, error)
     """
     return asyncio.run(
         _process_storyboard_parallel(
@@ -515,5 +1040,13 @@ def process_storyboard(
             reference_element=reference_element,
             fal_concurrency=fal_concurrency,
             style_key=style_key,
+            retime_mode=retime_mode,
+            planner=planner,
+            video_timeout=video_timeout,
+            fallback=fallback,
+            scene_retries=scene_retries,
+            retry_backoff_sec=retry_backoff_sec,
+            stream_window=stream_window,
+            on_scene=on_scene,
         )
     )
@@ -0,0 +1 @@
+"""Local media (MP4 probing and ffmpeg assembly) service package."""
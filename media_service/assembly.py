@@ -0,0 +1,398 @@
+"""Media assembly engines: mux, concat and retime of per-scene clips.
+
+Two interchangeable engines implement the same three steps:
+
+  - :class:`FfmpegEngine` shells out to the imageio-ffmpeg binary (always
+    available, the historical behaviour).
+  - :class:`PyAVEngine` works in-process on packets via PyAV (optional
+    ``av`` dependency).  Stream-copy cases (video in mux, compatible
+    concat, retime) never decode; only genuine encode work (AAC for the
+    narration, or concat of mismatched clips) is encoded, the latter by
+    delegating to ffmpeg.
+
+``PIPELINE_MEDIA_ENGINE`` selects ``pyav``, ``ffmpeg`` or ``auto`` (PyAV
+when importable).  Every step is timed; see :func:`step_timings`.
+
+Retiming has two modes.  ``timestamps`` (default) stretches a clip by
+rescaling its container timestamps during a stream-copy remux, which
+also changes the effective frame rate and costs a metadata rewrite.
+``reencode`` runs the ``setpts`` filter and re-encodes the frames.  Both
+drop the clip's own audio up front: narration replaces it at mux time.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+
+from pipeline_runtime import cancellation, metrics, tracing
+
+from .concat_tree import tree_concat
+from .mp4_probe import concat_compatible, probe_video_duration
+
+ENGINE_CHOICES = ("auto", "pyav", "ffmpeg")
+RETIME_MODES = ("timestamps", "reencode")
+DEFAULT_RETIME_MODE = "timestamps"
+
+
+@dataclass
+class StepTiming:
+    """Wall time of one assembly step."""
+
+    step: str
+    engine: str
+    seconds: float
+    output: str
+
+
+_timings: list[StepTiming] = []
+
+
+def step_timings() -> list[StepTiming]:
+    """Return the timings recorded in this process so far."""
+    return list(_timings)
+
+
+def reset_step_timings() -> None:
+    _timings.clear()
+
+
+def drain_step_timings() -> list[StepTiming]:
+    """Return and forget the timings recorded so far (long streaming runs)."""
+    taken = _timings[:]
+    del _timings[: len(taken)]
+    return taken
+
+
+@contextlib.contextmanager
+def _timed(step: str, engine: str, output: str):
+    start = time.perf_counter()
+    try:
+        with metrics.stage_timer(step), tracing.span(
+            step, "media", resource=engine, output=os.path.basename(output),
+        ):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _timings.append(StepTiming(step, engine, elapsed, output))
+        logging.info(
+            "Assembly: %s %s via %s in %.1fms",
+            step,
+            os.path.basename(output),
+            engine,
+            elapsed * 1000.0,
+        )
+
+
+def ffmpeg_exe() -> str:
+    import imageio_ffmpeg
+
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: list[str], what: str) -> None:
+    """Run ffmpeg with *args*; raise RuntimeError with its stderr on failure.
+
+    The process is killed if the run is cancelled, which then raises
+    :class:`~pipeline_runtime.cancellation.RunCancelled` instead.
+    """
+    cancellation.check()
+    process = subprocess.Popen(
+        [ffmpeg_exe(), "-y", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    with cancellation.child_process(process):
+        _, stderr = process.communicate()
+    cancellation.check()
+    if process.returncode != 0:
+        stderr = stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg {what} failed: {stderr}")
+
+
+# ---------------------------------------------------------------------------
+# ffmpeg subprocess engine
+# ---------------------------------------------------------------------------
+
+class FfmpegEngine:
+    """Assembly through the ffmpeg command-line binary."""
+
+    name = "ffmpeg"
+
+    def mux(self, video_path: str, audio_path: str, output_path: str) -> None:
+        with _timed("mux", self.name, output_path):
+            run_ffmpeg(
+                [
+                    "-i", video_path,
+                    "-i", audio_path,
+                    "-c:v", "copy",
+                    "-c:a", "aac",
+                    "-shortest",
+                    output_path,
+                ],
+                "mux",
+            )
+
+    def concat(self, clip_paths: list[str], output_path: str) -> None:
+        with _timed("concat", self.name, output_path):
+            # Stream-copy when every clip shares codec/resolution/timescale;
+            # otherwise re-encode only the clips that differ, in parallel.
+            if concat_compatible(clip_paths):
+                codec_args = ["-c", "copy"]
+            elif len(clip_paths) > 1 and tree_concat(clip_paths, output_path):
+                return
+            else:
+                logging.info("Assembly: clip parameters differ, re-encoding on concat")
+                codec_args = ["-c:v", "libx264", "-c:a", "aac"]
+            with tempfile.NamedTemporaryFile(
+                mode="w", suffix=".txt", delete=False,
+            ) as handle:
+                for path in clip_paths:
+                    handle.write(f"file '{os.path.abspath(path)}'\n")
+                list_path = handle.name
+            try:
+                run_ffmpeg(
+                    [
+                        "-f", "concat",
+                        "-safe", "0",
+                        "-i", list_path,
+                        *codec_args,
+                        "-movflags", "+faststart",
+                        output_path,
+                    ],
+                    "concat",
+                )
+            finally:
+                os.unlink(list_path)
+
+    def retime(
+        self,
+        input_path: str,
+        output_path: str,
+        target_seconds: float,
+        mode: str = DEFAULT_RETIME_MODE,
+    ) -> None:
+        """Re-time a clip to exactly *target_seconds* (see module docstring)."""
+        with _timed("retime", self.name, output_path):
+            duration_actual = probe_video_duration(input_path)
+            if not duration_actual:
+                # Can't determine duration, just copy as-is
+                shutil.copyfile(input_path, output_path)
+                return
+
+            scale = target_seconds / duration_actual
+            if mode == "timestamps":
+                cmd = [
+                    "-itsscale", f"{scale:.9f}",
+                    "-i", input_path,
+                    "-map", "0:v:0",
+                    "-an",
+                    "-c:v", "copy",
+                    output_path,
+                ]
+            else:
+                cmd = [
+                    "-i", input_path,
+                    "-an",
+                    "-filter:v", f"setpts={scale}*PTS",
+                    "-preset", "fast",
+                    output_path,
+                ]
+            run_ffmpeg(cmd, "retime")
+
+
+# ---------------------------------------------------------------------------
+# PyAV in-process engine
+# ---------------------------------------------------------------------------
+
+class PyAVEngine:
+    """In-process packet-level assembly with PyAV (``pip install av``)."""
+
+    name = "pyav"
+
+    def __init__(self) -> None:
+        import av  # noqa: F401  (fail fast when the optional dependency is missing)
+
+        self._fallback = FfmpegEngine()
+
+    def mux(self, video_path: str, audio_path: str, output_path: str) -> None:
+        import av
+
+        with _timed("mux", self.name, output_path):
+            video_seconds = probe_video_duration(video_path)
+            with av.open(video_path) as vin, av.open(audio_path) as ain, av.open(
+                output_path, "w", format="mp4",
+            ) as out:
+                v_in = vin.streams.video[0]
+                a_in = ain.streams.audio[0]
+                v_out = out.add_stream_from_template(v_in)
+                # WAVs may carry an unordered layout ("1 channels"); AAC needs a named one.
+                layout = "mono" if a_in.channels == 1 else "stereo"
+                a_out = out.add_stream("aac", rate=a_in.rate)
+                a_out.codec_context.layout = layout
+
+                # Equivalent of ffmpeg -shortest.
+                audio_seconds = (ain.duration or 0) / av.time_base or None
+                limit = min(s for s in (video_seconds, audio_seconds, float("inf")) if s)
+
+                for packet in vin.demux(v_in):
+                    if packet.dts is None:
+                        continue
+                    if packet.pts is not None and float(packet.pts * v_in.time_base) >= limit:
+                        continue
+                    packet.stream = v_out
+                    out.mux(packet)
+
+                resampler = av.AudioResampler(
+                    format=a_out.codec_context.format.name,
+                    layout=layout,
+                    rate=a_in.rate,
+                )
+                for frame in ain.decode(a_in):
+                    if frame.time is not None and frame.time >= limit:
+                        break
+                    for resampled in resampler.resample(frame):
+                        out.mux(a_out.encode(resampled))
+                for resampled in resampler.resample(None):
+                    out.mux(a_out.encode(resampled))
+                out.mux(a_out.encode(None))
+
+    def concat(self, clip_paths: list[str], output_path: str) -> None:
+        import av
+
+        if not concat_compatible(clip_paths):
+            # Mismatched clips need real filter/encode work.
+            self._fallback.concat(clip_paths, output_path)
+            return
+
+        with _timed("concat", self.name, output_path):
+            with av.open(
+                output_path, "w", format="mp4", options={"movflags": "+faststart"},
+            ) as out:
+                out_streams: dict[str, object] = {}
+                last_dts: dict[str, int] = {}
+                offset_seconds = 0.0
+                for path in clip_paths:
+                    with av.open(path) as inp:
+                        streams = [s for s in inp.streams if s.type in ("video", "audio")]
+                        for stream in streams:
+                            if stream.type not in out_streams:
+                                out_streams[stream.type] = out.add_stream_from_template(stream)
+                        clip_end = 0.0
+                        shifts: dict[str, int] = {}
+                        for packet in inp.demux(*streams):
+                            if packet.dts is None:
+                                continue
+                            kind = packet.stream.type
+                            base = packet.stream.time_base
+                            if kind not in shifts:
+                                # Start at the running offset, but never before the
+                                # previous clip's last dts (B-frame clips start < 0).
+                                shifts[kind] = round(offset_seconds / base)
+                                if kind in last_dts:
+                                    shifts[kind] = max(
+                                        shifts[kind], last_dts[kind] + 1 - packet.dts,
+                                    )
+                            end = float(
+                                ((packet.pts if packet.pts is not None else packet.dts)
+                                 + (packet.duration or 0)) * base
+                            )
+                            clip_end = max(clip_end, end)
+                            packet.dts += shifts[kind]
+                            if packet.pts is not None:
+                                packet.pts += shifts[kind]
+                            if kind in last_dts and packet.dts <= last_dts[kind]:
+                                packet.dts = last_dts[kind] + 1
+                            last_dts[kind] = packet.dts
+                            packet.stream = out_streams[kind]
+                            out.mux(packet)
+                        offset_seconds += clip_end
+
+    def retime(
+        self,
+        input_path: str,
+        output_path: str,
+        target_seconds: float,
+        mode: str = DEFAULT_RETIME_MODE,
+    ) -> None:
+        """Stretch a clip by rewriting packet timestamps (no decode).
+
+        The clip's own audio is dropped: narration replaces it at mux time.
+        """
+        import av
+
+        if mode != "timestamps":
+            self._fallback.retime(input_path, output_path, target_seconds, mode)
+            return
+
+        with _timed("retime", self.name, output_path):
+            duration_actual = probe_video_duration(input_path)
+            if not duration_actual:
+                shutil.copyfile(input_path, output_path)
+                return
+            factor = target_seconds / duration_actual
+            with av.open(input_path) as inp, av.open(output_path, "w", format="mp4") as out:
+                v_in = inp.streams.video[0]
+                v_out = out.add_stream_from_template(v_in)
+                last_dts = None
+                for packet in inp.demux(v_in):
+                    if packet.dts is None:
+                        continue
+                    dts = round(packet.dts * factor)
+                    if last_dts is not None and dts <= last_dts:
+                        dts = last_dts + 1
+                    last_dts = dts
+                    if packet.pts is not None:
+                        packet.pts = max(dts, round(packet.pts * factor))
+                    packet.dts = dts
+                    if packet.duration:
+                        packet.duration = max(1, round(packet.duration * factor))
+                    packet.stream = v_out
+                    out.mux(packet)
+
+
+# ---------------------------------------------------------------------------
+# Engine selection
+# ---------------------------------------------------------------------------
+
+_engines: dict[str, object] = {}
+_default_engine: str | None = None
+
+
+def set_default_engine(name: str | None) -> None:
+    """Override ``$PIPELINE_MEDIA_ENGINE`` for this process (e.g. from a CLI flag)."""
+    global _default_engine
+    if name is not None and name.lower() not in ENGINE_CHOICES:
+        raise ValueError(
+            f"Unknown media engine {name!r}. Available: {', '.join(ENGINE_CHOICES)}"
+        )
+    _default_engine = name
+
+
+def get_engine(name: str | None = None):
+    """Return the assembly engine *name* (default: ``$PIPELINE_MEDIA_ENGINE``)."""
+    name = (
+        name or _default_engine or os.getenv("PIPELINE_MEDIA_ENGINE") or "auto"
+    ).lower()
+    if name not in ENGINE_CHOICES:
+        raise ValueError(
+            f"Unknown media engine {name!r}. Available: {', '.join(ENGINE_CHOICES)}"
+        )
+    if name not in _engines:
+        if name == "ffmpeg":
+            _engines[name] = FfmpegEngine()
+        elif name == "pyav":
+            _engines[name] = PyAVEngine()
+        else:
+            try:
+                _engines[name] = PyAVEngine()
+            except ImportError:
+                _engines[name] = FfmpegEngine()
+            logging.info("Assembly: using %s engine", _engines[name].name)
+    return _engines[name]
@@ -0,0 +1,230 @@
+"""Parallel tree concat for clips whose parameters differ.
+
+A plain concat of mismatched clips re-encodes the whole timeline in one
+ffmpeg process.  :func:`tree_concat` instead:
+
+1. picks the stream parameters most clips already share as the target
+   (:func:`~media_service.mp4_probe.stream_signature`, which includes the
+   frame duration and codec configuration),
+2. splits the clips into contiguous groups and, for every group in
+   parallel, re-encodes only the clips that differ from the target and
+   stream-copies the group into one segment,
+3. stream-copies the segments into the output.
+
+Clips can only be copied into one stream when their parameter sets
+match, and our encoder's rarely match another encoder's: when a
+normalised clip still differs from the target, its parameters become the
+target and every clip is normalised.
+
+Each group runs in its own ffmpeg processes, so the encode work scales
+with the number of workers (``PIPELINE_CONCAT_WORKERS``, default: the CPU
+count) and the final join is a cheap copy.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import logging
+import math
+import os
+import shutil
+import tempfile
+
+from .mp4_probe import MediaProbeError, probe_mp4, stream_signature
+
+# Codecs the normalising re-encode can produce.
+ENCODERS = {"avc1": "libx264"}
+AUDIO_ENCODERS = {"mp4a": "aac"}
+
+
+def concat_workers() -> int:
+    raw = os.getenv("PIPELINE_CONCAT_WORKERS", "").strip()
+    if raw:
+        return max(1, int(raw))
+    return os.cpu_count() or 1
+
+
+class _NotNormalised(RuntimeError):
+    """A re-encoded clip still differs from the target parameters."""
+
+
+def _signature(path: str) -> tuple | None:
+    """Stream signature of *path*, or None when it cannot be fully probed."""
+    try:
+        info = probe_mp4(path)
+    except (MediaProbeError, OSError):
+        return None
+    if info.video is None or info.video.config is None:
+        return None
+    return stream_signature(info)
+
+
+def _normalise_args(
+    source: str,
+    output: str,
+    target: tuple,
+    has_audio: bool,
+    threads: int,
+) -> list[str]:
+    (codec, width, height, timescale, frame_delta, _config), audio = target
+    args = ["-i", source]
+    if audio and not has_audio:
+        _, sample_rate, channels, _config = audio
+        layout = "mono" if channels == 1 else "stereo"
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={sample_rate}:cl={layout}", "-shortest"]
+    args += [
+        "-map", "0:v:0",
+        "-vf",
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1",
+        "-c:v", ENCODERS[codec],
+        "-preset", "veryfast",
+        "-pix_fmt", "yuv420p",
+        "-threads", str(threads),
+        "-video_track_timescale", str(timescale),
+    ]
+    if frame_delta:
+        # Frame durations must match too, or the copied joins get bad dts.
+        args += ["-r", f"{timescale}/{frame_delta}"]
+    if audio:
+        audio_codec, sample_rate, channels, _config = audio
+        args += [
+            "-map", "1:a:0" if not has_audio else "0:a:0",
+            "-c:a", AUDIO_ENCODERS[audio_codec],
+            "-ar", str(sample_rate),
+            "-ac", str(channels),
+        ]
+    else:
+        args += ["-an"]
+    return args + [output]
+
+
+def _concat_copy(paths: list[str], output: str, *, faststart: bool = False) -> None:
+    from .assembly import run_ffmpeg
+
+    if len(paths) == 1 and not faststart:
+        shutil.copyfile(paths[0], output)
+        return
+    list_path = output + ".txt"
+    with open(list_path, "w", encoding="utf-8") as handle:
+        for path in paths:
+            handle.write(f"file '{os.path.abspath(path)}'\n")
+    flags = ["-movflags", "+faststart"] if faststart else []
+    try:
+        run_ffmpeg(
+            ["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", *flags, output],
+            "concat",
+        )
+    finally:
+        os.unlink(list_path)
+
+
+def _normalise(
+    path: str, signature: tuple, target: tuple, output: str, threads: int,
+) -> tuple | None:
+    """Re-encode *path* to the *target* parameters; return what it produced."""
+    from .assembly import run_ffmpeg
+
+    run_ffmpeg(
+        _normalise_args(path, output, target, signature[1] is not None, threads),
+        "normalise",
+    )
+    return _signature(output)
+
+
+def _build_segment(
+    index: int,
+    clips: list[tuple[int, str, tuple]],
+    target: tuple,
+    normalised: dict[int, str],
+    work_dir: str,
+    threads: int,
+) -> str:
+    """Normalise the mismatched clips of one group and copy it into a segment."""
+    parts: list[str] = []
+    for position, path, signature in clips:
+        if position in normalised:
+            parts.append(normalised[position])
+            continue
+        if signature == target:
+            parts.append(path)
+            continue
+        output = os.path.join(work_dir, f"norm_{position:06d}.mp4")
+        if _normalise(path, signature, target, output, threads) != target:
+            raise _NotNormalised(path)
+        parts.append(output)
+    if len(parts) == 1:
+        return parts[0]
+    segment = os.path.join(work_dir, f"segment_{index:04d}.mp4")
+    _concat_copy(parts, segment)
+    return segment
+
+
+def tree_concat(
+    clip_paths: list[str],
+    output_path: str,
+    *,
+    workers: int | None = None,
+) -> bool:
+    """Concatenate mismatched *clip_paths* in parallel groups.
+
+    Returns False, without writing anything, when the clips cannot be
+    normalised (unknown codecs, or files that cannot be fully probed and
+    so could lose their audio); the caller then falls back to a single
+    re-encoding concat.
+    """
+    signatures = [_signature(path) for path in clip_paths]
+    if None in signatures:
+        return False
+    target = collections.Counter(signatures).most_common(1)[0][0]
+    (video_codec, *_), audio = target
+    if video_codec not in ENCODERS or (audio and audio[0] not in AUDIO_ENCODERS):
+        return False
+
+    workers = workers or concat_workers()
+    group_size = max(1, math.ceil(len(clip_paths) / (workers * 2)))
+    clips = list(zip(range(len(clip_paths)), clip_paths, signatures))
+    groups = [clips[start:start + group_size] for start in range(0, len(clips), group_size)]
+    threads = max(1, (os.cpu_count() or 1) // min(workers, len(groups)))
+    work_dir = tempfile.mkdtemp(
+        prefix="concat-tree-", dir=os.path.dirname(os.path.abspath(output_path)),
+    )
+    try:
+        # Normalise one clip up front to learn whether our encode can join
+        # the target clips, or whether everything must match our encode.
+        normalised: dict[int, str] = {}
+        first = next((i for i, sig in enumerate(signatures) if sig != target), None)
+        if first is not None:
+            output = os.path.join(work_dir, f"norm_{first:06d}.mp4")
+            produced = _normalise(clip_paths[first], signatures[first], target, output, threads)
+            if produced is None:
+                return False
+            if produced != target:
+                logging.info("Assembly: normalised clips differ from the target, re-encoding all")
+                target = produced
+            normalised[first] = output
+        logging.info(
+            "Assembly: tree concat of %d clips (%d re-encoded) in %d groups on %d workers",
+            len(clip_paths),
+            sum(1 for i, sig in enumerate(signatures) if i == first or sig != target),
+            len(groups),
+            workers,
+        )
+        # The work runs in ffmpeg child processes; threads only dispatch it.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            segments = list(
+                pool.map(
+                    lambda item: _build_segment(
+                        item[0], item[1], target, normalised, work_dir, threads,
+                    ),
+                    enumerate(groups),
+                )
+            )
+        _concat_copy(segments, output_path, faststart=True)
+    except _NotNormalised as exc:
+        logging.warning("Assembly: could not normalise %s for a copy join", exc)
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
@@ -0,0 +1,180 @@
+"""Live HLS (fMP4) playlist of a run's scenes as they finish.
+
+Each muxed scene clip is cut into fMP4 segments with a stream-copy ffmpeg
+pass and appended to ``index.m3u8`` behind an ``EXT-X-DISCONTINUITY`` and
+its own ``EXT-X-MAP`` init segment, so clips with different parameters
+can follow each other.  The playlist is an ``EVENT`` playlist: players
+can start on the first scene while later ones are still rendering, and
+:meth:`HlsPlaylist.close` (or :func:`close_playlist` from another process)
+adds ``EXT-X-ENDLIST`` when the run ends.
+
+``EXT-X-TARGETDURATION`` may not change within a playlist (RFC 8216,
+4.3.3.1), so it is fixed when the playlist is created.  Stream copy can
+only cut at keyframes, so a clip whose keyframes are further apart than
+the target is cut again with keyframes forced at every segment boundary.
+
+Segment durations are probed from the segments themselves
+(:func:`~media_service.mp4_probe.probe_segment_duration`).  ffmpeg's own
+``EXTINF`` values do not follow clips whose timestamps were rewritten by
+retiming, and ``EXTINF``, the timeline offset of the next clip and the
+target-duration check all need the real ones.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+
+from .assembly import _timed, run_ffmpeg
+from .mp4_probe import probe_segment_duration
+
+PLAYLIST_NAME = "index.m3u8"
+DEFAULT_SEGMENT_SECONDS = 4.0
+ENDLIST = "#EXT-X-ENDLIST"
+
+MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    os.replace(tmp, path)
+
+
+def _parse_segments(playlist_path: str) -> list[tuple[float, str]]:
+    """``(EXTINF duration, uri)`` pairs of a media playlist written by ffmpeg."""
+    segments: list[tuple[float, str]] = []
+    duration = None
+    with open(playlist_path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",", 1)[0])
+            elif line and not line.startswith("#") and duration is not None:
+                segments.append((duration, line))
+                duration = None
+    return segments
+
+
+class HlsPlaylist:
+    """Append clips to a live fMP4 HLS playlist in *directory*."""
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    ) -> None:
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.path = os.path.join(directory, PLAYLIST_NAME)
+        self.closed = False
+        self.target_duration = math.ceil(segment_seconds)
+        self._elapsed = 0.0
+        self._entries: list[tuple[str, list[tuple[float, str]]]] = []
+        os.makedirs(directory, exist_ok=True)
+        self._write()
+
+    def append(self, clip_path: str, name: str) -> None:
+        """Segment *clip_path* as ``<name>_NNN.m4s`` and publish it."""
+        if self.closed:
+            raise RuntimeError("HLS playlist is closed")
+        init_name = f"{name}_init.mp4"
+        segments = self._segment(clip_path, name, init_name, ["-c", "copy"])
+        if any(round(duration) > self.target_duration for duration, _ in segments):
+            for _, uri in segments:
+                os.unlink(os.path.join(self.directory, uri))
+            segments = self._segment(
+                clip_path,
+                name,
+                init_name,
+                [
+                    "-c:v", "libx264",
+                    "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds:g})",
+                    "-c:a", "copy",
+                ],
+            )
+        self._entries.append((init_name, segments))
+        self._elapsed += sum(duration for duration, _ in segments)
+        self._write()
+
+    def _segment(
+        self, clip_path: str, name: str, init_name: str, codec_args: list[str],
+    ) -> list[tuple[float, str]]:
+        clip_playlist = os.path.join(self.directory, f"{name}.m3u8")
+        with _timed("hls", "ffmpeg", clip_playlist):
+            run_ffmpeg(
+                [
+                    "-i", clip_path,
+                    *codec_args,
+                    # Continue the timeline so players that ignore
+                    # discontinuities still see increasing timestamps.
+                    "-output_ts_offset", f"{self._elapsed:.6f}",
+                    "-f", "hls",
+                    "-hls_time", f"{self.segment_seconds:g}",
+                    "-hls_playlist_type", "vod",
+                    "-hls_segment_type", "fmp4",
+                    "-hls_fmp4_init_filename", init_name,
+                    "-hls_segment_filename", os.path.join(self.directory, f"{name}_%03d.m4s"),
+                    clip_playlist,
+                ],
+                "hls",
+            )
+        try:
+            listed = _parse_segments(clip_playlist)
+        finally:
+            os.unlink(clip_playlist)
+        init_path = os.path.join(self.directory, init_name)
+        segments = []
+        for fallback, uri in listed:
+            duration = probe_segment_duration(os.path.join(self.directory, uri), init_path)
+            segments.append((duration or fallback, uri))
+        return segments
+
+    def close(self) -> None:
+        """Mark the playlist complete; players stop polling for more."""
+        if not self.closed:
+            self.closed = True
+            self._write()
+
+    def _write(self) -> None:
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:7",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+        ]
+        for index, (init_name, segments) in enumerate(self._entries):
+            if index:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f'#EXT-X-MAP:URI="{init_name}"')
+            for duration, uri in segments:
+                lines.append(f"#EXTINF:{duration:.6f},")
+                lines.append(uri)
+        if self.closed:
+            lines.append(ENDLIST)
+        _write_atomic(self.path, "\n".join(lines) + "\n")
+
+
+def close_playlist(directory: str) -> bool:
+    """Append ``EXT-X-ENDLIST`` to the playlist in *directory* if it is open.
+
+    For the API, after a run's process has exited (possibly without closing
+    its own playlist).  Returns True when the playlist was changed.
+    """
+    path = os.path.join(directory, PLAYLIST_NAME)
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as handle:
+        text = handle.read()
+    if ENDLIST in text:
+        return False
+    _write_atomic(path, text.rstrip("\n") + f"\n{ENDLIST}\n")
+    return True
@@ -0,0 +1,65 @@
+"""Ken Burns clips: a slow zoom or pan over a still image.
+
+Used as the local fallback when a scene's video generation fails or runs
+out of time: the scene image is animated with ffmpeg's ``zoompan`` filter
+for exactly the narration length, so no retime is needed afterwards.
+"""
+
+from __future__ import annotations
+
+from .assembly import _timed, run_ffmpeg
+
+DEFAULT_SIZE = (1280, 720)
+DEFAULT_FPS = 24
+MAX_ZOOM = 1.25
+
+
+def _motions(frames: int) -> list[tuple[str, str, str]]:
+    """``(zoom, x, y)`` zoompan expressions: zoom in, zoom out, pan right."""
+    step = (MAX_ZOOM - 1.0) / max(1, frames)
+    centre_x = "iw/2-(iw/zoom/2)"
+    centre_y = "ih/2-(ih/zoom/2)"
+    return [
+        (f"1+{step:.6f}*on", centre_x, centre_y),
+        (f"{MAX_ZOOM}-{step:.6f}*on", centre_x, centre_y),
+        (f"{MAX_ZOOM}", f"(iw-iw/zoom)*on/{max(1, frames)}", centre_y),
+    ]
+
+
+def render_kenburns(
+    image_path: str,
+    output_path: str,
+    seconds: float,
+    *,
+    size: tuple[int, int] = DEFAULT_SIZE,
+    fps: int = DEFAULT_FPS,
+    variant: int = 0,
+) -> None:
+    """Render *seconds* of H.264 video panning over *image_path*.
+
+    *variant* picks the motion (cycling zoom in, zoom out and pan) so
+    neighbouring fallback scenes don't all move the same way.
+    """
+    width, height = size
+    frames = max(1, round(seconds * fps))
+    zoom, x, y = _motions(frames)[variant % 3]
+    # Upscale before zoompan: it crops on whole pixels, which jitters at 1x.
+    video_filter = (
+        f"scale={width * 2}:{height * 2}:force_original_aspect_ratio=increase,"
+        f"crop={width * 2}:{height * 2},"
+        f"zoompan=z='{zoom}':x='{x}':y='{y}':d={frames}:s={width}x{height}:fps={fps},"
+        "format=yuv420p"
+    )
+    with _timed("kenburns", "ffmpeg", output_path):
+        run_ffmpeg(
+            [
+                "-i", image_path,
+                "-vf", video_filter,
+                "-frames:v", str(frames),
+                "-c:v", "libx264",
+                "-preset", "veryfast",
+                "-r", str(fps),
+                output_path,
+            ],
+            "ken burns",
+        )
@@ -0,0 +1,447 @@
+"""Minimal ISO-BMFF (MP4/MOV) reader for clip metadata.
+
+Reads only box headers and the few ``moov`` boxes we need (``mvhd``,
+``tkhd``, ``mdhd``, ``hdlr``, ``stsd``, ``stts``) through a memory map, so
+probing a clip costs microseconds and never touches ``mdat`` payload.
+Fragmented media segments (``moof``: ``tfhd``/``trun``) are read the same
+way, against their init segment.
+Durations are exact (``duration / timescale``), unlike the centisecond
+``Duration:`` line printed by ``ffmpeg -i``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import mmap
+import struct
+from dataclasses import dataclass, field
+
+# Boxes that only contain other boxes and are descended into.
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# Decoder configuration boxes inside a video sample entry.
+_VIDEO_CONFIGS = {b"avcC", b"hvcC", b"av1C", b"vpcC"}
+
+
+class MediaProbeError(RuntimeError):
+    """Raised when a file is not a readable ISO-BMFF container."""
+
+
+@dataclass
+class TrackInfo:
+    """Metadata for one track (``trak`` box)."""
+
+    track_id: int
+    kind: str  # "video", "audio" or the raw handler type
+    codec: str | None = None
+    timescale: int = 0
+    duration: int = 0
+    width: int | None = None
+    height: int | None = None
+    sample_rate: int | None = None
+    channels: int | None = None
+    sample_count: int | None = None
+    # Duration of most samples (frames, for video), in timescale units.
+    sample_delta: int | None = None
+    # Decoder configuration: the avcC/hvcC/... payload for video (profile,
+    # level, chroma format, SPS/PPS), the esds object type and
+    # AudioSpecificConfig for audio.
+    config: bytes | None = None
+
+    @property
+    def duration_seconds(self) -> float | None:
+        if not self.timescale:
+            return None
+        return self.duration / self.timescale
+
+    @property
+    def frame_rate(self) -> float | None:
+        seconds = self.duration_seconds
+        if not seconds or not self.sample_count:
+            return None
+        return self.sample_count / seconds
+
+
+@dataclass
+class MediaInfo:
+    """Container-level metadata from ``mvhd`` plus per-track details."""
+
+    timescale: int
+    duration: int
+    tracks: list[TrackInfo] = field(default_factory=list)
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.duration / self.timescale if self.timescale else 0.0
+
+    @property
+    def video(self) -> TrackInfo | None:
+        return next((t for t in self.tracks if t.kind == "video"), None)
+
+    @property
+    def audio(self) -> TrackInfo | None:
+        return next((t for t in self.tracks if t.kind == "audio"), None)
+
+
+def _iter_boxes(buf, start: int, end: int):
+    """Yield ``(type, payload_start, box_end)`` for boxes in ``buf[start:end]``."""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                break
+            (size,) = struct.unpack_from(">Q", buf, offset + 8)
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise MediaProbeError(f"Corrupt box {box_type!r} at offset {offset}")
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _full_box_version(buf, start: int) -> int:
+    return buf[start]
+
+
+def _parse_mvhd(buf, start: int) -> tuple[int, int]:
+    if _full_box_version(buf, start) == 1:
+        return struct.unpack_from(">IQ", buf, start + 4 + 16)
+    return struct.unpack_from(">II", buf, start + 4 + 8)
+
+
+def _parse_tkhd(buf, start: int, track: TrackInfo) -> None:
+    version = _full_box_version(buf, start)
+    if version == 1:
+        (track.track_id,) = struct.unpack_from(">I", buf, start + 4 + 16)
+        tail = start + 4 + 16 + 4 + 4 + 8
+    else:
+        (track.track_id,) = struct.unpack_from(">I", buf, start + 4 + 8)
+        tail = start + 4 + 8 + 4 + 4 + 4
+    # reserved(8) layer(2) alternate_group(2) volume(2) reserved(2) matrix(36)
+    width, height = struct.unpack_from(">II", buf, tail + 8 + 8 + 36)
+    if width or height:
+        track.width = width >> 16
+        track.height = height >> 16
+
+
+def _parse_mdhd(buf, start: int, track: TrackInfo) -> None:
+    if _full_box_version(buf, start) == 1:
+        track.timescale, track.duration = struct.unpack_from(">IQ", buf, start + 4 + 16)
+    else:
+        track.timescale, track.duration = struct.unpack_from(">II", buf, start + 4 + 8)
+
+
+def _parse_hdlr(buf, start: int, track: TrackInfo) -> None:
+    handler = bytes(buf[start + 8:start + 12])
+    track.kind = {b"vide": "video", b"soun": "audio"}.get(
+        handler, handler.decode("latin-1")
+    )
+
+
+def _read_descriptor(buf, offset: int, end: int) -> tuple[int, int, int]:
+    """Return ``(tag, payload_start, payload_end)`` of an MPEG-4 descriptor."""
+    tag = buf[offset]
+    offset += 1
+    size = 0
+    for _ in range(4):
+        byte = buf[offset]
+        offset += 1
+        size = (size << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return tag, offset, min(offset + size, end)
+
+
+def _parse_esds(buf, start: int, end: int) -> bytes | None:
+    """Object type plus AudioSpecificConfig of an ``esds`` box.
+
+    Bitrates and buffer sizes are skipped: they differ between encodes of
+    streams that still concatenate fine.
+    """
+    tag, offset, es_end = _read_descriptor(buf, start + 4, end)
+    if tag != 0x03:  # ES_Descriptor
+        return None
+    flags = buf[offset + 2]
+    offset += 3  # ES_ID(2) flags(1)
+    if flags & 0x80:
+        offset += 2
+    if flags & 0x40:
+        offset += 1 + buf[offset]
+    if flags & 0x20:
+        offset += 2
+    tag, offset, config_end = _read_descriptor(buf, offset, es_end)
+    if tag != 0x04:  # DecoderConfigDescriptor
+        return None
+    object_type = bytes(buf[offset:offset + 1])
+    offset += 13  # objectTypeIndication(1) streamType(1) buffer(3) bitrates(8)
+    if offset < config_end:
+        tag, payload, payload_end = _read_descriptor(buf, offset, config_end)
+        if tag == 0x05:  # DecoderSpecificInfo
+            return object_type + bytes(buf[payload:payload_end])
+    return object_type
+
+
+def _parse_sample_config(buf, start: int, end: int, track: TrackInfo) -> None:
+    try:
+        for box_type, payload, box_end in _iter_boxes(buf, start, end):
+            if track.kind == "video" and box_type in _VIDEO_CONFIGS:
+                track.config = bytes(buf[payload:box_end])
+            elif track.kind == "audio" and box_type == b"esds":
+                track.config = _parse_esds(buf, payload, box_end)
+            elif box_type == b"wave":  # QuickTime wraps esds in a wave box
+                _parse_sample_config(buf, payload, box_end, track)
+    except (MediaProbeError, IndexError, struct.error):
+        pass  # config stays unknown; concat_compatible then refuses the clip
+
+
+def _parse_stsd(buf, start: int, end: int, track: TrackInfo) -> None:
+    entries = start + 8  # version/flags(4) entry_count(4)
+    if entries + 8 > end:
+        return
+    (entry_size,) = struct.unpack_from(">I", buf, entries)
+    entry_end = min(entries + entry_size, end)
+    codec = bytes(buf[entries + 4:entries + 8])
+    track.codec = codec.decode("latin-1")
+    sample_entry = entries + 8 + 6 + 2  # reserved(6) data_reference_index(2)
+    if track.kind == "video":
+        # pre_defined/reserved(16) then width(2) height(2)
+        width, height = struct.unpack_from(">HH", buf, sample_entry + 16)
+        track.width, track.height = width, height
+        # resolutions(8) reserved(4) frame_count(2) compressorname(32) depth(2) pre_defined(2)
+        _parse_sample_config(buf, sample_entry + 16 + 4 + 50, entry_end, track)
+    elif track.kind == "audio":
+        # version(2) reserved(6) channelcount(2) samplesize(2) pre_defined(2)
+        # reserved(2) samplerate(4), plus 16 or 36 bytes in QuickTime v1/v2
+        (version,) = struct.unpack_from(">H", buf, sample_entry)
+        (channels,) = struct.unpack_from(">H", buf, sample_entry + 8)
+        (rate,) = struct.unpack_from(">I", buf, sample_entry + 16)
+        track.channels = channels
+        track.sample_rate = rate >> 16
+        extra = {1: 16, 2: 36}.get(version, 0)
+        _parse_sample_config(buf, sample_entry + 20 + extra, entry_end, track)
+
+
+def _parse_stts(buf, start: int, track: TrackInfo) -> None:
+    (entry_count,) = struct.unpack_from(">I", buf, start + 4)
+    total = 0
+    most = 0
+    for index in range(entry_count):
+        count, delta = struct.unpack_from(">II", buf, start + 8 + index * 8)
+        total += count
+        if count > most:
+            most, track.sample_delta = count, delta
+    track.sample_count = total
+
+
+def _walk(buf, start: int, end: int, info: MediaInfo, track: TrackInfo | None) -> None:
+    for box_type, payload, box_end in _iter_boxes(buf, start, end):
+        if box_type == b"mvhd":
+            info.timescale, info.duration = _parse_mvhd(buf, payload)
+        elif box_type == b"trak":
+            child = TrackInfo(track_id=0, kind="unknown")
+            _walk(buf, payload, box_end, info, child)
+            info.tracks.append(child)
+        elif track is None:
+            if box_type in _CONTAINERS:
+                _walk(buf, payload, box_end, info, None)
+        elif box_type == b"tkhd":
+            _parse_tkhd(buf, payload, track)
+        elif box_type == b"mdhd":
+            _parse_mdhd(buf, payload, track)
+        elif box_type == b"hdlr":
+            _parse_hdlr(buf, payload, track)
+        elif box_type == b"stsd":
+            _parse_stsd(buf, payload, box_end, track)
+        elif box_type == b"stts":
+            _parse_stts(buf, payload, track)
+        elif box_type in _CONTAINERS:
+            _walk(buf, payload, box_end, info, track)
+
+
+@contextlib.contextmanager
+def _mapped(path: str):
+    with open(path, "rb") as handle:
+        try:
+            buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:  # empty file
+            raise MediaProbeError(f"{path}: empty file") from exc
+    try:
+        yield buf
+    except struct.error as exc:
+        raise MediaProbeError(f"{path}: truncated box ({exc})") from exc
+    finally:
+        buf.close()
+
+
+def probe_mp4(path: str) -> MediaInfo:
+    """Return :class:`MediaInfo` for the MP4/MOV file at *path*."""
+    with _mapped(path) as buf:
+        info = MediaInfo(timescale=0, duration=0)
+        for box_type, payload, box_end in _iter_boxes(buf, 0, len(buf)):
+            if box_type == b"moov":
+                _walk(buf, payload, box_end, info, None)
+                break
+        else:
+            raise MediaProbeError(f"{path}: no moov box")
+        if not info.timescale:
+            raise MediaProbeError(f"{path}: missing mvhd")
+        return info
+
+
+def _track_defaults(buf, start: int, end: int) -> dict[int, int]:
+    """Map track id to its ``trex`` default sample duration (``moov/mvex``)."""
+    defaults = {}
+    for box_type, payload, box_end in _iter_boxes(buf, start, end):
+        if box_type == b"mvex":
+            for child, child_payload, _ in _iter_boxes(buf, payload, box_end):
+                if child == b"trex":
+                    track_id, _index, duration = struct.unpack_from(
+                        ">III", buf, child_payload + 4,
+                    )
+                    defaults[track_id] = duration
+    return defaults
+
+
+def _parse_tfhd(buf, start: int) -> tuple[int, int | None]:
+    """Return ``(track_id, default_sample_duration or None)``."""
+    flags = int.from_bytes(buf[start + 1:start + 4], "big")
+    (track_id,) = struct.unpack_from(">I", buf, start + 4)
+    offset = start + 8
+    if flags & 0x01:  # base-data-offset
+        offset += 8
+    if flags & 0x02:  # sample-description-index
+        offset += 4
+    if flags & 0x08:  # default-sample-duration
+        return track_id, struct.unpack_from(">I", buf, offset)[0]
+    return track_id, None
+
+
+def _trun_duration(buf, start: int, default: int) -> int:
+    flags = int.from_bytes(buf[start + 1:start + 4], "big")
+    (count,) = struct.unpack_from(">I", buf, start + 4)
+    if not flags & 0x100:  # no per-sample durations
+        return count * default
+    offset = start + 8
+    if flags & 0x01:  # data-offset
+        offset += 4
+    if flags & 0x04:  # first-sample-flags
+        offset += 4
+    # duration, size, flags, composition offset: 4 bytes each when present
+    stride = 4 * sum(1 for bit in (0x100, 0x200, 0x400, 0x800) if flags & bit)
+    return sum(
+        struct.unpack_from(">I", buf, offset + index * stride)[0] for index in range(count)
+    )
+
+
+def probe_segment_duration(segment_path: str, init_path: str) -> float | None:
+    """Return the video duration of a fragmented MP4 media segment, or None.
+
+    *segment_path* holds ``moof``/``mdat`` pairs (an fMP4 HLS ``.m4s``);
+    the video track's id, timescale and default sample duration come from
+    its init segment *init_path*.  Sample durations are summed from the
+    ``trun`` boxes, so rewritten timestamps are measured as they play.
+    """
+    try:
+        info = probe_mp4(init_path)
+        video = info.video
+        if video is None or not video.timescale:
+            return None
+        with _mapped(init_path) as buf:
+            moov = next(
+                (payload, end) for kind, payload, end in _iter_boxes(buf, 0, len(buf))
+                if kind == b"moov"
+            )
+            trex_default = _track_defaults(buf, *moov).get(video.track_id, 0)
+        total = 0
+        with _mapped(segment_path) as buf:
+            for box_type, payload, box_end in _iter_boxes(buf, 0, len(buf)):
+                if box_type != b"moof":
+                    continue
+                for traf, traf_payload, traf_end in _iter_boxes(buf, payload, box_end):
+                    if traf != b"traf":
+                        continue
+                    default = trex_default
+                    track_id = None
+                    for child, child_payload, _ in _iter_boxes(buf, traf_payload, traf_end):
+                        if child == b"tfhd":
+                            track_id, tfhd_default = _parse_tfhd(buf, child_payload)
+                            if tfhd_default is not None:
+                                default = tfhd_default
+                        elif child == b"trun" and track_id == video.track_id:
+                            total += _trun_duration(buf, child_payload, default)
+    except (MediaProbeError, OSError, StopIteration):
+        return None
+    return total / video.timescale or None
+
+
+def probe_duration(path: str) -> float | None:
+    """Return the exact container duration of *path* in seconds, or None."""
+    try:
+        return probe_mp4(path).duration_seconds or None
+    except (MediaProbeError, OSError):
+        return None
+
+
+def probe_video_duration(path: str) -> float | None:
+    """Return the duration of the video track of *path* in seconds, or None.
+
+    Unlike :func:`probe_duration` this ignores the audio track, which can
+    outlast the picture in generated clips.  Falls back to the container
+    duration when the track carries no usable ``mdhd``.
+    """
+    try:
+        info = probe_mp4(path)
+    except (MediaProbeError, OSError):
+        return None
+    video = info.video
+    if video is not None and video.duration_seconds:
+        return video.duration_seconds
+    return info.duration_seconds or None
+
+
+def _stream_signature(track: TrackInfo | None) -> tuple | None:
+    if track is None:
+        return None
+    if track.kind == "video":
+        return (
+            track.codec,
+            track.width,
+            track.height,
+            track.timescale,
+            track.sample_delta,
+            track.config,
+        )
+    return (track.codec, track.sample_rate, track.channels, track.config)
+
+
+def stream_signature(info: MediaInfo) -> tuple:
+    """Key under which two clips can be joined by stream copy.
+
+    Covers the video codec, its configuration (profile, level, chroma
+    format, parameter sets), resolution, timescale and frame duration, and
+    the audio codec, object type, sample rate and channel layout.
+    """
+    return (_stream_signature(info.video), _stream_signature(info.audio))
+
+
+def concat_compatible(paths: list[str]) -> bool:
+    """True when every clip can be joined with the concat demuxer + stream copy.
+
+    All clips must share one :func:`stream_signature` (all lacking audio
+    counts as matching audio).  A video track whose decoder configuration
+    could not be read is never assumed compatible.
+    """
+    signatures = set()
+    for path in paths:
+        try:
+            info = probe_mp4(path)
+        except (MediaProbeError, OSError):
+            return False
+        if info.video is not None and info.video.config is None:
+            return False
+        signatures.add(stream_signature(info))
+        if len(signatures) > 1:
+            return False
+    return True
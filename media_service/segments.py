@@ -0,0 +1,94 @@
+"""Incremental, hierarchical concatenation of clips that arrive in order.
+
+:class:`SegmentConcat` lets long runs concatenate as they go instead of in
+one call over every clip at the end.  Clips are grouped into segments of
+``batch_size``; once ``batch_size`` segments exist they are joined into
+one segment a level up, like carries in a counter.  Each concat call then
+sees at most ``batch_size`` inputs, inputs are deleted as soon as they
+are joined, and only ``O(batch_size * log(n))`` paths are held at a time.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable
+
+DEFAULT_BATCH_SIZE = 32
+
+
+class SegmentConcat:
+    """Concatenate clips added in order into *work_dir* segments.
+
+    *concat* joins a list of paths into one output (default: the current
+    assembly engine).  With *keep_inputs* the added clips are left on disk;
+    intermediate segments are always removed.
+    """
+
+    def __init__(
+        self,
+        work_dir: str,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concat: Callable[[list[str], str], None] | None = None,
+        keep_inputs: bool = False,
+    ) -> None:
+        if batch_size < 2:
+            raise ValueError("batch_size must be at least 2")
+        if concat is None:
+            from .assembly import get_engine
+
+            concat = lambda paths, output: get_engine().concat(paths, output)  # noqa: E731
+        self.work_dir = work_dir
+        self.batch_size = batch_size
+        self.keep_inputs = keep_inputs
+        self.count = 0
+        self._concat = concat
+        # levels[0] holds added clips, levels[k] segments of batch_size**k clips.
+        self._levels: list[list[str]] = [[]]
+        self._segments = 0
+        os.makedirs(work_dir, exist_ok=True)
+
+    def add(self, path: str) -> None:
+        """Append *path*; join full levels into a segment one level up."""
+        self._levels[0].append(path)
+        self.count += 1
+        level = 0
+        while len(self._levels[level]) >= self.batch_size:
+            segment = self._join(self._levels[level], level)
+            self._levels[level] = []
+            if level + 1 == len(self._levels):
+                self._levels.append([])
+            self._levels[level + 1].append(segment)
+            level += 1
+
+    def finish(self, output_path: str) -> None:
+        """Join everything added so far, in order, into *output_path*."""
+        # Higher levels hold the earlier clips.
+        pending = [
+            (path, level)
+            for level in range(len(self._levels) - 1, -1, -1)
+            for path in self._levels[level]
+        ]
+        self._levels = [[]]
+        if not pending:
+            raise RuntimeError("No clips to concatenate")
+        paths = [path for path, _ in pending]
+        self._concat(paths, output_path)
+        for path, level in pending:
+            self._discard(path, level)
+
+    def _join(self, paths: list[str], level: int) -> str:
+        self._segments += 1
+        segment = os.path.join(
+            self.work_dir, f"segment_{level + 1}_{self._segments:06d}.mp4",
+        )
+        self._concat(paths, segment)
+        for path in paths:
+            self._discard(path, level)
+        return segment
+
+    def _discard(self, path: str, level: int) -> None:
+        if level == 0 and self.keep_inputs:
+            return
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1 @@
+"""Shared runtime support for the pipeline service packages."""
@@ -0,0 +1,188 @@
+"""Cancellation of a running pipeline from outside the process.
+
+The API cancels a run by marking it ``cancelled`` in the run index and
+sending ``SIGTERM`` to the process running it (the ``cli.py`` subprocess
+or a warm worker).  While :func:`handle_sigterm` is active that signal:
+
+  - cancels the remote work: every fal queue request registered through
+    :func:`fal_request` is cancelled with ``fal_client.cancel`` so it stops
+    billing;
+  - kills ffmpeg children started through :func:`child_process`;
+  - cancels every task of the running asyncio loop, or raises
+    :class:`RunCancelled` in synchronous code.
+
+Code that starts new work calls :func:`check` first, so nothing new is
+submitted once a run is cancelled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import subprocess
+import threading
+from typing import Callable, Iterator
+
+# Exit status of a cancelled run (128 + SIGTERM, as if killed by it).
+EXIT_CODE = 128 + signal.SIGTERM
+
+_cancelled = threading.Event()
+_lock = threading.Lock()
+_fal_requests: dict[str, str] = {}  # request_id -> application
+_children: set[subprocess.Popen] = set()
+
+
+class RunCancelled(BaseException):
+    """The run was cancelled; a BaseException so retry loops don't swallow it."""
+
+
+def is_cancelled() -> bool:
+    return _cancelled.is_set()
+
+
+def check() -> None:
+    """Raise :class:`RunCancelled` if the run has been cancelled."""
+    if _cancelled.is_set():
+        raise RunCancelled()
+
+
+def reset() -> None:
+    """Forget a previous run's cancellation (warm workers run many jobs)."""
+    _cancelled.clear()
+    with _lock:
+        _fal_requests.clear()
+        _children.clear()
+
+
+@contextlib.contextmanager
+def fal_request(application: str) -> Iterator[Callable[[str], None]]:
+    """Track one fal queue request; call the yielded function with its id."""
+    request_ids: list[str] = []
+
+    def enqueued(request_id: str) -> None:
+        with _lock:
+            _fal_requests[request_id] = application
+        request_ids.append(request_id)
+        if _cancelled.is_set():
+            _cancel_fal(application, request_id)
+
+    try:
+        yield enqueued
+    finally:
+        with _lock:
+            for request_id in request_ids:
+                _fal_requests.pop(request_id, None)
+
+
+@contextlib.contextmanager
+def child_process(process: subprocess.Popen) -> Iterator[subprocess.Popen]:
+    """Track *process* so cancellation kills it."""
+    with _lock:
+        _children.add(process)
+    try:
+        if _cancelled.is_set():
+            process.kill()
+        yield process
+    finally:
+        with _lock:
+            _children.discard(process)
+
+
+def process_start_time(pid: int) -> int | None:
+    """Start time of live process *pid* in clock ticks since boot, or None.
+
+    Read from ``/proc/<pid>/stat`` (Linux); None when the process is gone,
+    a zombie, or ``/proc`` is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="ascii", errors="replace") as handle:
+            stat = handle.read()
+    except OSError:
+        return None
+    # The command name (field 2) may contain spaces; fields resume after ")".
+    fields = stat.rsplit(")", 1)[-1].split()
+    if len(fields) < 20 or fields[0] in ("Z", "X"):
+        return None
+    return int(fields[19])
+
+
+def same_process(pid: int, started: int | None) -> bool | None:
+    """Whether *pid* is still the process that started at *started*.
+
+    Guards against signalling an unrelated process that reused the pid of
+    one that exited.  None when it cannot be told: no start time was
+    recorded or ``/proc`` is unavailable.
+    """
+    if started is None or not os.path.isdir("/proc"):
+        return None
+    return process_start_time(pid) == started
+
+
+def _cancel_fal(application: str, request_id: str) -> None:
+    from pipeline_runtime import providers
+
+    try:
+        providers.fal_sdk().cancel(application, request_id)
+    except Exception as exc:
+        logging.warning("Cancel: fal request %s not cancelled: %s", request_id, exc)
+    else:
+        logging.info("Cancel: fal request %s cancelled", request_id)
+
+
+def cancel() -> None:
+    """Mark the run cancelled, cancel fal requests and kill ffmpeg children."""
+    _cancelled.set()
+    with _lock:
+        requests = list(_fal_requests.items())
+        children = list(_children)
+    for process in children:
+        with contextlib.suppress(OSError):
+            process.kill()
+    # The cancel calls are HTTP requests; keep them off the signal handler.
+    for request_id, application in requests:
+        threading.Thread(
+            target=_cancel_fal, args=(application, request_id),
+            name="fal-cancel", daemon=True,
+        ).start()
+
+
+def _cancel_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    for task in asyncio.all_tasks(loop):
+        task.cancel()
+
+
+@contextlib.contextmanager
+def handle_sigterm(confirm: Callable[[], bool] | None = None) -> Iterator[None]:
+    """Turn SIGTERM into a cancellation of the enclosed run.
+
+    *confirm* is asked before cancelling, so a signal meant for a run that
+    already finished (its process now running another job) is ignored.
+    Only installs the handler on the main thread; elsewhere it is a no-op.
+    """
+    reset()
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _handler(signum: int, frame: object) -> None:
+        if _cancelled.is_set():
+            return
+        if confirm is not None and not confirm():
+            logging.warning("Cancel: ignoring SIGTERM, run is not marked cancelled")
+            return
+        logging.warning("Cancel: run cancelled, stopping in-flight work")
+        cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            raise RunCancelled() from None
+        loop.call_soon_threadsafe(_cancel_tasks, loop)
+
+    previous = signal.signal(signal.SIGTERM, _handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,357 @@
+"""Process-shared pipeline metrics in the Prometheus text format.
+
+Each pipeline process (CLI run or warm worker) keeps its counters, gauges
+and histograms in memory and periodically writes them to a snapshot file
+under ``$PIPELINE_METRICS_DIR``.  The API's ``/metrics`` endpoint merges
+all snapshots: counters and histograms are summed (snapshots of exited
+processes are folded into ``archive.json`` so totals survive), gauges
+only count processes that are still alive.
+
+No client library is needed; :func:`render` emits the exposition format
+directly.  ``PIPELINE_METRICS=off`` disables recording.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+STAGES = (
+    "extract",
+    "prompt",
+    "voice_clone",
+    "tts",
+    "image",
+    "video",
+    "download",
+    "retime",
+    "mux",
+    "concat",
+)
+
+# Seconds; provider calls run from sub-second (prompts) to minutes (video).
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, math.inf)
+
+METRICS = {
+    "pipeline_stage_seconds": (
+        "histogram", "Duration of one unit of work per pipeline stage.",
+    ),
+    "pipeline_provider_errors_total": (
+        "counter", "Failed provider calls by provider.",
+    ),
+    "pipeline_provider_retries_total": (
+        "counter", "Provider calls retried after a failure.",
+    ),
+    "pipeline_provider_inflight": (
+        "gauge", "Provider calls currently in flight.",
+    ),
+    "pipeline_downloaded_bytes_total": (
+        "counter", "Bytes downloaded from provider result URLs.",
+    ),
+    "pipeline_generate_deduplicated_total": (
+        "counter", "/generate submissions answered with an existing run.",
+    ),
+    "pipeline_admission_rejected_total": (
+        "counter", "/generate submissions rejected with 429 by admission control.",
+    ),
+}
+
+# Minimum seconds between snapshot writes for counter/histogram updates.
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_ARCHIVE = "archive.json"
+
+
+def default_metrics_dir() -> str:
+    return os.getenv(
+        "PIPELINE_METRICS_DIR",
+        os.path.join(tempfile.gettempdir(), "pipeline-metrics"),
+    )
+
+
+def _enabled() -> bool:
+    return os.getenv("PIPELINE_METRICS", "on").lower() not in ("0", "off", "false")
+
+
+def labels_key(**labels: str) -> str:
+    """Series key for a label set (also used for :func:`render`'s extra gauges)."""
+    return json.dumps(sorted(labels.items()))
+
+
+class MetricsStore:
+    """In-memory metrics of one process, mirrored to a snapshot file."""
+
+    def __init__(self, metrics_dir: str | None = None) -> None:
+        self.metrics_dir = metrics_dir or default_metrics_dir()
+        self._path = os.path.join(
+            self.metrics_dir, f"proc-{os.getpid()}-{uuid.uuid4().hex[:8]}.json",
+        )
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, float]] = {}
+        self._gauges: dict[str, dict[str, float]] = {}
+        self._histograms: dict[str, dict[str, list[float]]] = {}
+        self._last_flush = 0.0
+        self._dirty = False
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = labels_key(**labels)
+            series[key] = series.get(key, 0.0) + value
+            self._dirty = True
+        self.flush()
+
+    def gauge_add(self, name: str, delta: float, **labels: str) -> None:
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            key = labels_key(**labels)
+            series[key] = series.get(key, 0.0) + delta
+            self._dirty = True
+        # Gauges are read as current state, so never leave them stale.
+        self.flush(force=True)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = labels_key(**labels)
+            # [bucket counts..., sum, count]
+            state = series.setdefault(key, [0.0] * (len(STAGE_BUCKETS) + 2))
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+            self._dirty = True
+        self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        """Write the snapshot file if anything changed (throttled unless *force*)."""
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty or (not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS):
+                return
+            snapshot = {
+                "pid": os.getpid(),
+                "counters": self._counters,
+                "gauges": self._gauges,
+                "histograms": self._histograms,
+            }
+            payload = json.dumps(snapshot)
+            self._dirty = False
+            self._last_flush = now
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, self._path)
+        except OSError as exc:
+            logging.debug("Metrics: could not write snapshot: %s", exc)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide helpers
+# ---------------------------------------------------------------------------
+
+_store: MetricsStore | None = None
+_store_pid: int | None = None
+
+
+def get_store() -> MetricsStore | None:
+    """Return this process's store (recreated after fork), or None when disabled."""
+    global _store, _store_pid
+    if not _enabled():
+        return None
+    if _store is None or _store_pid != os.getpid():
+        _store = MetricsStore()
+        _store_pid = os.getpid()
+        atexit.register(_store.flush, True)
+    return _store
+
+
+def flush() -> None:
+    store = get_store()
+    if store is not None:
+        store.flush(force=True)
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    store = get_store()
+    if store is not None:
+        store.inc(name, value, **labels)
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Observe the wall time of the enclosed block as one *stage* sample."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        store = get_store()
+        if store is not None:
+            store.observe("pipeline_stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+@contextlib.contextmanager
+def provider_call(provider: str) -> Iterator[None]:
+    """Track one in-flight *provider* call and count it as an error if it raises."""
+    store = get_store()
+    if store is None:
+        yield
+        return
+    store.gauge_add("pipeline_provider_inflight", 1, provider=provider)
+    try:
+        yield
+    except Exception:
+        store.inc("pipeline_provider_errors_total", provider=provider)
+        raise
+    finally:
+        store.gauge_add("pipeline_provider_inflight", -1, provider=provider)
+
+
+# ---------------------------------------------------------------------------
+# Aggregation (API side)
+# ---------------------------------------------------------------------------
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(into: dict[str, Any], snapshot: dict[str, Any], *, gauges: bool) -> None:
+    for name, series in snapshot.get("counters", {}).items():
+        target = into["counters"].setdefault(name, {})
+        for key, value in series.items():
+            target[key] = target.get(key, 0.0) + value
+    for name, series in snapshot.get("histograms", {}).items():
+        target = into["histograms"].setdefault(name, {})
+        for key, state in series.items():
+            if key in target:
+                target[key] = [a + b for a, b in zip(target[key], state)]
+            else:
+                target[key] = list(state)
+    if gauges:
+        for name, series in snapshot.get("gauges", {}).items():
+            target = into["gauges"].setdefault(name, {})
+            for key, value in series.items():
+                target[key] = target.get(key, 0.0) + value
+
+
+def _empty() -> dict[str, Any]:
+    return {"counters": {}, "gauges": {}, "histograms": {}}
+
+
+def collect(metrics_dir: str | None = None) -> dict[str, Any]:
+    """Merge every process snapshot, folding exited processes into the archive."""
+    metrics_dir = metrics_dir or default_metrics_dir()
+    os.makedirs(metrics_dir, exist_ok=True)
+    merged = _empty()
+    lock_path = os.path.join(metrics_dir, "archive.lock")
+    archive_path = os.path.join(metrics_dir, _ARCHIVE)
+    with open(lock_path, "a+") as lock_handle:
+        if fcntl is not None:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(archive_path, "r", encoding="utf-8") as handle:
+                    archive = json.load(handle)
+            except (FileNotFoundError, json.JSONDecodeError):
+                archive = _empty()
+            archived_any = False
+            for name in sorted(os.listdir(metrics_dir)):
+                if not (name.startswith("proc-") and name.endswith(".json")):
+                    continue
+                path = os.path.join(metrics_dir, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as handle:
+                        snapshot = json.load(handle)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                if _pid_alive(int(snapshot.get("pid", 0))):
+                    _merge(merged, snapshot, gauges=True)
+                else:
+                    _merge(archive, snapshot, gauges=False)
+                    os.unlink(path)
+                    archived_any = True
+            if archived_any:
+                tmp_path = f"{archive_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(archive, handle)
+                os.replace(tmp_path, archive_path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+    _merge(merged, archive, gauges=False)
+    return merged
+
+
+def _format_labels(labels: list[list[str]], extra: tuple[str, str] | None = None) -> str:
+    pairs = [tuple(pair) for pair in labels]
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(
+    merged: dict[str, Any],
+    extra_gauges: dict[str, tuple[str, dict[str, float]]] | None = None,
+) -> str:
+    """Render merged metrics (plus API-side gauges) as Prometheus text.
+
+    *extra_gauges* maps a metric name to ``(help, {labels_key: value})``.
+    """
+    lines: list[str] = []
+    for name, (kind, help_text) in METRICS.items():
+        section = {"counter": "counters", "gauge": "gauges", "histogram": "histograms"}[kind]
+        series = merged[section].get(name, {})
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key in sorted(series):
+            labels = json.loads(key)
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series[key])}")
+                continue
+            state = series[key]
+            for bound, count in zip(STAGE_BUCKETS, state):
+                le = _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {_format_value(count)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(state[-1])}")
+    for name, (help_text, series) in (extra_gauges or {}).items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key in sorted(series):
+            lines.append(f"{name}{_format_labels(json.loads(key))} {_format_value(series[key])}")
+    return "\n".join(lines) + "\n"
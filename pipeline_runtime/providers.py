@@ -0,0 +1,134 @@
+"""Provider selection: the real SDKs or the offline stubs in :mod:`stub_providers`.
+
+``PIPELINE_PROVIDERS=stub`` switches every provider to its local stub;
+``PIPELINE_PROVIDERS=openai=stub,fal=stub`` switches only the named ones.
+The pipeline CLI's ``--stub-providers`` flag does the same for one run via
+:func:`configure`.
+
+Callers obtain SDK entry points through :func:`openai_client`,
+:func:`gradium_client`, :func:`gradium_sdk` and :func:`fal_sdk` instead of
+importing the SDKs directly; the stubs mirror the small part of each SDK
+the pipeline uses.  While a recording is replayed (:mod:`pipeline_runtime.recording`) the stubs
+stand in for every SDK and no API keys are required.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable
+
+from pipeline_runtime import recording
+
+PROVIDERS = ("openai", "gradium", "fal")
+
+API_KEY_ENV = {
+    "openai": "OPENAI_API_KEY",
+    "gradium": "GRADIUM_API_KEY",
+    "fal": "FAL_KEY",
+}
+
+_override: set[str] | None = None
+_clients: dict[tuple[str, bool, str | None], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def configure(stub: bool | list[str] | None) -> None:
+    """Force stubs for all (``True``) or the listed providers; ``None`` defers to env."""
+    global _override
+    if stub is None or stub is False:
+        _override = None
+    elif stub is True:
+        _override = set(PROVIDERS)
+    else:
+        _override = set(stub)
+
+
+def _from_env() -> set[str]:
+    raw = os.getenv("PIPELINE_PROVIDERS", "").strip().lower()
+    if not raw or raw == "live":
+        return set()
+    if raw == "stub":
+        return set(PROVIDERS)
+    stubbed = set()
+    for item in raw.split(","):
+        name, _, mode = item.partition("=")
+        if mode.strip() == "stub":
+            stubbed.add(name.strip())
+    return stubbed
+
+
+def is_stubbed(provider: str) -> bool:
+    if _override is not None:
+        return provider in _override
+    return provider in _from_env()
+
+
+def missing_api_keys(providers: tuple[str, ...] = PROVIDERS) -> list[str]:
+    """Return the API key variables that live (non-stubbed) *providers* lack."""
+    if recording.is_replaying():
+        return []
+    return [
+        API_KEY_ENV[provider]
+        for provider in providers
+        if not is_stubbed(provider) and not os.getenv(API_KEY_ENV[provider])
+    ]
+
+
+def _use_stub(provider: str) -> bool:
+    return is_stubbed(provider) or recording.is_replaying()
+
+
+def _cached(provider: str, build: Callable[[], Any]) -> Any:
+    """One client per process, per stub/live mode and API key.
+
+    Warm workers run many jobs; rebuilding a client per job would throw
+    away its connection pool along with the TLS handshakes behind it.
+    """
+    key = (provider, _use_stub(provider), os.getenv(API_KEY_ENV[provider]))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = build()
+        return client
+
+
+def openai_client() -> Any:
+    return _cached("openai", _build_openai_client)
+
+
+def _build_openai_client() -> Any:
+    if _use_stub("openai"):
+        from stub_providers.llm import StubOpenAI
+
+        return StubOpenAI()
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+def gradium_client() -> Any:
+    """Return the process-wide ``GradiumClient`` (or stub client)."""
+    return _cached("gradium", lambda: gradium_sdk().client.GradiumClient())
+
+
+def gradium_sdk() -> Any:
+    """Return the ``gradium`` module or its stub (``client`` and ``voices``)."""
+    if _use_stub("gradium"):
+        from stub_providers import tts
+
+        return tts
+    import gradium
+
+    return gradium
+
+
+def fal_sdk() -> Any:
+    """Return the ``fal_client`` module or its stub."""
+    if _use_stub("fal"):
+        from stub_providers import fal
+
+        return fal
+    import fal_client
+
+    return fal_client
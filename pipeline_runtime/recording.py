@@ -0,0 +1,249 @@
+"""Record and replay provider traffic as JSONL.
+
+With ``PIPELINE_RECORD=session.jsonl`` (or the CLI's ``--record``) every
+provider call made through :func:`call` / :func:`acall` is appended to the
+file as one line: provider, operation, request, response, wall time and
+error.  Result files downloaded by the pipeline are kept next to it in
+``session.jsonl.files/`` so a replay needs no network at all.
+
+With ``PIPELINE_REPLAY=session.jsonl`` (``--replay``) calls are answered
+from the recording instead: an exact request match first, otherwise the
+next unused entry for the same provider and operation (so small prompt
+changes don't break a replay).  Each response is delayed by its recorded
+latency divided by ``PIPELINE_REPLAY_SPEED`` (default 1; 0 disables the
+delay).  A call with nothing left to replay raises :class:`ReplayMiss`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable
+
+_lock = threading.Lock()
+_record_path: str | None = None
+_replay: "_Replay | None" = None
+_speed = 1.0
+_configured = False
+
+
+class ReplayMiss(RuntimeError):
+    """The recording holds no response for a replayed call."""
+
+
+def _key(provider: str, op: str, request: Any) -> str:
+    canonical = json.dumps([provider, op, request], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+class _Replay:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.by_key: dict[str, deque] = defaultdict(deque)
+        self.by_op: dict[tuple[str, str], deque] = defaultdict(deque)
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry["used"] = False
+                self.by_key[entry["key"]].append(entry)
+                self.by_op[(entry["provider"], entry["op"])].append(entry)
+
+    def take(self, provider: str, op: str, key: str) -> dict[str, Any]:
+        with _lock:
+            queue = self.by_key.get(key)
+            while queue:
+                entry = queue.popleft()
+                if not entry["used"]:
+                    entry["used"] = True
+                    return entry
+            queue = self.by_op.get((provider, op))
+            while queue:
+                entry = queue.popleft()
+                if not entry["used"]:
+                    entry["used"] = True
+                    logging.warning(
+                        "Replay: no exact match for %s %s, using next recorded response",
+                        provider,
+                        op,
+                    )
+                    return entry
+        raise ReplayMiss(f"No recorded {provider} {op} response left in {self.path}")
+
+
+def configure(
+    record: str | None = None,
+    replay: str | None = None,
+    speed: float | None = None,
+) -> None:
+    """Set record/replay for this process; unset values fall back to the env."""
+    global _record_path, _replay, _speed, _configured
+    if record and replay:
+        raise ValueError("Recording and replaying at the same time is not supported.")
+    record = record or os.getenv("PIPELINE_RECORD") or None
+    replay = replay or os.getenv("PIPELINE_REPLAY") or None
+    _record_path = os.path.abspath(record) if record and not replay else None
+    _replay = _Replay(replay) if replay else None
+    _speed = speed if speed is not None else float(os.getenv("PIPELINE_REPLAY_SPEED", "1"))
+    _configured = True
+    if _record_path:
+        os.makedirs(_files_dir(_record_path), exist_ok=True)
+        logging.info("Recording provider traffic to %s", _record_path)
+    if _replay:
+        logging.info("Replaying provider traffic from %s (speed x%g)", replay, _speed)
+
+
+def _ensure_configured() -> None:
+    if not _configured:
+        configure()
+
+
+def is_replaying() -> bool:
+    _ensure_configured()
+    return _replay is not None
+
+
+def _files_dir(path: str) -> str:
+    return f"{path}.files"
+
+
+def _append(entry: dict[str, Any]) -> None:
+    line = json.dumps(entry, default=str)
+    with _lock:
+        with open(_record_path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+def _replay_delay(entry: dict[str, Any]) -> float:
+    return entry.get("seconds", 0.0) / _speed if _speed > 0 else 0.0
+
+
+def _result(entry: dict[str, Any]) -> Any:
+    if entry.get("error"):
+        raise RuntimeError(f"Replayed {entry['provider']} error: {entry['error']}")
+    return entry["response"]
+
+
+def call(
+    provider: str,
+    op: str,
+    request: Any,
+    fn: Callable[[], Any],
+    *,
+    encode: Callable[[Any], Any] = lambda value: value,
+    decode: Callable[[Any], Any] = lambda value: value,
+) -> Any:
+    """Run (or replay) one provider call; *request* must be JSON-serialisable."""
+    _ensure_configured()
+    key = _key(provider, op, request)
+    if _replay is not None:
+        entry = _replay.take(provider, op, key)
+        delay = _replay_delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return decode(_result(entry))
+    if _record_path is None:
+        return fn()
+    start = time.perf_counter()
+    try:
+        response = fn()
+    except Exception as exc:
+        _append(_entry(provider, op, key, request, None, start, exc))
+        raise
+    _append(_entry(provider, op, key, request, encode(response), start, None))
+    return response
+
+
+async def acall(
+    provider: str,
+    op: str,
+    request: Any,
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    encode: Callable[[Any], Any] = lambda value: value,
+    decode: Callable[[Any], Any] = lambda value: value,
+) -> Any:
+    """Async variant of :func:`call`."""
+    _ensure_configured()
+    key = _key(provider, op, request)
+    if _replay is not None:
+        entry = _replay.take(provider, op, key)
+        delay = _replay_delay(entry)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return decode(_result(entry))
+    if _record_path is None:
+        return await fn()
+    start = time.perf_counter()
+    try:
+        response = await fn()
+    except Exception as exc:
+        _append(_entry(provider, op, key, request, None, start, exc))
+        raise
+    _append(_entry(provider, op, key, request, encode(response), start, None))
+    return response
+
+
+def _entry(
+    provider: str,
+    op: str,
+    key: str,
+    request: Any,
+    response: Any,
+    start: float,
+    error: Exception | None,
+) -> dict[str, Any]:
+    return {
+        "provider": provider,
+        "op": op,
+        "key": key,
+        "request": request,
+        "response": response,
+        "seconds": round(time.perf_counter() - start, 4),
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        "recorded_at": time.time(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Downloaded result files
+# ---------------------------------------------------------------------------
+
+def replay_file(url: str) -> str | None:
+    """Path of the recorded copy of *url* when replaying, else None."""
+    _ensure_configured()
+    if _replay is None:
+        return None
+    path = os.path.join(_files_dir(_replay.path), _url_key(url))
+    if not os.path.exists(path):
+        raise ReplayMiss(f"No recorded download for {url}")
+    return path
+
+
+def keep_file(url: str, path: str) -> None:
+    """Store a downloaded file alongside the recording."""
+    _ensure_configured()
+    if _record_path is None:
+        return
+    shutil.copyfile(path, os.path.join(_files_dir(_record_path), _url_key(url)))
+
+
+def encode_bytes(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode_bytes(text: str) -> bytes:
+    return base64.b64decode(text)
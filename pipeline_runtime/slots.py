@@ -0,0 +1,285 @@
+"""Cross-process provider slot broker.
+
+Every pipeline process (one per ``/generate`` run) shares a single budget
+of concurrent calls per provider, so five parallel runs still respect the
+FAL, OpenAI and Gradium rate limits instead of multiplying them.
+
+State lives in one small JSON file per provider, guarded by an advisory
+``fcntl`` lock, so no daemon is needed and a crashed process cannot leak
+slots: entries whose pid is gone are reaped on the next acquisition.
+
+Scheduling, whenever a slot frees up:
+  1. lower priority class first (``interactive`` < ``standard`` < ``batch``),
+     with waiters aging one class up every ``aging_seconds`` so batch runs
+     are never starved;
+  2. then the run currently holding the fewest slots (fair share per run);
+  3. then FIFO by enqueue time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator
+
+from pipeline_runtime import tracing
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+PROVIDERS = ("fal", "openai", "gradium")
+
+# Default global slot budget per provider (across all processes).
+DEFAULT_LIMITS = {"fal": 3, "openai": 4, "gradium": 2}
+
+PRIORITY_CLASSES = {"interactive": 0, "standard": 1, "batch": 2}
+DEFAULT_PRIORITY = "standard"
+
+DEFAULT_POLL_SECONDS = 0.05
+DEFAULT_AGING_SECONDS = 30.0
+
+
+def default_state_dir() -> str:
+    return os.getenv(
+        "PIPELINE_SLOT_DIR",
+        os.path.join(tempfile.gettempdir(), "pipeline-slots"),
+    )
+
+
+def limits_from_env() -> dict[str, int]:
+    """Return per-provider limits, overridable via ``PIPELINE_<PROVIDER>_SLOTS``."""
+    limits = dict(DEFAULT_LIMITS)
+    for provider in PROVIDERS:
+        raw = os.getenv(f"PIPELINE_{provider.upper()}_SLOTS")
+        if raw:
+            limits[provider] = max(1, int(raw))
+    return limits
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SlotBroker:
+    """File-backed broker handing out provider slots to cooperating processes."""
+
+    def __init__(
+        self,
+        state_dir: str | None = None,
+        limits: dict[str, int] | None = None,
+        *,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        aging_seconds: float = DEFAULT_AGING_SECONDS,
+    ) -> None:
+        self.state_dir = state_dir or default_state_dir()
+        self.limits = limits or limits_from_env()
+        self.poll_seconds = poll_seconds
+        self.aging_seconds = aging_seconds
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    # -- state file -----------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _locked_state(self, provider: str) -> Iterator[dict[str, Any]]:
+        lock_path = os.path.join(self.state_dir, f"{provider}.lock")
+        state_path = os.path.join(self.state_dir, f"{provider}.json")
+        with open(lock_path, "a+") as lock_handle:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(state_path, "r", encoding="utf-8") as handle:
+                        state = json.load(handle)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {}
+                state.setdefault("holders", [])
+                state.setdefault("waiters", [])
+                yield state
+                tmp_path = f"{state_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(state, handle)
+                os.replace(tmp_path, state_path)
+            finally:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+    def _rank(self, ticket: dict, now: float, held: dict[str, int]) -> tuple:
+        waited = now - ticket["enqueued"]
+        aged = int(waited / self.aging_seconds) if self.aging_seconds > 0 else 0
+        return (
+            max(0, ticket["priority"] - aged),
+            held.get(ticket["run"], 0),
+            ticket["enqueued"],
+        )
+
+    def _schedule(self, provider: str, state: dict[str, Any]) -> None:
+        """Reap dead entries and move waiters into free slots."""
+        state["holders"] = [t for t in state["holders"] if _pid_alive(t["pid"])]
+        state["waiters"] = [t for t in state["waiters"] if _pid_alive(t["pid"])]
+        limit = self.limits.get(provider, 1)
+        now = time.time()
+        while state["waiters"] and len(state["holders"]) < limit:
+            held: dict[str, int] = {}
+            for ticket in state["holders"]:
+                held[ticket["run"]] = held.get(ticket["run"], 0) + 1
+            state["waiters"].sort(key=lambda t: self._rank(t, now, held))
+            state["holders"].append(state["waiters"].pop(0))
+
+    # -- ticket lifecycle -----------------------------------------------------
+
+    def _ticket(self, run_id: str, priority: str) -> dict:
+        return {
+            "id": uuid.uuid4().hex,
+            "run": run_id,
+            "pid": os.getpid(),
+            "priority": PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES[DEFAULT_PRIORITY]),
+            "enqueued": time.time(),
+        }
+
+    def _enqueue(self, provider: str, ticket: dict) -> None:
+        with self._locked_state(provider) as state:
+            state["waiters"].append(ticket)
+
+    def _poll(self, provider: str, ticket: dict) -> bool:
+        with self._locked_state(provider) as state:
+            self._schedule(provider, state)
+            return any(t["id"] == ticket["id"] for t in state["holders"])
+
+    def _release(self, provider: str, ticket: dict) -> None:
+        with self._locked_state(provider) as state:
+            state["holders"] = [t for t in state["holders"] if t["id"] != ticket["id"]]
+            state["waiters"] = [t for t in state["waiters"] if t["id"] != ticket["id"]]
+            self._schedule(provider, state)
+
+    def snapshot(self, provider: str) -> dict[str, Any]:
+        """Return current holders/waiters for *provider* (for status endpoints)."""
+        with self._locked_state(provider) as state:
+            self._schedule(provider, state)
+            return {
+                "limit": self.limits.get(provider, 1),
+                "in_use": len(state["holders"]),
+                "waiting": len(state["waiters"]),
+            }
+
+    @contextlib.contextmanager
+    def slot(self, provider: str, run_id: str, priority: str) -> Iterator[None]:
+        """Block until a *provider* slot is granted, release it on exit."""
+        ticket = self._ticket(run_id, priority)
+        self._enqueue(provider, ticket)
+        try:
+            waited_from = tracing.mark()
+            if not self._poll(provider, ticket):
+                while not self._poll(provider, ticket):
+                    time.sleep(self.poll_seconds)
+                tracing.record(
+                    f"{provider} slot wait", "slot", waited_from, resource=f"slot.{provider}",
+                )
+            yield
+        finally:
+            self._release(provider, ticket)
+
+    @contextlib.asynccontextmanager
+    async def async_slot(
+        self, provider: str, run_id: str, priority: str
+    ) -> AsyncIterator[None]:
+        """Async variant of :meth:`slot`; cancellation drops the ticket.
+
+        The lock and state file are only touched from worker threads, so a
+        contended ``flock`` never stalls the event loop.
+        """
+        ticket = self._ticket(run_id, priority)
+        enqueued = asyncio.ensure_future(asyncio.to_thread(self._enqueue, provider, ticket))
+        try:
+            await asyncio.shield(enqueued)
+            waited_from = tracing.mark()
+            if not await asyncio.to_thread(self._poll, provider, ticket):
+                while not await asyncio.to_thread(self._poll, provider, ticket):
+                    await asyncio.sleep(self.poll_seconds)
+                tracing.record(
+                    f"{provider} slot wait", "slot", waited_from, resource=f"slot.{provider}",
+                )
+            yield
+        finally:
+            # Shielded so a second cancellation cannot orphan the ticket.
+            await asyncio.shield(
+                asyncio.ensure_future(self._release_after(provider, ticket, enqueued))
+            )
+
+    async def _release_after(
+        self, provider: str, ticket: dict, enqueued: asyncio.Future,
+    ) -> None:
+        # A cancellation during the enqueue leaves its thread running; releasing
+        # before it lands would leave the ticket queued for a live pid.
+        with contextlib.suppress(Exception):
+            await enqueued
+        await asyncio.to_thread(self._release, provider, ticket)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide helpers
+# ---------------------------------------------------------------------------
+
+_broker: SlotBroker | None = None
+_run_id: str | None = None
+_priority: str | None = None
+
+
+def configure_run(run_id: str | None = None, priority: str | None = None) -> None:
+    """Set the run identity and priority class used for this process's slots."""
+    global _run_id, _priority
+    if priority is not None and priority not in PRIORITY_CLASSES:
+        raise ValueError(
+            f"Unknown priority {priority!r}. "
+            f"Available: {', '.join(PRIORITY_CLASSES)}"
+        )
+    if run_id is not None:
+        _run_id = run_id
+    if priority is not None:
+        _priority = priority
+
+
+def _identity() -> tuple[str, str]:
+    run_id = _run_id or os.getenv("PIPELINE_RUN_ID") or f"pid-{os.getpid()}"
+    priority = _priority or os.getenv("PIPELINE_PRIORITY") or DEFAULT_PRIORITY
+    return run_id, priority
+
+
+def get_broker() -> SlotBroker | None:
+    """Return the shared broker, or None when disabled or unsupported."""
+    global _broker
+    if fcntl is None or os.getenv("PIPELINE_SLOT_BROKER", "on").lower() in ("0", "off", "false"):
+        return None
+    if _broker is None:
+        _broker = SlotBroker()
+        logging.debug("Slot broker: state in %s, limits %s", _broker.state_dir, _broker.limits)
+    return _broker
+
+
+def slot(provider: str) -> contextlib.AbstractContextManager:
+    """Blocking context manager holding one global *provider* slot."""
+    broker = get_broker()
+    if broker is None:
+        return contextlib.nullcontext()
+    run_id, priority = _identity()
+    return broker.slot(provider, run_id, priority)
+
+
+def async_slot(provider: str) -> contextlib.AbstractAsyncContextManager:
+    """Async context manager holding one global *provider* slot."""
+    broker = get_broker()
+    if broker is None:
+        return contextlib.nullcontext()
+    run_id, priority = _identity()
+    return broker.async_slot(provider, run_id, priority)
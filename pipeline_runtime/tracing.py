@@ -0,0 +1,252 @@
+"""Per-run Chrome trace (``trace.json``) and critical-path summary.
+
+Spans are recorded as Chrome Trace Event "complete" events, one lane
+(``tid``) per scene plus a lane for run-level stages, so a run opened in
+Perfetto or ``chrome://tracing`` shows scenes side by side.  The scene a
+span belongs to comes from :func:`scene`, a context variable that follows
+asyncio tasks and ``asyncio.to_thread`` calls.
+
+Leaf spans carry a ``resource`` (``openai``, ``gradium``, ``fal.queue``,
+``fal.run``, ``download``, ``ffmpeg``, ...).  :func:`critical_path` walks
+back from the end of the run, always following the leaf span that finished
+last, and attributes wall time to resources; whatever is not covered by a
+leaf span is ``orchestration``.
+
+Tracing is off until :func:`start_run` is called, so library code can
+emit spans unconditionally.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+RUN_LANE = 0
+
+_scene_id: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "pipeline_trace_scene", default=None,
+)
+
+
+class Tracer:
+    """Collects the spans of one run."""
+
+    def __init__(self, run_id: str) -> None:
+        self.run_id = run_id
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._events: list[dict[str, Any]] = []
+        self._lanes: set[int] = {RUN_LANE}
+        self._lock = threading.Lock()
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def add(
+        self,
+        name: str,
+        cat: str,
+        start_us: float,
+        end_us: float,
+        args: dict[str, Any],
+    ) -> None:
+        scene_id = args.get("scene_id")
+        lane = int(scene_id) if scene_id is not None else RUN_LANE
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(max(0.0, end_us - start_us), 1),
+            "pid": self.pid,
+            "tid": lane,
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._lanes.add(lane)
+
+    def events(self) -> list[dict[str, Any]]:
+        with self._lock:
+            events = list(self._events)
+            lanes = sorted(self._lanes)
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": RUN_LANE,
+                "args": {"name": f"run {self.run_id}"},
+            }
+        ]
+        for lane in lanes:
+            metadata.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": lane,
+                    "args": {"name": "run" if lane == RUN_LANE else f"scene {lane}"},
+                }
+            )
+            metadata.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": lane,
+                    "args": {"sort_index": lane},
+                }
+            )
+        return metadata + sorted(events, key=lambda event: event["ts"])
+
+
+_tracer: Tracer | None = None
+
+
+def start_run(run_id: str) -> None:
+    """Begin collecting spans for *run_id* in this process."""
+    global _tracer
+    _tracer = Tracer(run_id)
+
+
+def finish_run(path: str) -> dict[str, Any] | None:
+    """Write the trace to *path*, stop tracing and return the critical-path summary."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    events = tracer.events()
+    summary = critical_path(events, wall_us=tracer.now_us())
+    payload = {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"run_id": tracer.run_id, "critical_path": summary},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle)
+    os.replace(tmp_path, path)
+    return summary
+
+
+@contextlib.contextmanager
+def scene(scene_id: int) -> Iterator[None]:
+    """Tag spans opened in this context (and its tasks/threads) with *scene_id*."""
+    token = _scene_id.set(int(scene_id))
+    try:
+        yield
+    finally:
+        _scene_id.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, cat: str, **args: Any) -> Iterator[dict[str, Any]]:
+    """Record the enclosed block as a span; yields its (mutable) args.
+
+    Pass ``resource=...`` to make it a leaf span on the critical path.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+    if "scene_id" not in args and _scene_id.get() is not None:
+        args["scene_id"] = _scene_id.get()
+    start = tracer.now_us()
+    try:
+        yield args
+    except BaseException as exc:
+        args["error"] = type(exc).__name__
+        raise
+    finally:
+        tracer.add(name, cat, start, tracer.now_us(), args)
+
+
+def mark() -> float | None:
+    """Current trace timestamp, for spans whose bounds come from callbacks."""
+    tracer = _tracer
+    return tracer.now_us() if tracer is not None else None
+
+
+def record(name: str, cat: str, start_us: float | None, **args: Any) -> None:
+    """Record a span from an earlier :func:`mark` up to now."""
+    tracer = _tracer
+    if tracer is None or start_us is None:
+        return
+    if "scene_id" not in args and _scene_id.get() is not None:
+        args["scene_id"] = _scene_id.get()
+    tracer.add(name, cat, start_us, tracer.now_us(), args)
+
+
+# ---------------------------------------------------------------------------
+# Critical path
+# ---------------------------------------------------------------------------
+
+def critical_path(events: list[dict[str, Any]], wall_us: float) -> dict[str, Any]:
+    """Attribute the run's wall time to the resources on its critical path."""
+    leaves = [
+        event for event in events
+        if event.get("ph") == "X" and "resource" in event.get("args", {})
+    ]
+    path: list[dict[str, Any]] = []
+    by_resource: dict[str, float] = {}
+    cursor = wall_us
+    while True:
+        candidates = [
+            event for event in leaves
+            if event["ts"] < cursor and event["ts"] + event["dur"] <= cursor + 1.0
+        ]
+        if not candidates:
+            break
+        event = max(candidates, key=lambda e: (e["ts"] + e["dur"], e["dur"]))
+        end = event["ts"] + event["dur"]
+        gap = cursor - end
+        if gap > 0:
+            by_resource["orchestration"] = by_resource.get("orchestration", 0.0) + gap
+        resource = event["args"]["resource"]
+        by_resource[resource] = by_resource.get(resource, 0.0) + event["dur"]
+        path.append(
+            {
+                "name": event["name"],
+                "resource": resource,
+                "scene_id": event["args"].get("scene_id"),
+                "start_seconds": round(event["ts"] / 1e6, 3),
+                "seconds": round(event["dur"] / 1e6, 3),
+            }
+        )
+        cursor = event["ts"]
+    if cursor > 0:
+        by_resource["orchestration"] = by_resource.get("orchestration", 0.0) + cursor
+
+    ranked = sorted(by_resource.items(), key=lambda item: item[1], reverse=True)
+    wall_seconds = wall_us / 1e6
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "bottleneck": ranked[0][0] if ranked else None,
+        "by_resource": {
+            name: {
+                "seconds": round(us / 1e6, 3),
+                "share": round(us / wall_us, 3) if wall_us else 0.0,
+            }
+            for name, us in ranked
+        },
+        "path": list(reversed(path)),
+    }
+
+
+def log_summary(summary: dict[str, Any] | None) -> None:
+    if not summary:
+        return
+    parts = [
+        f"{name} {item['share'] * 100:.0f}% ({item['seconds']:.1f}s)"
+        for name, item in summary["by_resource"].items()
+    ]
+    logging.info(
+        "Critical path (%.1fs wall): %s", summary["wall_seconds"], ", ".join(parts),
+    )
@@ -0,0 +1,82 @@
+"""Offline stand-ins for the OpenAI, Gradium and fal.ai SDKs.
+
+Selected through :mod:`pipeline_runtime.providers`.  Every stub call goes
+through :func:`simulate`, which adds configurable latency and injected
+failures so orchestration and assembly can be benchmarked without network
+access or API keys:
+
+  - ``PIPELINE_STUB_LATENCY``: seconds per call, or a ``min-max`` range
+    drawn uniformly (default ``0``);
+  - ``PIPELINE_STUB_ERROR_RATE``: probability in ``[0, 1]`` that a call
+    raises :class:`StubProviderError` (default ``0``);
+  - ``PIPELINE_STUB_<PROVIDER>_LATENCY`` / ``..._ERROR_RATE`` override both
+    for ``OPENAI``, ``GRADIUM`` or ``FAL``;
+  - ``PIPELINE_STUB_SEED`` makes latency and failures reproducible;
+  - ``PIPELINE_STUB_DIR`` holds generated images and clips.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+
+_rng = random.Random(os.getenv("PIPELINE_STUB_SEED"))
+
+
+class StubProviderError(RuntimeError):
+    """Failure injected by a stub provider."""
+
+
+def stub_dir() -> str:
+    path = os.getenv(
+        "PIPELINE_STUB_DIR",
+        os.path.join(tempfile.gettempdir(), "pipeline-stubs"),
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _setting(provider: str, name: str, default: str) -> str:
+    return os.getenv(
+        f"PIPELINE_STUB_{provider.upper()}_{name}",
+        os.getenv(f"PIPELINE_STUB_{name}", default),
+    )
+
+
+def latency_seconds(provider: str) -> float:
+    raw = _setting(provider, "LATENCY", "0").strip()
+    low, sep, high = raw.partition("-")
+    if sep:
+        return _rng.uniform(float(low), float(high))
+    return float(raw)
+
+
+def _maybe_fail(provider: str, what: str) -> None:
+    rate = float(_setting(provider, "ERROR_RATE", "0"))
+    if rate > 0 and _rng.random() < rate:
+        raise StubProviderError(f"Injected {provider} failure ({what})")
+
+
+def simulate(provider: str, what: str, interrupt: threading.Event | None = None) -> None:
+    """Sleep for the configured latency, then maybe raise an injected error.
+
+    Setting *interrupt* ends the sleep early with :class:`StubProviderError`.
+    """
+    delay = latency_seconds(provider)
+    if interrupt is not None:
+        if interrupt.wait(delay):
+            raise StubProviderError(f"{provider} request cancelled ({what})")
+    elif delay > 0:
+        time.sleep(delay)
+    _maybe_fail(provider, what)
+
+
+async def simulate_async(provider: str, what: str) -> None:
+    delay = latency_seconds(provider)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    _maybe_fail(provider, what)
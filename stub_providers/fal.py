@@ -0,0 +1,134 @@
+"""Stand-in for ``fal_client``: generated PNGs and ffmpeg ``testsrc`` clips.
+
+Results are ``file://`` URLs under :func:`stub_providers.stub_dir`, which
+the pipeline's downloader copies like any other URL.  Clips are rendered
+once per duration and reused.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+import uuid
+import zlib
+from typing import Any, Callable
+
+from media_service.assembly import run_ffmpeg
+
+from . import simulate, stub_dir
+
+IMAGE_SIZE = (320, 180)
+VIDEO_SIZE = "640x360"
+VIDEO_FPS = 24
+
+_render_lock = threading.Lock()
+_requests: dict[str, threading.Event] = {}
+
+
+class Queued:
+    def __init__(self, position: int = 0) -> None:
+        self.position = position
+
+
+class InProgress:
+    def __init__(self, logs: list | None = None) -> None:
+        self.logs = logs or []
+
+
+class Completed:
+    def __init__(self, logs: list | None = None) -> None:
+        self.logs = logs or []
+
+
+def write_png(path: str, seed: str, size: tuple[int, int] = IMAGE_SIZE) -> None:
+    """Write an RGB gradient PNG whose colours are derived from *seed*."""
+    width, height = size
+    r, g, b = hashlib.sha1(seed.encode("utf-8")).digest()[:3]
+    rows = b"".join(
+        b"\x00" + b"".join(bytes((r, (g + y) % 256, (b + x) % 256)) for x in range(width))
+        for y in range(height)
+    )
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    with open(path, "wb") as handle:
+        handle.write(b"\x89PNG\r\n\x1a\n")
+        handle.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        handle.write(chunk(b"IDAT", zlib.compress(rows)))
+        handle.write(chunk(b"IEND", b""))
+
+
+def _testsrc_clip(seconds: float) -> str:
+    path = os.path.join(stub_dir(), f"testsrc_{seconds:g}s.mp4")
+    with _render_lock:
+        if os.path.exists(path):
+            return path
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp.mp4"
+        run_ffmpeg(
+            [
+                "-f", "lavfi",
+                "-i", f"testsrc=duration={seconds:g}:size={VIDEO_SIZE}:rate={VIDEO_FPS}",
+                "-c:v", "libx264",
+                "-pix_fmt", "yuv420p",
+                tmp_path,
+            ],
+            "stub testsrc",
+        )
+        os.replace(tmp_path, path)
+    return path
+
+
+def _result(application: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    if "duration" in arguments or "video" in application or "vidu" in application:
+        seconds = float(str(arguments.get("duration", "5")).rstrip("s") or 5)
+        return {"video": {"url": f"file://{_testsrc_clip(seconds)}"}}
+    seed = f"{application}:{arguments.get('prompt', '')}"
+    name = hashlib.sha1(seed.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(stub_dir(), f"image_{name}.png")
+    if not os.path.exists(path):
+        write_png(path, seed)
+    if "swap_image_url" in arguments:
+        return {"image": {"url": f"file://{path}"}}
+    return {"images": [{"url": f"file://{path}"}]}
+
+
+def subscribe(
+    application: str,
+    arguments: dict[str, Any],
+    *,
+    with_logs: bool = False,
+    on_enqueue: Callable[[str], None] | None = None,
+    on_queue_update: Callable[[Any], None] | None = None,
+    **_: Any,
+) -> dict[str, Any]:
+    request_id = hashlib.sha1(os.urandom(8)).hexdigest()[:16]
+    cancelled = _requests[request_id] = threading.Event()
+    try:
+        if on_enqueue is not None:
+            on_enqueue(request_id)
+        if on_queue_update is not None:
+            on_queue_update(Queued())
+            on_queue_update(InProgress())
+        simulate("fal", application, interrupt=cancelled)
+    finally:
+        _requests.pop(request_id, None)
+    result = _result(application, arguments)
+    if on_queue_update is not None:
+        on_queue_update(Completed())
+    return result
+
+
+def cancel(application: str, request_id: str) -> None:
+    """Cancel a queued or running request; it fails instead of returning."""
+    cancelled = _requests.get(request_id)
+    if cancelled is not None:
+        cancelled.set()
+
+
+def upload_file(path: str) -> str:
+    simulate("fal", "upload_file")
+    return f"file://{os.path.abspath(path)}"
@@ -0,0 +1,92 @@
+"""Deterministic stand-in for the OpenAI Responses API.
+
+Answers the two structured-output requests the pipeline makes
+(``ExtractScenes`` and ``GeneratePrompt``) by parsing the prompt text the
+real model would see: the source text is split into sentence groups, one
+per requested scene, and scene prompts are the style prefix followed by
+the scene summary.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from types import SimpleNamespace
+from typing import Any
+
+from . import simulate
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _between(text: str, start: str, end: str) -> str:
+    head, _, rest = text.partition(start)
+    return rest.partition(end)[0] if rest else ""
+
+
+def _words(text: str, limit: int) -> str:
+    return " ".join(text.split()[:limit])
+
+
+def split_scenes(source_text: str, number_of_scenes: int) -> dict[str, Any]:
+    """Group the sentences of *source_text* into at most *number_of_scenes* scenes."""
+    sentences = [s.strip() for s in _SENTENCE.split(source_text.strip()) if s.strip()]
+    if not sentences:
+        sentences = ["Nothing happened."]
+    count = max(1, min(number_of_scenes, len(sentences)))
+    scenes = []
+    for index in range(count):
+        group = sentences[
+            index * len(sentences) // count:(index + 1) * len(sentences) // count
+        ]
+        text = " ".join(group)
+        capitalised = [
+            word.strip(".,;:!?\"'") for word in text.split()[1:] if word[:1].isupper()
+        ]
+        scenes.append(
+            {
+                "scene_id": index + 1,
+                "title": _words(text, 4),
+                "main_point": _words(text, 10),
+                "scene_summary": _words(text, 16),
+                "key_elements": list(dict.fromkeys(w for w in capitalised if w))[:3],
+            }
+        )
+    warnings = []
+    if count < number_of_scenes:
+        warnings.append(f"Text too short for {number_of_scenes} scenes; returned {count}.")
+    return {"scenes": scenes, "warnings": warnings}
+
+
+def answer(schema_name: str, user_prompt: str) -> dict[str, Any]:
+    """Return the structured output for a ``schema_name`` request."""
+    if schema_name == "ExtractScenes":
+        source_text = _between(user_prompt, "Text:\n", "\n\nRules:")
+        match = re.search(r"Aim for exactly (\d+) scenes", user_prompt)
+        return split_scenes(source_text, int(match.group(1)) if match else 6)
+    if schema_name == "GeneratePrompt":
+        scene = json.loads(_between(user_prompt, "Scene JSON:\n", "\n\nRules:") or "{}")
+        prefix = _between(user_prompt, 'Start with the exact style prefix: "', '"\n')
+        summary = scene.get("scene_summary") or scene.get("title") or ""
+        return {
+            "scene_id": int(scene.get("scene_id", 0)),
+            "scene_prompt": f"{prefix} {summary}".strip(),
+        }
+    raise ValueError(f"Stub LLM has no answer for schema {schema_name!r}")
+
+
+class _Responses:
+    def create(self, *, model: str, input: list[dict[str, str]], text: dict, **_: Any):
+        simulate("openai", "responses.create")
+        user_prompt = next(
+            (item["content"] for item in input if item.get("role") == "user"), "",
+        )
+        result = answer(text["format"]["name"], user_prompt)
+        return SimpleNamespace(output_text=json.dumps(result), model=model)
+
+
+class StubOpenAI:
+    """Drop-in for ``openai.OpenAI`` covering ``responses.create``."""
+
+    def __init__(self, **_: Any) -> None:
+        self.responses = _Responses()
@@ -0,0 +1,66 @@
+"""Stand-in for the Gradium SDK: sine-tone WAVs sized to the word count."""
+
+from __future__ import annotations
+
+import array
+import io
+import math
+import uuid
+import wave
+from types import SimpleNamespace
+from typing import Any
+
+from . import simulate_async
+
+SAMPLE_RATE = 24000
+WORDS_PER_SECOND = 2.5
+TONE_HZ = 220.0
+
+
+def sine_wav(seconds: float, *, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Return a mono 16-bit WAV holding a quiet sine tone of *seconds*."""
+    frames = max(1, int(seconds * sample_rate))
+    step = 2 * math.pi * TONE_HZ / sample_rate
+    samples = array.array(
+        "h", (int(6000 * math.sin(step * i)) for i in range(frames)),
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+class StubGradiumClient:
+    def __init__(self, **_: Any) -> None:
+        self.voices: dict[str, dict[str, Any]] = {}
+
+    async def tts(self, *, setup: dict[str, Any], text: str) -> SimpleNamespace:
+        await simulate_async("gradium", "tts")
+        seconds = max(1.0, len(text.split()) / WORDS_PER_SECOND)
+        return SimpleNamespace(
+            raw_data=sine_wav(seconds),
+            request_id=f"stub-{uuid.uuid4().hex[:12]}",
+            sample_rate=SAMPLE_RATE,
+        )
+
+
+async def _get_voices(client: StubGradiumClient, voice_uid: str | None = None) -> Any:
+    await simulate_async("gradium", "voices.get")
+    if voice_uid is not None:
+        return client.voices.get(voice_uid, {"uid": voice_uid, "is_pending": False, "has_audio": True})
+    return list(client.voices.values())
+
+
+async def _create_voice(client: StubGradiumClient, *, name: str, **_: Any) -> dict[str, Any]:
+    await simulate_async("gradium", "voices.create")
+    uid = f"stub-voice-{uuid.uuid4().hex[:8]}"
+    client.voices[uid] = {"uid": uid, "name": name, "is_pending": False, "has_audio": True}
+    return {"uid": uid}
+
+
+# Module-shaped like ``gradium``: ``client.GradiumClient`` and ``voices.get/create``.
+client = SimpleNamespace(GradiumClient=StubGradiumClient)
+voices = SimpleNamespace(get=_get_voices, create=_create_voice)
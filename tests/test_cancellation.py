@@ -0,0 +1,136 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from pipeline_runtime import cancellation, providers
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    cancellation.reset()
+    yield
+    cancellation.reset()
+
+
+@pytest.fixture
+def fal_cancels(monkeypatch):
+    cancelled = []
+
+    class Fal:
+        def cancel(self, application, request_id):
+            cancelled.append((application, request_id))
+
+    monkeypatch.setattr(providers, "fal_sdk", Fal)
+    return cancelled
+
+
+def _sleeper():
+    return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+needs_proc = pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+
+
+@needs_proc
+def test_process_start_time_identifies_live_processes():
+    started = cancellation.process_start_time(os.getpid())
+
+    assert isinstance(started, int)
+    assert cancellation.same_process(os.getpid(), started) is True
+    assert cancellation.same_process(os.getpid(), started + 1) is False
+    assert cancellation.same_process(os.getpid(), None) is None
+
+
+@needs_proc
+def test_process_start_time_is_none_for_exited_processes():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    started = cancellation.process_start_time(process.pid)
+    # Until it is reaped, the exited child is a zombie.
+    _wait_for(lambda: cancellation.process_start_time(process.pid) is None)
+    process.wait()
+
+    assert started is not None
+    assert cancellation.process_start_time(process.pid) is None
+    assert cancellation.same_process(process.pid, started) is False
+
+
+def test_check_raises_once_cancelled():
+    cancellation.check()
+    cancellation.cancel()
+
+    assert cancellation.is_cancelled()
+    with pytest.raises(cancellation.RunCancelled):
+        cancellation.check()
+    cancellation.reset()
+    cancellation.check()
+
+
+def test_cancel_kills_tracked_children():
+    with cancellation.child_process(_sleeper()) as process:
+        cancellation.cancel()
+        assert process.wait(timeout=5) == -signal.SIGKILL
+
+    # A child started after the cancellation is killed straight away.
+    with cancellation.child_process(_sleeper()) as late:
+        assert late.wait(timeout=5) == -signal.SIGKILL
+
+
+def test_cancel_cancels_pending_fal_requests(fal_cancels):
+    with cancellation.fal_request("fal-ai/video") as enqueued:
+        enqueued("req-1")
+        with cancellation.fal_request("fal-ai/image") as finished:
+            finished("req-2")
+        cancellation.cancel()
+        _wait_for(lambda: fal_cancels)
+        # Enqueued after the cancellation: cancelled on the spot.
+        enqueued("req-3")
+
+    assert sorted(fal_cancels) == [("fal-ai/video", "req-1"), ("fal-ai/video", "req-3")]
+
+
+def test_sigterm_raises_in_synchronous_code():
+    previous = signal.getsignal(signal.SIGTERM)
+
+    with pytest.raises(cancellation.RunCancelled):
+        with cancellation.handle_sigterm():
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(5)
+
+    assert cancellation.is_cancelled()
+    assert signal.getsignal(signal.SIGTERM) is previous
+
+
+def test_sigterm_cancels_the_running_loop():
+    async def run():
+        await asyncio.sleep(0)
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.sleep(5)
+
+    with cancellation.handle_sigterm():
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(run())
+
+    assert cancellation.is_cancelled()
+
+
+def test_sigterm_is_ignored_unless_confirmed():
+    previous = signal.getsignal(signal.SIGTERM)
+
+    with cancellation.handle_sigterm(confirm=lambda: False):
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(0.05)
+
+    assert not cancellation.is_cancelled()
+    assert signal.getsignal(signal.SIGTERM) is previous
@@ -0,0 +1,102 @@
+import subprocess
+
+import pytest
+
+from media_service import concat_tree
+from media_service.mp4_probe import probe_mp4, probe_video_duration
+
+imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+FFMPEG = imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _encode(path, *, fps=24, size="160x120", pix_fmt="yuv420p", preset="veryfast", audio=True):
+    args = [FFMPEG, "-v", "error", "-y", "-f", "lavfi", "-i", f"testsrc=size={size}:rate={fps}"]
+    if audio:
+        args += ["-f", "lavfi", "-i", "sine=sample_rate=48000", "-c:a", "aac", "-ac", "2"]
+    args += [
+        "-t", "1", "-c:v", "libx264", "-preset", preset, "-pix_fmt", pix_fmt,
+        "-video_track_timescale", "12288", str(path),
+    ]
+    subprocess.run(args, check=True)
+    return str(path)
+
+
+def _decode_errors(path):
+    """Decode every frame; return the exit code and the decoders' complaints."""
+    result = subprocess.run(
+        [FFMPEG, "-v", "error", "-i", str(path), "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+    # The null muxer flags timestamps that collide once rounded to its own
+    # time base; only decoder errors mean the joined stream is broken.
+    lines = [line for line in result.stderr.splitlines() if not line.startswith("[null @")]
+    return result.returncode, "\n".join(lines)
+
+
+@pytest.fixture
+def normalise_calls(monkeypatch):
+    calls = []
+    original = concat_tree._normalise
+
+    def spy(path, *args, **kwargs):
+        calls.append(path)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(concat_tree, "_normalise", spy)
+    return calls
+
+
+def test_normalises_only_mismatched_clips(tmp_path, normalise_calls):
+    clips = [_encode(tmp_path / f"match_{n}.mp4") for n in range(3)]
+    odd_rate = _encode(tmp_path / "odd_rate.mp4", fps=30, pix_fmt="yuv444p")
+    silent = _encode(tmp_path / "silent.mp4", size="320x240", audio=False)
+    clips[1:1] = [odd_rate, silent]
+    output = tmp_path / "out.mp4"
+
+    assert concat_tree.tree_concat(clips, str(output), workers=2)
+
+    assert sorted(normalise_calls) == sorted([odd_rate, silent])
+    assert _decode_errors(output) == (0, "")
+    info = probe_mp4(str(output))
+    assert (info.video.width, info.video.height, info.video.sample_delta) == (160, 120, 512)
+    assert info.audio is not None
+    assert probe_video_duration(str(output)) == pytest.approx(5.0, abs=0.2)
+    assert not list(tmp_path.glob("concat-tree-*"))
+
+
+def test_retargets_when_our_encode_cannot_join_the_clips(tmp_path, normalise_calls):
+    # A different preset gives different parameter sets (SPS/PPS).
+    clips = [_encode(tmp_path / f"foreign_{n}.mp4", preset="medium") for n in range(3)]
+    clips.append(_encode(tmp_path / "odd_rate.mp4", fps=30))
+    output = tmp_path / "out.mp4"
+
+    assert concat_tree.tree_concat(clips, str(output), workers=2)
+
+    assert sorted(normalise_calls) == sorted(clips)
+    assert _decode_errors(output) == (0, "")
+    assert probe_mp4(str(output)).video.sample_delta == 512
+    assert probe_video_duration(str(output)) == pytest.approx(4.0, abs=0.2)
+
+
+def test_unprobeable_clips_fall_back_to_a_full_reencode(tmp_path, normalise_calls):
+    clip = _encode(tmp_path / "clip.mp4")
+    matroska = tmp_path / "clip.mkv"
+    subprocess.run(
+        [FFMPEG, "-v", "error", "-y", "-i", clip, "-c", "copy", str(matroska)], check=True,
+    )
+    output = tmp_path / "out.mp4"
+
+    assert not concat_tree.tree_concat([clip, str(matroska)], str(output))
+
+    assert normalise_calls == []
+    assert not output.exists()
+
+
+def test_normalise_args_match_frame_duration_and_fill_missing_audio():
+    target = (("avc1", 320, 240, 12288, 512, b"cfg"), ("mp4a", 48000, 2, b"asc"))
+
+    args = concat_tree._normalise_args("in.mp4", "out.mp4", target, False, 2)
+
+    assert args[args.index("-r") + 1] == "12288/512"
+    assert "anullsrc=r=48000:cl=stereo" in args
+    assert args[args.index("-map", args.index("-map") + 1) + 1] == "1:a:0"
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from fal_integration_service.deadline import (
+    DEFAULT_IMAGE_MODEL,
+    FAST_IMAGE_MODEL,
+    PULID_IMAGE_MODEL,
+    DeadlinePlanner,
+    video_key,
+)
+
+VIDEO_MODEL = "fal-ai/kling-video"
+
+
+def _plan(planner, *, scenes=4, durations=("5",), concurrency=4, face_mode=False):
+    return planner.plan(
+        num_scenes=scenes,
+        face_mode=face_mode,
+        video_model=VIDEO_MODEL,
+        durations=list(durations) * scenes,
+        concurrency=concurrency,
+    )
+
+
+def test_without_deadline_only_records_calls():
+    planner = DeadlinePlanner()
+
+    assert _plan(planner, concurrency=3) == 3
+    planner.observe("image", DEFAULT_IMAGE_MODEL, 500.0)
+    planner.observe("video", video_key(VIDEO_MODEL, "5"), None)
+
+    assert planner.current.name == "full"
+    assert planner.calls == [("image", DEFAULT_IMAGE_MODEL, 500.0)]
+    assert planner.call_timeout(30.0) is None
+    assert planner.summary()["switches"] == []
+
+
+def test_plan_keeps_full_quality_when_it_fits():
+    # Defaults: 12s per Flux Dev image, 100s per 5s clip, one wave each.
+    planner = DeadlinePlanner(time.time() + 200)
+
+    assert _plan(planner) == 4
+    assert planner.image_model() == DEFAULT_IMAGE_MODEL
+    assert planner.clip_duration("5") == "5"
+
+
+def test_plan_raises_concurrency_before_lowering_quality():
+    planner = DeadlinePlanner(time.time() + 150, max_concurrency=8)
+
+    # Two waves at concurrency 2 need ~224s; one wave at 4 needs ~112s.
+    assert _plan(planner, concurrency=2) == 4
+    assert planner.current.name == "full"
+
+
+def test_plan_steps_down_to_short_clips():
+    history = {f"video:{video_key(VIDEO_MODEL, 4)}": 10.0}
+    planner = DeadlinePlanner(time.time() + 60, history=history)
+
+    assert _plan(planner, durations=(10,)) == 4
+
+    assert planner.current.name == "short-clips"
+    assert planner.image_model() == FAST_IMAGE_MODEL
+    assert planner.clip_duration(10) == 4
+    assert planner.clip_duration(3) == 3
+    assert planner.clip_duration("10") == "5"
+
+
+def test_plan_reserves_time_for_assembly():
+    history = {f"video:{video_key(VIDEO_MODEL, '5')}": 30.0}
+    roomy = DeadlinePlanner(time.time() + 60, history=history)
+    reserved = DeadlinePlanner(time.time() + 60, history=history, reserve_seconds=20)
+
+    _plan(roomy)
+    _plan(reserved)
+
+    assert roomy.current.name == "full"
+    assert reserved.current.name == "fast-images"
+
+
+def test_face_mode_plans_with_the_pulid_model():
+    history = {f"image:{PULID_IMAGE_MODEL}": 100.0}
+    planner = DeadlinePlanner(time.time() + 150, history=history)
+
+    _plan(planner, face_mode=True)
+
+    # PuLID is used at every level, so only shorter clips can help.
+    assert planner.current.name == "short-clips"
+
+
+def test_infeasible_deadline_uses_the_fastest_level_and_ceiling():
+    planner = DeadlinePlanner(time.time() + 5, max_concurrency=6)
+
+    assert _plan(planner, scenes=8, concurrency=2) == 6
+    assert planner.current.name == "short-clips"
+    assert planner.concurrency == 6
+
+
+def test_slow_calls_move_remaining_scenes_down_and_never_back():
+    planner = DeadlinePlanner(time.time() + 200)
+    _plan(planner)
+
+    # One slow image: the three left would take another 150s wave.
+    planner.observe("image", DEFAULT_IMAGE_MODEL, 150.0)
+
+    assert planner.current.name == "fast-images"
+    [switch] = planner.switches
+    assert switch["level"] == "fast-images"
+    assert switch["behind_s"] > 0
+
+    planner.observe("image", FAST_IMAGE_MODEL, 0.1)
+    assert planner.current.name == "fast-images"
+    assert planner.summary()["level"] == "fast-images"
+
+
+def test_observed_latency_overrides_history():
+    key = video_key(VIDEO_MODEL, "5")
+    planner = DeadlinePlanner(history={f"video:{key}": 60.0})
+
+    assert planner._seconds("video", key) == 60.0
+    planner.observe("video", key, 10.0)
+    planner.observe("video", key, 20.0)
+    assert planner._seconds("video", key) == 15.0
+    assert planner._seconds("image", "unknown/model") == 15.0
+    assert planner._seconds("video", video_key(VIDEO_MODEL, 4)) == 80.0
+
+
+def test_call_timeout_leaves_time_for_the_fallback():
+    planner = DeadlinePlanner(time.time() + 100, reserve_seconds=10)
+
+    assert planner.call_timeout(20.0) == pytest.approx(70.0, abs=1.0)
+    assert planner.call_timeout(500.0) == 0.0
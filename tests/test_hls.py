@@ -0,0 +1,103 @@
+import os
+import subprocess
+
+import pytest
+
+from media_service.assembly import FfmpegEngine
+from media_service.hls import ENDLIST, HlsPlaylist, close_playlist
+from media_service.mp4_probe import probe_segment_duration, probe_video_duration
+
+imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+FFMPEG = imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _ffmpeg(*args):
+    subprocess.run([FFMPEG, "-v", "error", "-y", *args], check=True)
+
+
+def _clip(path, seconds, *, gop=24):
+    _ffmpeg(
+        "-f", "lavfi", "-i", f"testsrc=size=160x120:rate=24:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=sample_rate=48000:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", str(gop), "-c:a", "aac",
+        str(path),
+    )
+    return str(path)
+
+
+def _playlist_entries(path):
+    with open(path, encoding="utf-8") as handle:
+        lines = handle.read().splitlines()
+    return [
+        (float(line[len("#EXTINF:"):].rstrip(",")), lines[n + 1])
+        for n, line in enumerate(lines)
+        if line.startswith("#EXTINF:")
+    ]
+
+
+def _retimed_scene(tmp_path, name, seconds, target_seconds):
+    """A clip retimed by timestamp rewriting, muxed with its narration."""
+    engine = FfmpegEngine()
+    source = _clip(tmp_path / f"{name}_src.mp4", seconds)
+    retimed = str(tmp_path / f"{name}_retimed.mp4")
+    engine.retime(source, retimed, target_seconds, "timestamps")
+    narration = str(tmp_path / f"{name}.wav")
+    _ffmpeg("-f", "lavfi", "-i", f"sine=duration={target_seconds}", narration)
+    muxed = str(tmp_path / f"{name}_av.mp4")
+    engine.mux(retimed, narration, muxed)
+    return muxed
+
+
+def test_durations_are_probed_from_retimed_segments(tmp_path):
+    playlist = HlsPlaylist(str(tmp_path / "hls"))
+    scenes = [
+        _retimed_scene(tmp_path, "scene_001", 2.0, 1.6),
+        _retimed_scene(tmp_path, "scene_002", 2.0, 2.4),
+    ]
+
+    for n, scene in enumerate(scenes, 1):
+        playlist.append(scene, f"scene_{n:03d}")
+
+    entries = _playlist_entries(playlist.path)
+    assert len(entries) == 2
+    for (duration, uri), scene in zip(entries, scenes):
+        assert duration == pytest.approx(probe_video_duration(scene), abs=0.01)
+        assert duration == pytest.approx(
+            probe_segment_duration(
+                os.path.join(playlist.directory, uri),
+                os.path.join(playlist.directory, uri.replace("_000.m4s", "_init.mp4")),
+            )
+        )
+    assert [round(duration, 1) for duration, _ in entries] == [1.6, 2.4]
+    assert playlist._elapsed == pytest.approx(sum(d for d, _ in entries))
+
+
+def test_target_duration_is_fixed_and_sparse_keyframes_are_recut(tmp_path):
+    playlist = HlsPlaylist(str(tmp_path / "hls"), segment_seconds=2.0)
+    # One keyframe for the whole 6s clip: a copy pass can only cut once.
+    clip = _clip(tmp_path / "sparse.mp4", 6, gop=1000)
+
+    playlist.append(clip, "scene_001")
+
+    entries = _playlist_entries(playlist.path)
+    assert len(entries) >= 3
+    assert all(round(duration) <= 2 for duration, _ in entries)
+    assert sum(duration for duration, _ in entries) == pytest.approx(6.0, abs=0.1)
+    with open(playlist.path, encoding="utf-8") as handle:
+        assert "#EXT-X-TARGETDURATION:2\n" in handle.read()
+    assert sorted(os.listdir(playlist.directory)) == sorted(
+        ["index.m3u8", "scene_001_init.mp4", *(uri for _, uri in entries)]
+    )
+
+
+def test_close_ends_the_playlist(tmp_path):
+    playlist = HlsPlaylist(str(tmp_path / "hls"))
+    assert close_playlist(playlist.directory)
+    assert not close_playlist(playlist.directory)
+    assert not close_playlist(str(tmp_path / "missing"))
+
+    playlist.close()
+    with open(playlist.path, encoding="utf-8") as handle:
+        assert handle.read().count(ENDLIST) == 1
+    with pytest.raises(RuntimeError, match="closed"):
+        playlist.append(str(tmp_path / "clip.mp4"), "scene_001")
@@ -0,0 +1,253 @@
+import struct
+import subprocess
+
+import pytest
+
+from media_service.mp4_probe import (
+    MediaProbeError,
+    concat_compatible,
+    probe_duration,
+    probe_mp4,
+    probe_video_duration,
+)
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _full_box(kind: bytes, version: int, body: bytes) -> bytes:
+    return _box(kind, bytes([version, 0, 0, 0]) + body)
+
+
+def _mvhd(timescale: int, duration: int, version: int = 0) -> bytes:
+    if version == 1:
+        body = struct.pack(">QQIQ", 0, 0, timescale, duration)
+    else:
+        body = struct.pack(">IIII", 0, 0, timescale, duration)
+    return _full_box(b"mvhd", version, body + bytes(80))
+
+
+def _tkhd(track_id: int, width: int = 0, height: int = 0) -> bytes:
+    body = struct.pack(">IIIII", 0, 0, track_id, 0, 0)
+    body += bytes(8 + 8 + 36) + struct.pack(">II", width << 16, height << 16)
+    return _full_box(b"tkhd", 0, body)
+
+
+def _mdhd(timescale: int, duration: int, version: int = 0) -> bytes:
+    if version == 1:
+        body = struct.pack(">QQIQ", 0, 0, timescale, duration)
+    else:
+        body = struct.pack(">IIII", 0, 0, timescale, duration)
+    return _full_box(b"mdhd", version, body + bytes(4))
+
+
+def _hdlr(handler: bytes) -> bytes:
+    return _full_box(b"hdlr", 0, bytes(4) + handler + bytes(12) + b"\0")
+
+
+def _esds(object_type: int, bitrate: int = 128000) -> bytes:
+    # AudioSpecificConfig: object type, 48 kHz (index 3), stereo.
+    asc = bytes([(object_type << 3) | (3 >> 1), ((3 & 1) << 7) | (2 << 3)])
+    decoder = bytes([0x40, 0x15, 0, 0, 0]) + struct.pack(">II", bitrate, bitrate)
+    decoder += bytes([0x05, len(asc)]) + asc
+    es = struct.pack(">HB", 1, 0) + bytes([0x04, len(decoder)]) + decoder + bytes([0x06, 1, 2])
+    return _full_box(b"esds", 0, bytes([0x03, len(es)]) + es)
+
+
+def _avcc(profile: int = 100, level: int = 13, chroma: int = 1) -> bytes:
+    return _box(b"avcC", bytes([1, profile, 0, level, 0xFF, 0xE1, chroma]))
+
+
+def _stsd(kind: str, codec: bytes, config: bytes = b"", **params: int) -> bytes:
+    entry = bytes(6) + struct.pack(">H", 1)
+    if kind == "video":
+        entry += bytes(16) + struct.pack(">HH", params["width"], params["height"]) + bytes(50)
+    else:
+        entry += bytes(8) + struct.pack(">HHHH", params["channels"], 16, 0, 0)
+        entry += struct.pack(">I", params["rate"] << 16)
+    entry += config
+    entry = struct.pack(">I4s", 8 + len(entry), codec) + entry
+    return _full_box(b"stsd", 0, struct.pack(">I", 1) + entry)
+
+
+def _stts(*runs: tuple[int, int]) -> bytes:
+    body = struct.pack(">I", len(runs))
+    for count, delta in runs:
+        body += struct.pack(">II", count, delta)
+    return _full_box(b"stts", 0, body)
+
+
+def _trak(
+    track_id: int,
+    kind: str,
+    timescale: int,
+    duration: int,
+    samples: int,
+    *,
+    mdhd_version: int = 0,
+    config: bytes = b"",
+    **params: int,
+) -> bytes:
+    handler = b"vide" if kind == "video" else b"soun"
+    codec = b"avc1" if kind == "video" else b"mp4a"
+    stsd = _stsd(kind, codec, config, **params)
+    stbl = _box(b"stbl", stsd + _stts((samples, duration // samples)))
+    minf = _box(b"minf", stbl)
+    mdia = _box(
+        b"mdia", _mdhd(timescale, duration, mdhd_version) + _hdlr(handler) + minf,
+    )
+    return _box(
+        b"trak",
+        _tkhd(track_id, params.get("width", 0), params.get("height", 0)) + mdia,
+    )
+
+
+def _video(
+    seconds: float,
+    *,
+    fps: int = 24,
+    width: int = 320,
+    height: int = 240,
+    config: bytes | None = None,
+) -> bytes:
+    return _trak(
+        1, "video", 12288, int(seconds * 12288), int(seconds * fps),
+        config=_avcc() if config is None else config, width=width, height=height,
+    )
+
+
+def _audio(
+    seconds: float,
+    *,
+    rate: int = 48000,
+    channels: int = 2,
+    object_type: int = 2,
+    bitrate: int = 128000,
+) -> bytes:
+    return _trak(
+        2, "audio", rate, int(seconds * rate), int(seconds * rate / 1024),
+        config=_esds(object_type, bitrate), rate=rate, channels=channels,
+    )
+
+
+def _write_mp4(path, *tracks: bytes, duration_ms: int, mvhd_version: int = 0) -> str:
+    moov = _box(b"moov", _mvhd(1000, duration_ms, mvhd_version) + b"".join(tracks))
+    path.write_bytes(_box(b"ftyp", b"isom" + bytes(4)) + moov + _box(b"mdat", bytes(16)))
+    return str(path)
+
+
+def test_probe_reads_container_and_tracks(tmp_path):
+    path = _write_mp4(tmp_path / "clip.mp4", _video(4.0), _audio(4.0), duration_ms=4000)
+
+    info = probe_mp4(path)
+
+    assert info.duration_seconds == 4.0
+    assert [track.kind for track in info.tracks] == ["video", "audio"]
+    video, audio = info.video, info.audio
+    assert (video.codec, video.width, video.height) == ("avc1", 320, 240)
+    assert video.duration_seconds == 4.0
+    assert video.frame_rate == pytest.approx(24.0)
+    assert (video.sample_delta, video.config) == (512, bytes([1, 100, 0, 13, 0xFF, 0xE1, 1]))
+    assert (audio.codec, audio.sample_rate, audio.channels) == ("mp4a", 48000, 2)
+    assert audio.config == bytes([0x40, 0x11, 0x90])
+
+
+def test_probe_reads_64_bit_headers(tmp_path):
+    video = _trak(1, "video", 90000, 450000, 125, mdhd_version=1, width=64, height=64)
+    path = _write_mp4(tmp_path / "v1.mp4", video, duration_ms=5000, mvhd_version=1)
+
+    info = probe_mp4(path)
+
+    assert info.duration_seconds == 5.0
+    assert info.video.duration_seconds == 5.0
+
+
+def test_video_duration_ignores_longer_audio(tmp_path):
+    path = _write_mp4(tmp_path / "clip.mp4", _video(4.0), _audio(4.6), duration_ms=4600)
+
+    assert probe_duration(path) == 4.6
+    assert probe_video_duration(path) == 4.0
+
+
+def test_video_duration_falls_back_to_container(tmp_path):
+    path = _write_mp4(tmp_path / "audio.mp4", _audio(3.0), duration_ms=3000)
+
+    assert probe_video_duration(path) == 3.0
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        (b"", "empty file"),
+        (_box(b"ftyp", b"isom" + bytes(4)) + _box(b"mdat", bytes(8)), "no moov"),
+        (struct.pack(">I4s", 64, b"moov") + bytes(8), "Corrupt box"),
+    ],
+)
+def test_probe_rejects_unreadable_files(tmp_path, content, message):
+    path = tmp_path / "bad.mp4"
+    path.write_bytes(content)
+
+    with pytest.raises(MediaProbeError, match=message):
+        probe_mp4(str(path))
+    assert probe_duration(str(path)) is None
+    assert probe_video_duration(str(path)) is None
+
+
+def test_concat_compatible_compares_stream_parameters(tmp_path):
+    def clip(name, seconds=2.0, video=None, audio=None):
+        tracks = [video or _video(seconds)]
+        if audio is not False:
+            tracks.append(audio or _audio(seconds))
+        return _write_mp4(tmp_path / name, *tracks, duration_ms=int(seconds * 1000))
+
+    first = clip("a.mp4")
+    assert concat_compatible([first, clip("b.mp4", seconds=3.0)])
+    # Bitrates differ between encodes without affecting the stream format.
+    assert concat_compatible([first, clip("c.mp4", audio=_audio(2.0, bitrate=96000))])
+
+    incompatible = {
+        "size": clip("d.mp4", video=_video(2.0, width=640, height=480)),
+        "frame rate": clip("e.mp4", video=_video(2.0, fps=30)),
+        "profile": clip("f.mp4", video=_video(2.0, config=_avcc(profile=244))),
+        "level": clip("g.mp4", video=_video(2.0, config=_avcc(level=31))),
+        "chroma format": clip("h.mp4", video=_video(2.0, config=_avcc(chroma=3))),
+        "audio object type": clip("i.mp4", audio=_audio(2.0, object_type=5)),
+        "no audio": clip("j.mp4", audio=False),
+        "missing": str(tmp_path / "missing.mp4"),
+    }
+    for reason, other in incompatible.items():
+        assert not concat_compatible([first, other]), reason
+
+
+def test_concat_compatible_needs_the_video_config(tmp_path):
+    bare = [
+        _write_mp4(tmp_path / f"{n}.mp4", _video(2.0, config=b""), duration_ms=2000)
+        for n in range(2)
+    ]
+
+    assert probe_mp4(bare[0]).video.config is None
+    assert not concat_compatible(bare)
+
+
+def test_concat_compatible_on_encoded_clips(tmp_path):
+    imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+
+    def encode(name, fps, pix_fmt, seconds=1):
+        path = tmp_path / name
+        subprocess.run(
+            [
+                ffmpeg, "-v", "error", "-y",
+                "-f", "lavfi", "-i", f"testsrc=size=320x240:rate={fps}:duration={seconds}",
+                "-c:v", "libx264", "-pix_fmt", pix_fmt, "-video_track_timescale", "12288",
+                str(path),
+            ],
+            check=True,
+        )
+        return str(path)
+
+    first = encode("a.mp4", 24, "yuv420p")
+    assert concat_compatible([first, encode("b.mp4", 24, "yuv420p", seconds=2)])
+    assert not concat_compatible([first, encode("c.mp4", 30, "yuv420p")])
+    assert not concat_compatible([first, encode("d.mp4", 24, "yuv444p")])
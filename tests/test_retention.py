@@ -0,0 +1,138 @@
+import os
+import time
+
+import pytest
+
+from video_pipeline_service.retention import (
+    RetentionManager,
+    RetentionPolicy,
+    classify,
+    parse_size,
+)
+from video_pipeline_service.run_index import RunIndex
+
+HOUR = 3600.0
+
+
+def _write(path, size, age_seconds=2 * HOUR):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _run(root, run_id, *, final=100, intermediate=0, upload=0, age_seconds=2 * HOUR):
+    run_dir = root / run_id
+    _write(run_dir / "final_video.mp4", final, age_seconds)
+    _write(run_dir / "pipeline.log", 10, age_seconds)
+    if intermediate:
+        _write(run_dir / "video_output" / "scene_1.mp4", intermediate, age_seconds)
+    if upload:
+        _write(run_dir / "photo.png", upload, age_seconds)
+    return run_dir
+
+
+def _manager(root, budget=None, ttls=None, index=None):
+    policy = RetentionPolicy(budget_bytes=budget, ttls=ttls or {}, min_age_seconds=60)
+    return RetentionManager(root, policy, index)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("1048576", 1 << 20), ("500M", 500 << 20), ("20G", 20 << 30), ("1.5KiB", 1536)],
+)
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_classify(tmp_path):
+    run_dir = tmp_path / "run1"
+    assert classify(run_dir, run_dir / "final_video.mp4") == "final"
+    assert classify(run_dir, run_dir / "voice.wav") == "upload"
+    assert classify(run_dir, run_dir / "manifest.json") == "metadata"
+    assert classify(run_dir, run_dir / "hls" / "segment_00001.m4s") == "intermediate"
+
+
+def test_budget_deletes_intermediates_before_uploads_and_runs(tmp_path):
+    _run(tmp_path, "run1", intermediate=300, upload=200)
+    total = 100 + 10 + 300 + 200
+
+    report = _manager(tmp_path, budget=total - 250).collect()
+
+    assert report.total_bytes == total
+    assert report.freed_bytes == 300
+    assert report.runs_evicted == []
+    assert not (tmp_path / "run1" / "video_output" / "scene_1.mp4").exists()
+    assert (tmp_path / "run1" / "photo.png").exists()
+
+
+def test_budget_evicts_least_recently_accessed_run(tmp_path):
+    _run(tmp_path, "old", age_seconds=3 * HOUR)
+    _run(tmp_path, "new", age_seconds=2 * HOUR)
+
+    report = _manager(tmp_path, budget=150).collect()
+
+    assert report.runs_evicted == ["old"]
+    assert not (tmp_path / "old").exists()
+    assert (tmp_path / "new").exists()
+
+
+def test_budget_uses_index_access_times(tmp_path):
+    index = RunIndex(str(tmp_path / "runs.sqlite3"))
+    for run_id in ("run1", "run2"):
+        _run(tmp_path, run_id)
+        index.upsert_run(run_id, "succeeded")
+    index.touch_run("run1")
+    database = sum(path.stat().st_size for path in tmp_path.glob("runs.sqlite3*"))
+
+    report = _manager(tmp_path, budget=database + 150, index=index).collect()
+
+    assert report.runs_evicted == ["run2"]
+    assert index.get_run("run2")["evicted_at"] is not None
+
+
+def test_budget_counts_the_whole_output_root(tmp_path):
+    _run(tmp_path, "run1")
+    _run(tmp_path, "run2", age_seconds=0)  # too recent to collect
+    _write(tmp_path / "_uploads" / "abc.part", 500)
+
+    report = _manager(tmp_path, budget=600).collect()
+
+    assert report.total_bytes == 2 * 110 + 500
+    assert report.runs_evicted == ["run1"]
+    assert (tmp_path / "run2").exists()
+    assert (tmp_path / "_uploads" / "abc.part").exists()
+
+
+def test_active_runs_are_never_collected(tmp_path):
+    index = RunIndex(str(tmp_path / "runs.sqlite3"))
+    _run(tmp_path, "run1", intermediate=300)
+    index.upsert_run("run1", "running")
+
+    report = _manager(tmp_path, budget=0, ttls={"intermediate": 60}, index=index).collect()
+
+    assert report.freed_bytes == 0
+    assert (tmp_path / "run1" / "video_output" / "scene_1.mp4").exists()
+
+
+def test_ttls_expire_files_and_unwatched_runs(tmp_path):
+    _run(tmp_path, "stale", age_seconds=48 * HOUR)
+    _run(tmp_path, "fresh", intermediate=300, upload=200)
+
+    report = _manager(tmp_path, ttls={"final": 24 * HOUR, "intermediate": HOUR}).collect()
+
+    assert report.runs_evicted == ["stale"]
+    assert not (tmp_path / "fresh" / "video_output" / "scene_1.mp4").exists()
+    assert (tmp_path / "fresh" / "photo.png").exists()
+    assert report.freed_bytes == 110 + 300
+
+
+def test_dry_run_deletes_nothing(tmp_path):
+    _run(tmp_path, "run1", intermediate=300)
+
+    report = _manager(tmp_path, budget=0).collect(dry_run=True)
+
+    assert report.runs_evicted == ["run1"]
+    assert report.freed_bytes == 410
+    assert (tmp_path / "run1" / "video_output" / "scene_1.mp4").exists()
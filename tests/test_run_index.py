@@ -0,0 +1,209 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from video_pipeline_service.run_index import CapacityExceeded, RunIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return RunIndex(str(tmp_path / "runs.sqlite3"))
+
+
+def _claim(index, run_id, content_hash="hash-a", **kwargs):
+    kwargs.setdefault("idempotency_key", None)
+    kwargs.setdefault("dedupe_seconds", 0)
+    return index.claim_run(run_id, content_hash=content_hash, **kwargs)
+
+
+def test_list_runs_pages_newest_first(index):
+    for n in range(5):
+        index.upsert_run(f"run{n}", "succeeded", created_at=1000.0 + n)
+
+    first, cursor = index.list_runs(limit=2)
+    second, cursor = index.list_runs(limit=2, cursor=cursor)
+    third, cursor = index.list_runs(limit=2, cursor=cursor)
+
+    assert [run["run_id"] for run in first + second + third] == [
+        "run4", "run3", "run2", "run1", "run0",
+    ]
+    assert cursor is None
+
+
+def test_list_runs_filters(index):
+    index.upsert_run("run1", "succeeded", style="anime", created_at=1000.0)
+    index.upsert_run("run2", "failed", style="anime", created_at=2000.0)
+    index.upsert_run("run3", "succeeded", style="noir", created_at=3000.0)
+
+    def ids(**filters):
+        return [run["run_id"] for run in index.list_runs(**filters)[0]]
+
+    assert ids(status="succeeded") == ["run3", "run1"]
+    assert ids(style="anime") == ["run2", "run1"]
+    assert ids(created_after=2000.0) == ["run3", "run2"]
+    assert ids(created_before=2000.0) == ["run1"]
+    assert ids(style="anime", status="succeeded", created_before=3000.0) == ["run1"]
+
+
+def test_list_runs_rejects_bad_cursor(index):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        index.list_runs(cursor="not-a-cursor")
+
+
+def test_get_run_includes_stages_and_artifacts(index, tmp_path):
+    final = tmp_path / "final_video.mp4"
+    final.write_bytes(b"x" * 42)
+    index.upsert_run("run1", "running")
+    index.start_stage("run1", "voice")
+    index.finish_stage("run1", "voice")
+    index.add_artifact("run1", "final", str(final))
+
+    run = index.get_run("run1")
+
+    assert [(stage["stage"], stage["status"]) for stage in run["stages"]] == [
+        ("voice", "succeeded"),
+    ]
+    assert run["artifacts"][0]["bytes"] == 42
+    assert index.find_artifact("run1", "final") == str(final)
+    assert index.find_artifact("run1", "clip", 3) is None
+    assert index.get_run("missing") is None
+
+
+def test_upsert_run_rejects_unknown_status(index):
+    with pytest.raises(ValueError, match="Unknown run status"):
+        index.upsert_run("run1", "exploded")
+
+
+def test_claim_creates_queued_run(index):
+    run, created = _claim(index, "run1", client="alice", style="anime")
+
+    assert created
+    stored = index.get_run("run1")
+    assert stored["status"] == "queued"
+    assert (stored["client"], stored["style"]) == ("alice", "anime")
+
+
+def test_idempotency_key_returns_existing_run(index):
+    _claim(index, "run1", idempotency_key="k1", client="alice")
+
+    run, created = _claim(index, "run2", idempotency_key="k1", client="alice")
+
+    assert not created
+    assert run["run_id"] == "run1"
+    assert index.get_run("run2") is None
+
+
+def test_idempotency_keys_are_per_client(index):
+    _claim(index, "run1", idempotency_key="1", client="alice")
+
+    run, created = _claim(index, "run2", idempotency_key="1", client="bob")
+
+    assert created
+    assert run["run_id"] == "run2"
+
+
+def test_idempotency_key_reused_for_different_content(index):
+    _claim(index, "run1", idempotency_key="k1", client="alice")
+
+    with pytest.raises(ValueError, match="different submission"):
+        _claim(index, "run2", content_hash="hash-b", idempotency_key="k1", client="alice")
+
+
+def test_content_dedupe_is_opt_in(index):
+    _claim(index, "run1")
+
+    assert _claim(index, "run2")[1]
+    run, created = _claim(index, "run3", dedupe_seconds=60)
+    assert not created
+    assert run["run_id"] == "run2"
+
+
+@pytest.mark.parametrize("status", ["failed", "cancelled"])
+def test_finished_unsuccessful_runs_are_not_reused(index, status):
+    _claim(index, "run1", idempotency_key="k1", dedupe_seconds=60)
+    index.upsert_run("run1", status)
+
+    run, created = _claim(index, "run2", idempotency_key="k1", dedupe_seconds=60)
+
+    assert created
+
+
+def test_evicted_runs_are_not_reused(index):
+    _claim(index, "run1", idempotency_key="k1")
+    index.upsert_run("run1", "succeeded")
+    index.mark_evicted("run1")
+
+    assert _claim(index, "run2", idempotency_key="k1")[1]
+
+
+def test_concurrent_claims_create_one_run(index):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim(n):
+        barrier.wait()
+        results.append(_claim(index, f"run{n}", idempotency_key="k1", client="alice"))
+
+    threads = [threading.Thread(target=claim, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(created for _run, created in results) == 1
+    assert len({run["run_id"] for run, _created in results}) == 1
+
+
+def test_claim_records_the_owning_process(index):
+    _claim(index, "run1")
+
+    assert index.get_run("run1")["owner_pid"] == os.getpid()
+
+
+def test_capacity_limits_queue_and_client(index):
+    _claim(index, "run1", content_hash="h1", client="alice", max_active=2, max_per_client=1)
+
+    with pytest.raises(CapacityExceeded) as exc_info:
+        _claim(index, "run2", content_hash="h2", client="alice", max_active=2, max_per_client=1)
+    assert exc_info.value.scope == "client"
+
+    _claim(index, "run3", content_hash="h3", client="bob", max_active=2, max_per_client=1)
+    with pytest.raises(CapacityExceeded) as exc_info:
+        _claim(index, "run4", content_hash="h4", client="carol", max_active=2, max_per_client=1)
+    assert (exc_info.value.scope, exc_info.value.active) == ("queue", 2)
+
+    index.upsert_run("run1", "succeeded")
+    assert _claim(index, "run5", content_hash="h5", client="alice", max_active=2)[1]
+
+
+def test_duplicates_are_answered_at_capacity(index):
+    _claim(index, "run1", idempotency_key="k1", max_active=1)
+
+    run, created = _claim(index, "run2", idempotency_key="k1", max_active=1)
+
+    assert not created
+    assert run["run_id"] == "run1"
+
+
+def test_reconcile_orphans_fails_runs_of_dead_processes(index):
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    _claim(index, "alive", content_hash="h1")
+    _claim(index, "dead", content_hash="h2")
+    assert index.start_run("dead", child.pid)
+
+    assert index.reconcile_orphans() == ["dead"]
+    assert index.get_run("dead")["status"] == "failed"
+    assert index.get_run("alive")["status"] == "queued"
+
+
+def test_reconcile_orphans_times_out_old_runs(index):
+    _claim(index, "run1", created_at=time.time() - 120)
+
+    assert index.reconcile_orphans(timeout_seconds=3600) == []
+    assert index.reconcile_orphans(timeout_seconds=60) == ["run1"]
+    assert "timed out" in index.get_run("run1")["error"]
@@ -0,0 +1,80 @@
+import pytest
+
+from media_service.segments import SegmentConcat
+
+
+class FakeConcat:
+    """Joins text files, recording the size of every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, paths, output):
+        self.calls.append(len(paths))
+        with open(output, "w", encoding="utf-8") as handle:
+            for path in paths:
+                with open(path, encoding="utf-8") as source:
+                    handle.write(source.read())
+
+
+def _clips(tmp_path, count):
+    clips = tmp_path / "clips"
+    clips.mkdir()
+    paths = []
+    for n in range(count):
+        path = clips / f"clip_{n:03d}.txt"
+        path.write_text(f"{n},", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("count, batch_size", [(1, 2), (7, 2), (9, 3), (10, 3), (100, 4)])
+def test_output_keeps_clip_order(tmp_path, count, batch_size):
+    concat = FakeConcat()
+    segments = SegmentConcat(str(tmp_path / "work"), batch_size=batch_size, concat=concat)
+
+    for path in _clips(tmp_path, count):
+        segments.add(path)
+    segments.finish(str(tmp_path / "final.txt"))
+
+    expected = "".join(f"{n}," for n in range(count))
+    assert (tmp_path / "final.txt").read_text(encoding="utf-8") == expected
+    assert segments.count == count
+    assert max(concat.calls[:-1], default=0) <= batch_size
+
+
+def test_inputs_and_segments_are_removed(tmp_path):
+    work = tmp_path / "work"
+    segments = SegmentConcat(str(work), batch_size=3, concat=FakeConcat())
+
+    for path in _clips(tmp_path, 10):
+        segments.add(path)
+    assert list(work.iterdir())  # joined segments exist until finish
+    segments.finish(str(tmp_path / "final.txt"))
+
+    assert list((tmp_path / "clips").iterdir()) == []
+    assert list(work.iterdir()) == []
+
+
+def test_keep_inputs_leaves_added_clips(tmp_path):
+    work = tmp_path / "work"
+    segments = SegmentConcat(str(work), batch_size=2, concat=FakeConcat(), keep_inputs=True)
+
+    for path in _clips(tmp_path, 5):
+        segments.add(path)
+    segments.finish(str(tmp_path / "final.txt"))
+
+    assert len(list((tmp_path / "clips").iterdir())) == 5
+    assert list(work.iterdir()) == []
+
+
+def test_finish_without_clips(tmp_path):
+    segments = SegmentConcat(str(tmp_path / "work"), concat=FakeConcat())
+
+    with pytest.raises(RuntimeError, match="No clips"):
+        segments.finish(str(tmp_path / "final.txt"))
+
+
+def test_batch_size_must_be_at_least_two(tmp_path):
+    with pytest.raises(ValueError):
+        SegmentConcat(str(tmp_path / "work"), batch_size=1, concat=FakeConcat())
@@ -0,0 +1,148 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from video_pipeline_service import serving
+from video_pipeline_service.run_index import RunIndex
+
+CONTENT = b"0123456789" * 100
+
+
+@pytest.fixture
+def output_root(tmp_path):
+    return tmp_path / "output"
+
+
+@pytest.fixture
+def index(tmp_path):
+    return RunIndex(str(tmp_path / "runs.sqlite3"))
+
+
+@pytest.fixture
+def artifact(output_root, index):
+    path = output_root / "run1" / "final.mp4"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(CONTENT)
+    index.upsert_run("run1", "succeeded")
+    index.add_artifact("run1", "final", str(path))
+    return path
+
+
+@pytest.fixture
+def client(monkeypatch, output_root, index, artifact):
+    monkeypatch.setattr(serving, "_digests", {})
+    monkeypatch.delenv("PIPELINE_SENDFILE", raising=False)
+    app = FastAPI()
+
+    @app.get("/runs/{run_id}/{name}")
+    def get_artifact(request: Request, run_id: str, name: str):
+        return serving.artifact_response(
+            request, index, run_id, output_root / run_id / name,
+            media_type="video/mp4", output_root=output_root, filename=name,
+        )
+
+    return TestClient(app)
+
+
+def _etag(content=CONTENT):
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def test_finished_artifact_is_immutable_and_its_digest_stored(client, index):
+    response = client.get("/runs/run1/final.mp4")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == _etag()
+    assert response.headers["cache-control"] == serving.IMMUTABLE_CACHE_CONTROL
+    stored = index.get_artifact("run1", "final")
+    assert (stored["bytes"], stored["sha256"]) == (
+        len(CONTENT), hashlib.sha256(CONTENT).hexdigest(),
+    )
+
+
+@pytest.mark.parametrize(
+    "if_none_match", [_etag(), f"W/{_etag()}", f'"other", {_etag()}', "*"],
+)
+def test_matching_if_none_match_gets_304(client, if_none_match):
+    response = client.get("/runs/run1/final.mp4", headers={"If-None-Match": if_none_match})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == _etag()
+
+
+def test_other_etag_gets_the_body(client):
+    response = client.get("/runs/run1/final.mp4", headers={"If-None-Match": '"other"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_range_requests(client):
+    ranged = client.get("/runs/run1/final.mp4", headers={"Range": "bytes=10-19"})
+    stale = client.get(
+        "/runs/run1/final.mp4", headers={"Range": "bytes=10-19", "If-Range": '"other"'},
+    )
+
+    assert ranged.status_code == 206
+    assert ranged.content == CONTENT[10:20]
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
+
+
+def test_active_run_artifacts_are_revalidated(client, index, artifact):
+    index.upsert_run("run1", "running")
+
+    response = client.get("/runs/run1/final.mp4")
+    assert response.headers["cache-control"] == serving.ACTIVE_CACHE_CONTROL
+    assert index.get_artifact("run1", "final")["sha256"] is None
+
+    # A rewritten file gets a new ETag despite the in-process cache.
+    artifact.write_bytes(b"rewritten")
+    os.utime(artifact, ns=(1, 1))
+    assert client.get("/runs/run1/final.mp4").headers["etag"] == _etag(b"rewritten")
+
+
+def test_stored_digest_is_used_while_the_size_matches(client, index, artifact):
+    index.set_artifact_digest("run1", str(artifact), len(CONTENT), "ab" * 32)
+    assert client.get("/runs/run1/final.mp4").headers["etag"] == '"' + "ab" * 16 + '"'
+
+    index.set_artifact_digest("run1", str(artifact), len(CONTENT) + 1, "ab" * 32)
+    assert client.get("/runs/run1/final.mp4").headers["etag"] == _etag()
+
+
+def test_missing_artifact_is_404(client):
+    assert client.get("/runs/run1/missing.mp4").status_code == 404
+
+
+def test_x_accel_redirect(client, monkeypatch):
+    monkeypatch.setenv("PIPELINE_SENDFILE", "x-accel-redirect")
+    monkeypatch.setenv("PIPELINE_SENDFILE_PREFIX", "/internal/")
+
+    response = client.get("/runs/run1/final.mp4")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/internal/run1/final.mp4"
+    assert response.headers["content-disposition"] == 'attachment; filename="final.mp4"'
+    assert response.headers["etag"] == _etag()
+
+
+def test_x_sendfile(client, monkeypatch, artifact):
+    monkeypatch.setenv("PIPELINE_SENDFILE", "X-Sendfile")
+
+    response = client.get("/runs/run1/final.mp4")
+
+    assert response.headers["x-sendfile"] == str(artifact.resolve())
+    assert response.content == b""
+
+
+def test_unknown_sendfile_mode_is_rejected(client, monkeypatch):
+    monkeypatch.setenv("PIPELINE_SENDFILE", "lighttpd")
+
+    with pytest.raises(RuntimeError, match="Unknown PIPELINE_SENDFILE"):
+        client.get("/runs/run1/final.mp4")
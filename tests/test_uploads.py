@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from video_pipeline_service.uploads import (
+    UploadLocked,
+    UploadNotFound,
+    UploadOffsetMismatch,
+    UploadStore,
+    UploadTooLarge,
+)
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _append(store, upload_id, offset, *chunks):
+    return asyncio.run(store.append(upload_id, offset, _chunks(*chunks)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(tmp_path / "_uploads", limits={"photo": 100, "voice": 1000, "text": 10})
+
+
+def test_create_checks_kind_and_length(store):
+    with pytest.raises(ValueError, match="Unknown upload kind"):
+        store.create("video", 10)
+    with pytest.raises(UploadTooLarge):
+        store.create("photo", 101)
+
+    session = store.create("text", 0, "empty.txt")
+    assert session.complete
+    assert session.sha256 == hashlib.sha256().hexdigest()
+
+
+def test_append_resumes_at_offset_and_hashes(store):
+    upload_id = store.create("voice", 12, "take.wav").upload_id
+
+    session = _append(store, upload_id, 0, b"hello ", b"wo")
+    assert (session.offset, session.complete, session.sha256) == (8, False, None)
+
+    with pytest.raises(UploadOffsetMismatch):
+        _append(store, upload_id, 6, b"xx")
+
+    session = _append(store, upload_id, 8, b"rld!")
+    assert session.complete
+    assert session.sha256 == hashlib.sha256(b"hello world!").hexdigest()
+    assert store.get(upload_id).sha256 == session.sha256
+
+
+def test_interrupted_chunk_stream_keeps_written_bytes(store):
+    upload_id = store.create("voice", 10).upload_id
+
+    async def dropped():
+        yield b"abcd"
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(store.append(upload_id, 0, dropped()))
+
+    assert store.get(upload_id).offset == 4
+    session = _append(store, upload_id, 4, b"efghij")
+    assert session.sha256 == hashlib.sha256(b"abcdefghij").hexdigest()
+
+
+def test_append_past_declared_length_keeps_allowed_part(store):
+    upload_id = store.create("photo", 4).upload_id
+
+    with pytest.raises(UploadTooLarge):
+        _append(store, upload_id, 0, b"ab", b"cdef")
+
+    session = store.get(upload_id)
+    assert session.complete
+    assert session.sha256 == hashlib.sha256(b"abcd").hexdigest()
+
+
+def test_hash_is_correct_when_processes_alternate(tmp_path):
+    # Two stores stand in for two API processes sharing one upload directory.
+    first, second = (UploadStore(tmp_path, limits={"voice": 100}) for _ in range(2))
+    upload_id = first.create("voice", 6).upload_id
+
+    _append(first, upload_id, 0, b"ab")
+    _append(second, upload_id, 2, b"cd")
+    session = _append(first, upload_id, 4, b"ef")
+
+    assert session.sha256 == hashlib.sha256(b"abcdef").hexdigest()
+
+
+def test_concurrent_append_is_locked(tmp_path):
+    first, second = (UploadStore(tmp_path, limits={"voice": 100}) for _ in range(2))
+    upload_id = first.create("voice", 6).upload_id
+
+    async def racing_chunks():
+        yield b"abc"
+        with pytest.raises(UploadLocked):
+            await second.append(upload_id, 3, _chunks(b"def"))
+        yield b"def"
+
+    session = asyncio.run(first.append(upload_id, 0, racing_chunks()))
+
+    assert session.sha256 == hashlib.sha256(b"abcdef").hexdigest()
+
+
+def test_claim_moves_completed_upload(store, tmp_path):
+    upload_id = store.create("photo", 3, "me.png").upload_id
+    run_dir = tmp_path / "run1"
+    run_dir.mkdir()
+
+    with pytest.raises(UploadOffsetMismatch):
+        store.claim(upload_id, "photo", run_dir, "photo")
+    _append(store, upload_id, 0, b"png")
+    with pytest.raises(ValueError, match="not voice"):
+        store.claim(upload_id, "voice", run_dir, "voice")
+
+    path = store.claim(upload_id, "photo", run_dir, "photo")
+
+    assert path == run_dir / "photo.png"
+    assert path.read_bytes() == b"png"
+    with pytest.raises(UploadNotFound):
+        store.get(upload_id)
+    with pytest.raises(UploadNotFound):
+        store.claim(upload_id, "photo", run_dir, "photo")
+    with pytest.raises(UploadNotFound):
+        _append(store, upload_id, 3, b"x")
+
+
+def test_expire_drops_idle_sessions(store):
+    upload_id = store.create("photo", 3).upload_id
+
+    assert store.expire(max_age_seconds=3600) == 0
+    assert store.expire(max_age_seconds=-1) == 1
+    with pytest.raises(UploadNotFound):
+        store.get(upload_id)
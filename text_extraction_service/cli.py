@@ -7,10 +7,22 @@ import os
 import re
 import sys
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from fal_integration_service.art_styles import (
+    DEFAULT_STYLE,
+    ArtStyle,
+    available_styles,
+    get_style,
+    style_choices_help,
+)
+from pipeline_runtime import metrics, providers, recording, tracing
+from pipeline_runtime.slots import slot
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 STYLE_PREFIX = "Sketched style, pencil lines, minimal shading."
 SCENE_PROMPT_MAX_TOKENS = 25
@@ -66,12 +78,25 @@ BANNED_TERMS_PATTERN = re.compile(
 
 def load_env() -> None:
     load_dotenv(override=True)
-    if not os.getenv("OPENAI_API_KEY"):
+    if providers.missing_api_keys(("openai",)):
         raise SystemExit(
             "OPENAI_API_KEY is not set. Add it to .env or your environment."
         )
 
 
+def _response_text(response: Any) -> str:
+    output_text = getattr(response, "output_text", None)
+    if isinstance(output_text, str):
+        return output_text.strip()
+    chunks: List[str] = []
+    for item in response.output:
+        if getattr(item, "type", None) == "message":
+            for content in item.content:
+                if getattr(content, "type", None) == "output_text":
+                    chunks.append(content.text)
+    return "".join(chunks).strip()
+
+
 def call_structured_output(
     client: OpenAI,
     model: str,
@@ -83,34 +108,34 @@ def call_structured_output(
     verbose: bool = False,
 ) -> Dict[str, Any]:
     logging.info("LLM call start: %s", schema_name)
-    response = client.responses.create(
-        model=model,
-        input=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=temperature,
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": schema_name,
-                "schema": schema,
-                "description": f"{schema_name} schema",
-                "strict": True,
-            }
-        },
-    )
-    output_text = getattr(response, "output_text", None)
-    if isinstance(output_text, str):
-        output_text = output_text.strip()
-    else:
-        chunks: List[str] = []
-        for item in response.output:
-            if getattr(item, "type", None) == "message":
-                for content in item.content:
-                    if getattr(content, "type", None) == "output_text":
-                        chunks.append(content.text)
-        output_text = "".join(chunks).strip()
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    with slot("openai"), metrics.provider_call("openai"), tracing.span(
+        schema_name, "llm", resource="openai", model=model,
+    ):
+        output_text = recording.call(
+            "openai",
+            schema_name,
+            {"model": model, "input": messages, "temperature": temperature},
+            lambda: _response_text(
+                client.responses.create(
+                    model=model,
+                    input=messages,
+                    temperature=temperature,
+                    text={
+                        "format": {
+                            "type": "json_schema",
+                            "name": schema_name,
+                            "schema": schema,
+                            "description": f"{schema_name} schema",
+                            "strict": True,
+                        }
+                    },
+                )
+            ),
+        )
     if not output_text:
         raise RuntimeError("No output_text returned from the model.")
     if verbose:
@@ -388,7 +413,7 @@ def main() -> None:
         raise SystemExit("--number-of-scenes must be >= 1.")
 
     load_env()
-    client = OpenAI()
+    client = providers.openai_client()
     art_style = get_style(args.style)
     logging.info("Using art style: %s (%s)", art_style.key, art_style.name)
 
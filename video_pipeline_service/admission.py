@@ -0,0 +1,156 @@
+"""Admission control and load reporting for ``/generate``.
+
+Every new run competes for the same provider slots and CPU, so under a
+burst accepting everything only makes every run slower.  An
+:class:`AdmissionPolicy` caps the runs that may be queued or running at
+once, in total and per client; the run index enforces the caps in the same
+transaction that creates the run (see :meth:`RunIndex.claim_run`), so they
+hold across API processes sharing the index.
+
+A rejected submission gets ``429`` with a ``Retry-After`` estimated from
+current throughput: the runs that must finish before there is room,
+divided by the rate at which runs finish.  That rate is the running runs
+over the EWMA of run durations (Little's law), which follows a burst at
+once; before any run has finished it is the completion rate of the last
+15 minutes, then a fixed default.  A client over its own cap is told the
+expected remaining time of its oldest run.
+
+:meth:`AdmissionController.readiness` reports the same load, with per-stage
+latency EWMAs, for ``/ready``: a load balancer can route away from a node
+while it answers ``503``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+from fastapi import Request
+
+from video_pipeline_service.run_index import CapacityExceeded, RunIndex
+
+DEFAULT_RETRY_AFTER_SECONDS = 30
+MAX_RETRY_AFTER_SECONDS = 900
+EWMA_ALPHA = 0.3
+# Completions in this window define the current throughput.
+THROUGHPUT_WINDOW_SECONDS = 900.0
+# Load is re-read from the index at most this often.
+STATS_TTL_SECONDS = 2.0
+
+
+@dataclass
+class AdmissionPolicy:
+    max_active_runs: int = 0
+    max_runs_per_client: int = 0
+    client_header: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "AdmissionPolicy":
+        """Build a policy from ``PIPELINE_MAX_ACTIVE_RUNS`` and friends.
+
+        Limits of ``0`` (the default) disable that cap.  Clients are told
+        apart by ``PIPELINE_CLIENT_HEADER`` (first value, e.g. an API key or
+        ``X-Forwarded-For``) when set, else by the peer address.
+        """
+        header = os.getenv("PIPELINE_CLIENT_HEADER", "").strip()
+        return cls(
+            max_active_runs=int(os.getenv("PIPELINE_MAX_ACTIVE_RUNS", "0")),
+            max_runs_per_client=int(os.getenv("PIPELINE_MAX_RUNS_PER_CLIENT", "0")),
+            client_header=header or None,
+        )
+
+
+@dataclass
+class LoadStats:
+    queued_runs: int = 0
+    running_runs: int = 0
+    finished_per_minute: float = 0.0
+    run_seconds_ewma: float | None = None
+    stage_seconds_ewma: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def active_runs(self) -> int:
+        return self.queued_runs + self.running_runs
+
+    def throughput_per_second(self) -> float:
+        """Runs finishing per second at the current concurrency."""
+        if self.run_seconds_ewma:
+            return max(self.running_runs, 1) / self.run_seconds_ewma
+        return self.finished_per_minute / 60.0
+
+
+class AdmissionController:
+    """Applies an :class:`AdmissionPolicy` against the load in *index*."""
+
+    def __init__(self, index: RunIndex, policy: AdmissionPolicy | None = None) -> None:
+        self.index = index
+        self.policy = policy or AdmissionPolicy.from_env()
+        self._stats: LoadStats | None = None
+        self._stats_at = 0.0
+        self._lock = threading.Lock()
+
+    def client_id(self, request: Request) -> str:
+        if self.policy.client_header:
+            value = request.headers.get(self.policy.client_header, "")
+            value = value.split(",", 1)[0].strip()
+            if value:
+                return value
+        return request.client.host if request.client else "unknown"
+
+    def limits(self) -> dict[str, int]:
+        """Keyword arguments for :meth:`RunIndex.claim_run`."""
+        return {
+            "max_active": self.policy.max_active_runs,
+            "max_per_client": self.policy.max_runs_per_client,
+        }
+
+    def stats(self) -> LoadStats:
+        with self._lock:
+            if self._stats is not None and time.monotonic() - self._stats_at < STATS_TTL_SECONDS:
+                return self._stats
+        stats = LoadStats(
+            finished_per_minute=60.0 * self.index.finished_since(
+                time.time() - THROUGHPUT_WINDOW_SECONDS,
+            ) / THROUGHPUT_WINDOW_SECONDS,
+            run_seconds_ewma=self.index.run_seconds_ewma(alpha=EWMA_ALPHA),
+            stage_seconds_ewma=self.index.stage_ewmas(alpha=EWMA_ALPHA),
+        )
+        for run in self.index.active_runs():
+            if run["status"] == "queued":
+                stats.queued_runs += 1
+            else:
+                stats.running_runs += 1
+        with self._lock:
+            self._stats, self._stats_at = stats, time.monotonic()
+        return stats
+
+    def retry_after(self, exc: CapacityExceeded) -> int:
+        """Seconds until the rejected submission is likely to be admitted."""
+        stats = self.stats()
+        excess = exc.active - exc.limit + 1
+        throughput = stats.throughput_per_second()
+        if exc.scope == "queue" and throughput > 0:
+            seconds = excess / throughput
+        elif stats.run_seconds_ewma is not None:
+            seconds = stats.run_seconds_ewma - (time.time() - exc.oldest)
+        else:
+            seconds = DEFAULT_RETRY_AFTER_SECONDS
+        return int(min(max(seconds, 1.0), MAX_RETRY_AFTER_SECONDS) + 0.5)
+
+    def readiness(self, worker_queue_depth: int = 0) -> tuple[bool, dict[str, object]]:
+        """Whether a new run would be admitted, and the load behind it."""
+        stats = self.stats()
+        limit = self.policy.max_active_runs
+        ready = limit <= 0 or stats.active_runs < limit
+        report = {
+            "ready": ready,
+            "active_runs": stats.active_runs,
+            "max_active_runs": limit,
+            "max_runs_per_client": self.policy.max_runs_per_client,
+            "worker_queue_depth": worker_queue_depth,
+            "throughput_per_minute": 60.0 * stats.throughput_per_second(),
+            **asdict(stats),
+        }
+        return ready, report
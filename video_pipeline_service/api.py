@@ -1,38 +1,311 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
+import logging
+import mimetypes
 import os
+import re
 import shutil
+import signal
+import sqlite3
 import subprocess
 import sys
 import time
 import uuid
 from pathlib import Path
 
-from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.requests import ClientDisconnect
 
 from fal_integration_service.art_styles import DEFAULT_STYLE, available_styles, get_style
+from media_service.hls import MEDIA_TYPES as HLS_MEDIA_TYPES, PLAYLIST_NAME, close_playlist
+from pipeline_runtime import cancellation, metrics
+from pipeline_runtime.slots import (
+    DEFAULT_PRIORITY,
+    PRIORITY_CLASSES,
+    PROVIDERS,
+    get_broker,
+)
+from video_pipeline_service.admission import AdmissionController
+from video_pipeline_service.run_index import (
+    ACTIVE_STATUSES,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    RUN_STATUSES,
+    CapacityExceeded,
+    RunIndex,
+)
+from video_pipeline_service.retention import (
+    DEFAULT_INTERVAL_SECONDS,
+    RetentionManager,
+)
+from video_pipeline_service.serving import artifact_response
+from video_pipeline_service.uploads import (
+    TUS_VERSION,
+    UPLOADS_DIR,
+    UploadNotFound,
+    UploadOffsetMismatch,
+    UploadLocked,
+    UploadSession,
+    UploadStore,
+    UploadTooLarge,
+    validate_utf8,
+)
+from video_pipeline_service.workers import DEFAULT_MAX_JOBS_PER_WORKER, PipelineWorkerPool
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
-OUTPUT_ROOT = ROOT_DIR / "pipeline_output"
+OUTPUT_ROOT = Path(os.getenv("PIPELINE_OUTPUT_ROOT", str(ROOT_DIR / "pipeline_output")))
+RUN_INDEX_PATH = Path(os.getenv("PIPELINE_RUN_INDEX", str(OUTPUT_ROOT / "runs.sqlite3")))
+
+# PIPELINE_WORKERS > 0 runs jobs on warm pre-forked workers instead of a
+# fresh ``cli.py`` process per request.
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "0"))
+PIPELINE_WORKER_MAX_JOBS = int(
+    os.getenv("PIPELINE_WORKER_MAX_JOBS", str(DEFAULT_MAX_JOBS_PER_WORKER))
+)
+# Queued/running runs older than this are failed as stuck (0 disables).
+PIPELINE_RUN_TIMEOUT = float(os.getenv("PIPELINE_RUN_TIMEOUT_SECONDS", str(4 * 3600)))
+# Seconds between retention passes over OUTPUT_ROOT (0 disables them).
+PIPELINE_RETENTION_INTERVAL = float(
+    os.getenv("PIPELINE_RETENTION_INTERVAL", str(DEFAULT_INTERVAL_SECONDS))
+)
+
+# Identical submissions within this many seconds reuse the earlier run.
+# Off by default: resubmitting the same inputs usually means "generate
+# again".  Idempotency-Key headers always apply.
+PIPELINE_DEDUPE_SECONDS = float(os.getenv("PIPELINE_DEDUPE_SECONDS", "0"))
+# Seconds between status checks while a duplicate waits on its run.
+ATTACH_POLL_SECONDS = 1.0
+# A duplicate waits at most this long before answering 202 with the run_id.
+PIPELINE_ATTACH_TIMEOUT = float(os.getenv("PIPELINE_ATTACH_TIMEOUT_SECONDS", "300"))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+TEXT_SUFFIXES = (".txt", ".md", ".csv")
+
+# Runs publish a live HLS playlist under /runs/{run_id}/hls/ when "on".
+# Opt-in, as in the CLI: it puts runs in streaming mode.
+PIPELINE_HLS = os.getenv("PIPELINE_HLS", "").lower() in ("1", "true", "on")
+HLS_DIR = "hls"
+HLS_FILE_NAME = re.compile(r"[A-Za-z0-9_]+\.(m3u8|m4s|mp4)")
+
+# Artifact kinds served by /runs/{run_id}/artifacts/{kind}[/{scene_id}].
+ARTIFACT_MEDIA_TYPES = {
+    "final_video": "video/mp4",
+    "clip": "video/mp4",
+    "clip_av": "video/mp4",
+    "audio": "audio/wav",
+    "scene_image": "",
+    "scene_plan": "application/json",
+    "voice_manifest": "application/json",
+    "final_manifest": "application/json",
+    "log": "text/plain; charset=utf-8",
+}
+
+_worker_pool: PipelineWorkerPool | None = None
+# Pids of cli.py subprocesses started by this process (non-worker mode).
+_child_pids: set[int] = set()
+run_index = RunIndex(str(RUN_INDEX_PATH))
+admission = AdmissionController(run_index)
+upload_store = UploadStore(OUTPUT_ROOT / UPLOADS_DIR)
+
+
+def _reconcile_runs() -> None:
+    """Fail runs left queued/running by a dead process (see RunIndex.reconcile_orphans)."""
+    for run_id in run_index.reconcile_orphans(timeout_seconds=PIPELINE_RUN_TIMEOUT):
+        logging.warning("Run index: marked orphaned run %s failed", run_id)
+
+
+async def _retention_loop(interval: float) -> None:
+    manager = RetentionManager(OUTPUT_ROOT, index=run_index)
+    while True:
+        try:
+            await asyncio.to_thread(_reconcile_runs)
+            # Expired upload sessions first: the budget counts them too.
+            await asyncio.to_thread(upload_store.expire)
+            await asyncio.to_thread(manager.collect)
+        except Exception:
+            logging.exception("Retention: collection pass failed")
+        await asyncio.sleep(interval)
+
 
-app = FastAPI()
+@contextlib.asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    global _worker_pool
+    # Runs in flight when a previous API process stopped can never finish.
+    await asyncio.to_thread(_reconcile_runs)
+    if PIPELINE_WORKERS > 0:
+        _worker_pool = PipelineWorkerPool(
+            PIPELINE_WORKERS, max_jobs_per_worker=PIPELINE_WORKER_MAX_JOBS,
+        )
+        _worker_pool.start()
+    retention_task = None
+    if PIPELINE_RETENTION_INTERVAL > 0:
+        retention_task = asyncio.create_task(_retention_loop(PIPELINE_RETENTION_INTERVAL))
+    try:
+        yield
+    finally:
+        if retention_task is not None:
+            retention_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await retention_task
+        if _worker_pool is not None:
+            _worker_pool.shutdown()
+            _worker_pool = None
+
+
+app = FastAPI(lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Location", "Upload-Offset", "Upload-Length", "Tus-Resumable", "Retry-After", "ETag",
+    ],
 )
 
 
+def _new_run_id() -> str:
+    return f"run_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
 def _create_run_dir(run_id: str | None = None) -> tuple[str, Path]:
-    run_id = run_id or f"run_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    run_id = run_id or _new_run_id()
     run_dir = OUTPUT_ROOT / run_id
     run_dir.mkdir(parents=True, exist_ok=False)
     return run_id, run_dir
 
 
+def _upload_sha256(upload: UploadFile) -> str:
+    digest = hashlib.sha256()
+    upload.file.seek(0)
+    for chunk in iter(lambda: upload.file.read(1 << 20), b""):
+        digest.update(chunk)
+    upload.file.seek(0)
+    return digest.hexdigest()
+
+
+def _content_hash(
+    text_sha256: str,
+    photo_sha256: str,
+    voice_sha256: str,
+    style: str,
+    number_of_scenes: int | None,
+) -> str:
+    """Hash of everything that determines a run's output.
+
+    Pasted text and an uploaded file with the same UTF-8 bytes hash alike;
+    priority and deadline only affect scheduling and are left out.
+    """
+    parts = {
+        "text": text_sha256,
+        "photo": photo_sha256,
+        "voice": voice_sha256,
+        "style": style,
+        "scenes": str(number_of_scenes or ""),
+    }
+    return hashlib.sha256(
+        "\n".join(f"{name}={value}" for name, value in parts.items()).encode("utf-8")
+    ).hexdigest()
+
+
+def _upload_session(upload_id: str, kind: str) -> UploadSession:
+    """A completed resumable upload of *kind*, or an HTTP error."""
+    try:
+        session = upload_store.get(upload_id)
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found.") from exc
+    if session.kind != kind:
+        raise HTTPException(
+            status_code=400, detail=f"Upload {upload_id} is a {session.kind} upload, not {kind}.",
+        )
+    if not session.complete:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload {upload_id} is incomplete ({session.offset}/{session.length} bytes).",
+        )
+    return session
+
+
+def _input_sha256(upload: UploadFile | None, session: UploadSession | None) -> str:
+    if session is not None:
+        return str(session.sha256)
+    return _upload_sha256(upload)
+
+
+def _place_input(
+    upload: UploadFile | None,
+    upload_id: str | None,
+    kind: str,
+    run_dir: Path,
+    stem: str,
+    suffix: str | None = None,
+) -> Path:
+    """Move a resumable upload into *run_dir*, or save a multipart one.
+
+    A session claimed by a concurrent ``/generate`` (or deleted, or still
+    being written) is a conflict, not a server error.
+    """
+    if upload_id is not None:
+        try:
+            return upload_store.claim(upload_id, kind, run_dir, stem, suffix)
+        except UploadNotFound as exc:
+            raise HTTPException(
+                status_code=409, detail=f"Upload {upload_id} was already used or deleted.",
+            ) from exc
+        except (UploadLocked, ValueError, OSError) as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return _save_upload(upload, run_dir, stem)
+
+
+def _run_result(request: Request, run_id: str) -> dict[str, str]:
+    base = str(request.base_url).rstrip("/")
+    result = {"run_id": run_id, "video_url": f"{base}/video/{run_id}"}
+    if PIPELINE_HLS:
+        result["hls_url"] = f"{base}/runs/{run_id}/{HLS_DIR}/{PLAYLIST_NAME}"
+    return result
+
+
+async def _attach_to_run(
+    request: Request, run: dict[str, object],
+) -> dict[str, str] | JSONResponse:
+    """Wait for an existing run to finish and answer as its own request would.
+
+    Gives up after ``PIPELINE_ATTACH_TIMEOUT`` with ``202`` and the run's
+    status URL, so a duplicate of a slow (or stuck) run does not hold its
+    connection open indefinitely.
+    """
+    run_id = str(run["run_id"])
+    deadline = time.monotonic() + PIPELINE_ATTACH_TIMEOUT
+    while run is not None and run["status"] in ACTIVE_STATUSES:
+        if time.monotonic() >= deadline:
+            status_url = f"{str(request.base_url).rstrip('/')}/runs/{run_id}"
+            return JSONResponse(
+                status_code=202,
+                content={
+                    **_run_result(request, run_id),
+                    "status": run["status"],
+                    "status_url": status_url,
+                },
+                headers={"Location": status_url},
+            )
+        await asyncio.sleep(ATTACH_POLL_SECONDS)
+        run = await asyncio.to_thread(run_index.get_run, run_id)
+    if run is not None and run["status"] == "cancelled":
+        raise HTTPException(status_code=409, detail="Run was cancelled.")
+    if run is None or run["status"] != "succeeded":
+        run_dir = Path(str(run["run_dir"])) if run and run["run_dir"] else OUTPUT_ROOT / run_id
+        detail = _read_log_tail(run_dir / "pipeline.log") or "Pipeline failed."
+        raise HTTPException(status_code=500, detail=detail)
+    return _run_result(request, run_id)
+
+
 def _save_upload(upload: UploadFile, run_dir: Path, stem: str) -> Path:
     suffix = Path(upload.filename or "").suffix
     path = run_dir / f"{stem}{suffix}"
@@ -41,24 +314,30 @@ def _save_upload(upload: UploadFile, run_dir: Path, stem: str) -> Path:
     return path
 
 
-def _write_text_upload(upload: UploadFile, run_dir: Path) -> Path:
-    suffix = Path(upload.filename or "").suffix.lower()
-    allowed = {".txt", ".md", ".csv"}
-    if suffix not in allowed:
+def _check_text_suffix(filename: str | None) -> None:
+    if Path(filename or "").suffix.lower() not in TEXT_SUFFIXES:
         raise HTTPException(
             status_code=400,
             detail="Only text files are supported right now. Paste the text instead.",
         )
-    raw = upload.file.read()
+
+
+def _check_utf8(path: Path) -> None:
     try:
-        text = raw.decode("utf-8")
+        validate_utf8(path)
     except UnicodeDecodeError as exc:
         raise HTTPException(
             status_code=400,
             detail="Text file must be UTF-8 encoded. Paste the text instead.",
         ) from exc
+
+
+def _write_text_upload(upload: UploadFile, run_dir: Path) -> Path:
+    _check_text_suffix(upload.filename)
     path = run_dir / "input.txt"
-    path.write_text(text, encoding="utf-8")
+    with path.open("wb") as handle:
+        shutil.copyfileobj(upload.file, handle)
+    _check_utf8(path)
     return path
 
 
@@ -72,6 +351,49 @@ def _read_log_tail(path: Path, max_bytes: int = 8000) -> str:
         return handle.read().decode("utf-8", errors="replace").strip()
 
 
+async def _run_pipeline_job(argv: list[str], log_path: Path, run_id: str) -> int:
+    env = {"PIPELINE_RUN_ID": run_id}
+    if _worker_pool is not None:
+        future = _worker_pool.submit(argv, str(log_path), env)
+        return await asyncio.wrap_future(future)
+
+    cmd = [
+        sys.executable,
+        "-u",
+        str(ROOT_DIR / "video_pipeline_service" / "cli.py"),
+        *argv,
+    ]
+    with log_path.open("w", encoding="utf-8") as handle:
+        process_env = os.environ.copy()
+        process_env["PYTHONUNBUFFERED"] = "1"
+        process_env.update(env)
+        process = subprocess.Popen(
+            cmd,
+            stdout=handle,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=process_env,
+        )
+        _child_pids.add(process.pid)
+        try:
+            return await asyncio.to_thread(process.wait)
+        finally:
+            _child_pids.discard(process.pid)
+
+
+def _is_run_process(run: dict[str, object]) -> bool:
+    """Whether the pid recorded for *run* is still the process running it."""
+    pid = run["pid"]
+    if not pid:
+        return False
+    same = cancellation.same_process(int(pid), run["pid_started"])
+    if same is not None:
+        return same
+    # No start time to compare: only trust processes this API launched.
+    return pid in _child_pids or (_worker_pool is not None and pid in _worker_pool.pids())
+
+
 def _safe_voice_name(filename: str | None) -> str:
     raw = Path(filename or "").stem.strip()
     if not raw:
@@ -85,36 +407,138 @@ async def generate(
     request: Request,
     text: str | None = Form(None),
     file: UploadFile | None = File(None),
-    photo: UploadFile = File(...),
-    voice: UploadFile = File(...),
+    photo: UploadFile | None = File(None),
+    voice: UploadFile | None = File(None),
+    text_upload_id: str | None = Form(None),
+    photo_upload_id: str | None = Form(None),
+    voice_upload_id: str | None = Form(None),
     run_id: str | None = Form(None),
     style: str | None = Form(None),
     number_of_scenes: int | None = Form(None),
+    priority: str | None = Form(None),
+    deadline_seconds: float | None = Form(None),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ) -> dict[str, str]:
-    if bool(text) == bool(file):
+    if sum(bool(source) for source in (text, file, text_upload_id)) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide exactly one of text, a file or text_upload_id.",
+        )
+    for name, upload, upload_id in (
+        ("photo", photo, photo_upload_id),
+        ("voice", voice, voice_upload_id),
+    ):
+        if (upload is None) == (upload_id is None):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Provide exactly one of {name} or {name}_upload_id.",
+            )
+    text_session = photo_session = voice_session = None
+    if text_upload_id is not None:
+        text_session = _upload_session(text_upload_id, "text")
+        _check_text_suffix(text_session.filename)
+    if photo_upload_id is not None:
+        photo_session = _upload_session(photo_upload_id, "photo")
+    if voice_upload_id is not None:
+        voice_session = _upload_session(voice_upload_id, "voice")
+    priority = priority or DEFAULT_PRIORITY
+    if priority not in PRIORITY_CLASSES:
         raise HTTPException(
             status_code=400,
-            detail="Provide either text or a file (but not both).",
+            detail=f"Unknown priority. Available: {', '.join(PRIORITY_CLASSES)}.",
         )
 
-    run_id, run_dir = _create_run_dir(run_id)
+    if deadline_seconds is not None and deadline_seconds <= 0:
+        raise HTTPException(status_code=400, detail="deadline_seconds must be positive.")
+
+    if idempotency_key is not None and not (
+        0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters.",
+        )
+
+    style_key = style or DEFAULT_STYLE
+    if text is not None:
+        text_sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    else:
+        text_sha256 = await asyncio.to_thread(_input_sha256, file, text_session)
+    content_hash = _content_hash(
+        text_sha256,
+        await asyncio.to_thread(_input_sha256, photo, photo_session),
+        await asyncio.to_thread(_input_sha256, voice, voice_session),
+        style_key,
+        number_of_scenes,
+    )
+    run_id = run_id or _new_run_id()
+    try:
+        run, created = await asyncio.to_thread(
+            run_index.claim_run,
+            run_id,
+            idempotency_key=idempotency_key,
+            content_hash=content_hash,
+            dedupe_seconds=PIPELINE_DEDUPE_SECONDS,
+            client=admission.client_id(request),
+            **admission.limits(),
+            run_dir=str(OUTPUT_ROOT / run_id),
+            style=style_key,
+            priority=priority,
+        )
+    except CapacityExceeded as exc:
+        retry_after = await asyncio.to_thread(admission.retry_after, exc)
+        metrics.inc("pipeline_admission_rejected_total", scope=exc.scope)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many active runs ({exc}). Retry in {retry_after}s.",
+            headers={"Retry-After": str(retry_after)},
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except sqlite3.IntegrityError as exc:
+        raise HTTPException(status_code=409, detail="run_id already exists.") from exc
+    if not created:
+        for upload in (file, photo, voice):
+            if upload is not None and upload.file:
+                upload.file.close()
+        # Upload sessions are left to ``expire``: one may still be written to
+        # or claimed by another request, and only it holds the session lock.
+        by_key = idempotency_key is not None and run["idempotency_key"] == idempotency_key
+        metrics.inc(
+            "pipeline_generate_deduplicated_total",
+            reason="idempotency_key" if by_key else "content",
+        )
+        logging.info("Generate: submission duplicates run %s (%s)", run["run_id"], run["status"])
+        return await _attach_to_run(request, run)
+
+    try:
+        run_id, run_dir = _create_run_dir(run_id)
+    except FileExistsError as exc:
+        await asyncio.to_thread(
+            run_index.upsert_run, run_id, "failed", error="run directory already exists",
+        )
+        raise HTTPException(status_code=409, detail="run_id already exists.") from exc
+    except BaseException as exc:
+        await asyncio.to_thread(run_index.upsert_run, run_id, "failed", error=repr(exc))
+        raise
     input_path = None
     try:
         if file is not None:
             input_path = _write_text_upload(file, run_dir)
+        elif text_upload_id is not None:
+            input_path = _place_input(None, text_upload_id, "text", run_dir, "input", ".txt")
+            _check_utf8(input_path)
         else:
             input_path = run_dir / "input.txt"
             input_path.write_text(text or "", encoding="utf-8")
 
-        photo_path = _save_upload(photo, run_dir, "photo")
-        voice_path = _save_upload(voice, run_dir, "voice")
-        voice_name = _safe_voice_name(voice.filename)
+        photo_path = _place_input(photo, photo_upload_id, "photo", run_dir, "photo")
+        voice_path = _place_input(voice, voice_upload_id, "voice", run_dir, "voice")
+        voice_name = _safe_voice_name(
+            voice.filename if voice is not None else voice_session.filename,
+        )
 
-        style_key = style or DEFAULT_STYLE
-        cmd = [
-            sys.executable,
-            "-u",
-            str(ROOT_DIR / "video_pipeline_service" / "cli.py"),
+        argv = [
             "--input-file",
             str(input_path),
             "--create-custom-voice",
@@ -128,26 +552,42 @@ async def generate(
             str(run_dir),
             "--style",
             style_key,
+            "--priority",
+            priority,
+            "--run-index",
+            str(RUN_INDEX_PATH),
         ]
         if number_of_scenes:
-            cmd.extend(["--number-of-scenes", str(number_of_scenes)])
+            argv.extend(["--number-of-scenes", str(number_of_scenes)])
+        if deadline_seconds:
+            argv.extend(["--deadline-seconds", str(deadline_seconds)])
+        if PIPELINE_HLS:
+            argv.append("--hls")
         log_path = run_dir / "pipeline.log"
-        with log_path.open("w", encoding="utf-8") as handle:
-            env = os.environ.copy()
-            env["PYTHONUNBUFFERED"] = "1"
-            process = subprocess.Popen(
-                cmd,
-                stdout=handle,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                env=env,
-            )
-            returncode = process.wait()
+        await asyncio.to_thread(run_index.add_artifact, run_id, "log", str(log_path))
+        returncode = await _run_pipeline_job(argv, log_path, run_id)
         if returncode != 0:
             detail = _read_log_tail(log_path) or "Pipeline failed."
+            # The CLI records "failed" itself; this covers crashes before it could.
+            run = await asyncio.to_thread(run_index.get_run, run_id)
+            if run is not None and run["status"] == "cancelled":
+                raise HTTPException(status_code=409, detail="Run was cancelled.")
+            if run is None or run["status"] in ("queued", "running"):
+                await asyncio.to_thread(
+                    run_index.upsert_run, run_id, "failed", error=f"exit code {returncode}",
+                )
             raise HTTPException(status_code=500, detail=detail)
+    except BaseException as exc:
+        # Anything that stops the run before it starts must not leave it
+        # queued, where it would count against admission limits.
+        error = exc.detail if isinstance(exc, HTTPException) else repr(exc)
+        run = await asyncio.to_thread(run_index.get_run, run_id)
+        if run is not None and run["status"] == "queued":
+            await asyncio.to_thread(run_index.upsert_run, run_id, "failed", error=str(error))
+        raise
     finally:
+        # A crashed run can't close its own playlist; end it for players.
+        close_playlist(str(run_dir / HLS_DIR))
         for upload in (file, photo, voice):
             if upload is not None and upload.file:
                 upload.file.close()
@@ -156,24 +596,321 @@ async def generate(
     if not final_video.exists():
         raise HTTPException(status_code=500, detail="Final video not found.")
 
-    base = str(request.base_url).rstrip("/")
-    return {"run_id": run_id, "video_url": f"{base}/video/{run_id}"}
+    return _run_result(request, run_id)
+
+
+def _tus_headers(**extra: str) -> dict[str, str]:
+    return {"Tus-Resumable": TUS_VERSION, **extra}
+
+
+def _parse_upload_metadata(raw: str) -> dict[str, str]:
+    """Decode a tus ``Upload-Metadata`` header: ``key base64value, ...``."""
+    metadata = {}
+    for item in raw.split(","):
+        key, _, value = item.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError) as exc:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid Upload-Metadata value for {key!r}.",
+            ) from exc
+    return metadata
+
+
+@app.options("/uploads")
+def upload_options() -> Response:
+    return Response(
+        status_code=204,
+        headers=_tus_headers(**{
+            "Tus-Version": TUS_VERSION,
+            "Tus-Extension": "creation,termination",
+            "Tus-Max-Size": str(max(upload_store.limits.values())),
+        }),
+    )
+
+
+@app.post("/uploads")
+def create_upload(
+    request: Request,
+    upload_length: int = Header(..., alias="Upload-Length"),
+    upload_metadata: str = Header("", alias="Upload-Metadata"),
+) -> Response:
+    """Start a resumable upload; metadata needs ``kind`` (photo, voice or text)."""
+    metadata = _parse_upload_metadata(upload_metadata)
+    try:
+        session = upload_store.create(
+            metadata.get("kind", ""), upload_length, metadata.get("filename", ""),
+        )
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    location = f"{str(request.base_url).rstrip('/')}/uploads/{session.upload_id}"
+    return Response(
+        status_code=201,
+        headers=_tus_headers(Location=location, **{"Upload-Offset": "0"}),
+    )
+
+
+@app.head("/uploads/{upload_id}")
+def get_upload_offset(upload_id: str) -> Response:
+    """Offset to resume a resumable upload from."""
+    try:
+        session = upload_store.get(upload_id)
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="Upload not found.") from exc
+    return Response(
+        headers=_tus_headers(**{
+            "Upload-Offset": str(session.offset),
+            "Upload-Length": str(session.length),
+            "Cache-Control": "no-store",
+        }),
+    )
+
+
+@app.patch("/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+) -> Response:
+    """Append the request body at *Upload-Offset*, streaming it to disk."""
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=415, detail="Content-Type must be application/offset+octet-stream.",
+        )
+    try:
+        session = upload_store.get(upload_id)
+        # Refuse an oversized chunk before reading any of it.
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and upload_offset + int(declared) > session.length:
+            raise UploadTooLarge(f"Upload exceeds its declared length of {session.length} bytes")
+        session = await upload_store.append(upload_id, upload_offset, request.stream())
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="Upload not found.") from exc
+    except UploadOffsetMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except UploadLocked as exc:
+        raise HTTPException(status_code=423, detail=str(exc)) from exc
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except ClientDisconnect:
+        # What arrived is kept; the client resumes from HEAD's offset.
+        return Response(status_code=400)
+    return Response(
+        status_code=204, headers=_tus_headers(**{"Upload-Offset": str(session.offset)}),
+    )
+
+
+@app.delete("/uploads/{upload_id}")
+def delete_upload(upload_id: str) -> Response:
+    try:
+        upload_store.get(upload_id)
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="Upload not found.") from exc
+    upload_store.delete(upload_id)
+    return Response(status_code=204, headers=_tus_headers())
+
+
+@app.get("/runs")
+def list_runs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    status: str | None = None,
+    style: str | None = None,
+    created_after: float | None = None,
+    created_before: float | None = None,
+) -> dict[str, object]:
+    """Page through runs, newest first.
+
+    Filters combine: *status*, *style*, and a creation time range given as
+    Unix timestamps (*created_after* inclusive, *created_before* exclusive).
+    """
+    if status is not None and status not in RUN_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown status. Available: {', '.join(RUN_STATUSES)}.",
+        )
+    try:
+        runs, next_cursor = run_index.list_runs(
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            style=style,
+            created_after=created_after,
+            created_before=created_before,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"runs": runs, "next_cursor": next_cursor}
+
+
+@app.get("/runs/{run_id}")
+def get_run(run_id: str) -> dict[str, object]:
+    run = run_index.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found.")
+    return run
+
+
+@app.delete("/runs/{run_id}")
+def cancel_run(run_id: str) -> dict[str, object]:
+    """Cancel a queued or running run.
+
+    The run is marked ``cancelled`` first, so a queued run never starts;
+    a running one is sent SIGTERM and stops its fal requests and ffmpeg
+    children.  Artifacts written so far are kept.
+    """
+    run = run_index.cancel_run(run_id)
+    if run is None:
+        existing = run_index.get_run(run_id)
+        if existing is None:
+            raise HTTPException(status_code=404, detail="Run not found.")
+        raise HTTPException(
+            status_code=409, detail=f"Run already {existing['status']}.",
+        )
+    signalled = False
+    if _is_run_process(run):
+        try:
+            os.kill(run["pid"], signal.SIGTERM)
+            signalled = True
+        except ProcessLookupError:
+            pass
+    logging.info("Cancel: run %s cancelled (signalled: %s)", run_id, signalled)
+    # A crashed run can't close its own playlist; end it for players.
+    close_playlist(str(Path(run["run_dir"] or OUTPUT_ROOT / run_id) / HLS_DIR))
+    return {"run_id": run_id, "status": "cancelled", "signalled": signalled}
 
 
 @app.get("/video/{run_id}")
-def get_video(run_id: str) -> FileResponse:
-    video_path = OUTPUT_ROOT / run_id / "final_video.mp4"
+def get_video(run_id: str, request: Request) -> Response:
+    indexed = run_index.find_artifact(run_id, "final_video")
+    video_path = Path(indexed) if indexed else OUTPUT_ROOT / run_id / "final_video.mp4"
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video not found.")
-    return FileResponse(video_path, media_type="video/mp4", filename=f"{run_id}.mp4")
+    run_index.touch_run(run_id)
+    return artifact_response(
+        request,
+        run_index,
+        run_id,
+        video_path,
+        media_type="video/mp4",
+        output_root=OUTPUT_ROOT,
+        filename=f"{run_id}.mp4",
+    )
+
+
+@app.get("/runs/{run_id}/artifacts/{kind}")
+@app.get("/runs/{run_id}/artifacts/{kind}/{scene_id}")
+def get_artifact(run_id: str, kind: str, request: Request, scene_id: int = 0) -> Response:
+    """Final video, per-scene clips/audio/stills, manifests and the log of a run."""
+    media_type = ARTIFACT_MEDIA_TYPES.get(kind)
+    if media_type is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown artifact kind. Available: {', '.join(ARTIFACT_MEDIA_TYPES)}.",
+        )
+    artifact = run_index.get_artifact(run_id, kind, scene_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found.")
+    path = Path(artifact["path"])
+    if kind == "final_video":
+        run_index.touch_run(run_id)
+    return artifact_response(
+        request,
+        run_index,
+        run_id,
+        path,
+        media_type=media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        output_root=OUTPUT_ROOT,
+    )
+
+
+@app.get("/runs/{run_id}/hls/{name}")
+def get_hls(run_id: str, name: str) -> FileResponse:
+    """Live playlist (``index.m3u8``), init and media segments of a run."""
+    if not HLS_FILE_NAME.fullmatch(name):
+        raise HTTPException(status_code=404, detail="Not found.")
+    indexed = run_index.find_artifact(run_id, "hls_playlist")
+    hls_dir = Path(indexed).parent if indexed else OUTPUT_ROOT / run_id / HLS_DIR
+    path = hls_dir / name
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Not found.")
+    headers = {}
+    if name.endswith(".m3u8"):
+        # The playlist grows while the run renders; segments never change.
+        headers["Cache-Control"] = "no-cache"
+    else:
+        headers["Cache-Control"] = "public, max-age=86400"
+    return FileResponse(path, media_type=HLS_MEDIA_TYPES[path.suffix], headers=headers)
 
 
 @app.get("/logs/{run_id}")
-def get_logs(run_id: str) -> dict[str, str]:
+def get_logs(run_id: str, offset: int = Query(0, ge=0)) -> dict[str, object]:
+    """Log text from byte *offset* on; pass the returned ``offset`` to poll."""
     log_path = OUTPUT_ROOT / run_id / "pipeline.log"
     if not log_path.exists():
-        return {"log": ""}
-    return {"log": log_path.read_text(encoding="utf-8", errors="replace")}
+        return {"log": "", "offset": 0}
+    with log_path.open("rb") as handle:
+        handle.seek(offset)
+        data = handle.read()
+    return {"log": data.decode("utf-8", errors="replace"), "offset": offset + len(data)}
+
+
+@app.get("/slots")
+def get_slots() -> dict[str, object]:
+    broker = get_broker()
+    if broker is None:
+        return {"enabled": False, "providers": {}}
+    return {
+        "enabled": True,
+        "providers": {provider: broker.snapshot(provider) for provider in PROVIDERS},
+    }
+
+
+@app.get("/ready")
+def get_ready() -> JSONResponse:
+    """Readiness for load balancers: 503 while new runs would be rejected."""
+    queue_depth = _worker_pool.queue_depth() if _worker_pool is not None else 0
+    ready, report = admission.readiness(queue_depth)
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+def get_metrics() -> PlainTextResponse:
+    queue_depth = _worker_pool.queue_depth() if _worker_pool is not None else 0
+    active: dict[str, float] = {
+        metrics.labels_key(status=status): 0.0 for status in ("queued", "running")
+    }
+    for run in run_index.active_runs():
+        active[metrics.labels_key(status=run["status"])] += 1
+    slots_in_use: dict[str, float] = {}
+    slots_waiting: dict[str, float] = {}
+    broker = get_broker()
+    if broker is not None:
+        for provider in PROVIDERS:
+            snapshot = broker.snapshot(provider)
+            slots_in_use[metrics.labels_key(provider=provider)] = snapshot["in_use"]
+            slots_waiting[metrics.labels_key(provider=provider)] = snapshot["waiting"]
+    body = metrics.render(
+        metrics.collect(),
+        {
+            "pipeline_queue_depth": (
+                "Jobs waiting for a warm worker.",
+                {metrics.labels_key(): queue_depth},
+            ),
+            "pipeline_runs_active": ("Runs queued or running.", active),
+            "pipeline_provider_slots_in_use": (
+                "Provider slots held across all runs.", slots_in_use,
+            ),
+            "pipeline_provider_slots_waiting": (
+                "Provider slot requests waiting across all runs.", slots_waiting,
+            ),
+        },
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 
 @app.get("/styles")
@@ -1,17 +1,19 @@
+from __future__ import annotations
+
 import argparse
 import asyncio
+import contextlib
 import json
 import logging
 import os
-import subprocess
-import tempfile
-from typing import Any, Dict, List
+import time
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
 
 from dotenv import load_dotenv
-import imageio_ffmpeg
-import gradium
 
 from voice_gen_service.cli import VoiceConfig, run_tts
+from fal_integration_service.deadline import DeadlinePlanner
 from fal_integration_service.scenes import load_storyboard, parse_storyboard
 from fal_integration_service.storyboard_pipeline import (
     DEFAULT_FAL_CONCURRENCY,
@@ -29,20 +31,65 @@ from text_extraction_service.cli import (
     generate_scene_prompt,
     normalize_scene_ids,
 )
-from openai import OpenAI
+from media_service.assembly import (
+    DEFAULT_RETIME_MODE,
+    ENGINE_CHOICES,
+    RETIME_MODES,
+    drain_step_timings,
+    get_engine,
+    reset_step_timings,
+    set_default_engine,
+    step_timings,
+)
+from media_service.hls import HlsPlaylist, close_playlist
+from media_service.segments import DEFAULT_BATCH_SIZE, SegmentConcat
+from pipeline_runtime import cancellation, metrics, providers, recording, tracing
+from pipeline_runtime.slots import (
+    DEFAULT_PRIORITY,
+    PRIORITY_CLASSES,
+    async_slot,
+    configure_run,
+    limits_from_env,
+)
+from video_pipeline_service.run_index import RunIndex, RunRecorder
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Time kept back for mux and concat when planning a deadline run without history.
+DEFAULT_ASSEMBLY_RESERVE_SECONDS = 2.0
+DEFAULT_ASSEMBLY_RESERVE_PER_SCENE = 0.5
+
+# Live HLS playlist of the run, relative to --output-dir.
+HLS_DIR = "hls"
+
+# Provider SDKs (openai, gradium, fal_client, imageio_ffmpeg, requests) are
+# imported inside the functions that use them so ``--help``, argument
+# validation and ``--scene-plan`` runs don't pay for unused backends.
+
+
+_ENV_LOADED = False
+
+
+def load_dotenv_once() -> None:
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv(override=True)
+        _ENV_LOADED = True
 
 
 def load_env() -> None:
-    load_dotenv(override=True)
-    missing = []
-    if not os.getenv("GRADIUM_API_KEY"):
-        missing.append("GRADIUM_API_KEY")
-    if not os.getenv("FAL_KEY"):
-        missing.append("FAL_KEY")
+    load_dotenv_once()
+    missing = providers.missing_api_keys(("gradium", "fal"))
     if missing:
         raise SystemExit(f"Missing required env vars: {', '.join(missing)}")
 
 
+def get_openai_client() -> OpenAI:
+    """Return a process-wide OpenAI client (keeps its connection pool warm)."""
+    return providers.openai_client()
+
+
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
@@ -52,6 +99,16 @@ def write_json(path: str, payload: Dict[str, Any]) -> None:
         json.dump(payload, handle, indent=2, ensure_ascii=True)
 
 
+def _encode_voice_result(result: Any) -> Any:
+    """Keep Gradium voice responses JSON-serialisable for the recording."""
+    if result is None or isinstance(result, (dict, list)):
+        return result
+    return {
+        "uid": getattr(result, "uid", None),
+        "voice_id": getattr(result, "voice_id", None),
+    }
+
+
 async def create_custom_voice(
     audio_path: str,
     name: str,
@@ -63,10 +120,18 @@ async def create_custom_voice(
 ) -> str:
     if not os.path.isfile(audio_path):
         raise SystemExit(f"Custom voice audio file not found: {audio_path}")
-    client = gradium.client.GradiumClient()
+    gradium = providers.gradium_sdk()
+    client = providers.gradium_client()
 
     # Fast path: reuse existing voice with the same name.
-    voices = await gradium.voices.get(client)
+    async with async_slot("gradium"):
+        voices = await recording.acall(
+            "gradium",
+            "voices.list",
+            {},
+            lambda: gradium.voices.get(client),
+            encode=_encode_voice_result,
+        )
     if isinstance(voices, list):
         matches = [
             voice for voice in voices
@@ -84,13 +149,23 @@ async def create_custom_voice(
 
     last_error = None
     logging.info("Custom voice: create request")
-    result = await gradium.voices.create(
-        client,
-        audio_file=audio_path,
-        name=name,
-        description=description,
-        start_s=start_s or 0.0,
-    )
+    async with async_slot("gradium"):
+        with metrics.provider_call("gradium"), tracing.span(
+            "voice create", "voice", resource="gradium",
+        ):
+            result = await recording.acall(
+                "gradium",
+                "voices.create",
+                {"name": name, "description": description, "start_s": start_s or 0.0},
+                lambda: gradium.voices.create(
+                    client,
+                    audio_file=audio_path,
+                    name=name,
+                    description=description,
+                    start_s=start_s or 0.0,
+                ),
+                encode=_encode_voice_result,
+            )
     if isinstance(result, dict) and result.get("error"):
         last_error = result.get("error")
         raise SystemExit(f"Gradium voice creation failed: {last_error}")
@@ -104,6 +179,7 @@ async def create_custom_voice(
         raise SystemExit("Gradium voice creation did not return a voice id.")
 
     # Poll voice status until ready or attempts exhausted.
+    ready_from = tracing.mark()
     for attempt in range(1, max_attempts + 1):
         logging.info(
             "Custom voice: status check %d/%d",
@@ -111,9 +187,18 @@ async def create_custom_voice(
             max_attempts,
         )
         try:
-            voice = await gradium.voices.get(client, voice_uid=str(voice_id))
+            async with async_slot("gradium"):
+                voice = await recording.acall(
+                    "gradium",
+                    "voices.get",
+                    {"voice_uid": str(voice_id)},
+                    lambda: gradium.voices.get(client, voice_uid=str(voice_id)),
+                    encode=_encode_voice_result,
+                )
         except Exception as exc:
             last_error = str(exc)
+            metrics.inc("pipeline_provider_errors_total", provider="gradium")
+            metrics.inc("pipeline_provider_retries_total", provider="gradium")
             logging.info(
                 "Custom voice: status check failed (%s), retrying in %.1fs",
                 last_error,
@@ -125,6 +210,7 @@ async def create_custom_voice(
         if isinstance(voice, dict):
             if voice.get("is_pending") is False and voice.get("has_audio") is True:
                 logging.info("Custom voice: ready with voice id %s", voice_id)
+                tracing.record("voice ready", "voice", ready_from, resource="gradium")
                 return str(voice_id)
         logging.info(
             "Custom voice: not ready yet, waiting %.1fs",
@@ -148,64 +234,14 @@ def build_duration_map(voice_manifest: Dict[str, Any], max_seconds: float) -> Di
 
 
 def mux_video_audio(video_path: str, audio_path: str, output_path: str) -> None:
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i",
-        video_path,
-        "-i",
-        audio_path,
-        "-c:v",
-        "copy",
-        "-c:a",
-        "aac",
-        "-shortest",
-        output_path,
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(
-            "ffmpeg mux failed: "
-            f"{result.stderr.strip()}"
-        )
+    get_engine().mux(video_path, audio_path, output_path)
 
 
 def concat_videos(clip_paths: List[str], output_path: str) -> None:
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as handle:
-        for path in clip_paths:
-            handle.write(f"file '{os.path.abspath(path)}'\n")
-        list_path = handle.name
-    try:
-        cmd = [
-            ffmpeg,
-            "-y",
-            "-f",
-            "concat",
-            "-safe",
-            "0",
-            "-i",
-            list_path,
-            "-c:v",
-            "libx264",
-            "-c:a",
-            "aac",
-            "-movflags",
-            "+faststart",
-            output_path,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(
-                "ffmpeg concat failed: "
-                f"{result.stderr.strip()}"
-            )
-    finally:
-        os.unlink(list_path)
+    get_engine().concat(clip_paths, output_path)
 
 
-def main() -> None:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Generate narration and stitched video from a ScenePlan."
     )
@@ -322,6 +358,151 @@ def main() -> None:
             f"Default: {DEFAULT_FAL_CONCURRENCY}."
         ),
     )
+    parser.add_argument(
+        "--deadline-seconds",
+        type=float,
+        help=(
+            "Latency budget for the whole run. Image models, clip durations and "
+            "FAL concurrency are chosen from past call latencies to finish in "
+            "time, and remaining scenes fall back to faster settings when the "
+            "run falls behind. Counted from when the API queued the run."
+        ),
+    )
+    parser.add_argument(
+        "--video-timeout",
+        type=float,
+        default=float(os.environ["PIPELINE_VIDEO_TIMEOUT"])
+        if os.getenv("PIPELINE_VIDEO_TIMEOUT")
+        else None,
+        help=(
+            "Seconds to wait for one scene's video generation before using the "
+            "Ken Burns fallback (default: env PIPELINE_VIDEO_TIMEOUT; with "
+            "--deadline-seconds the remaining budget also caps it)."
+        ),
+    )
+    parser.add_argument(
+        "--no-video-fallback",
+        action="store_true",
+        help=(
+            "Fail the run when a scene's video generation fails instead of "
+            "animating the scene image locally (Ken Burns pan/zoom)."
+        ),
+    )
+    parser.add_argument(
+        "--scene-retries",
+        type=int,
+        default=int(os.getenv("PIPELINE_SCENE_RETRIES", "2")),
+        help=(
+            "Extra attempts for a scene whose image or video call fails "
+            "(default: env PIPELINE_SCENE_RETRIES or 2). A scene that still "
+            "fails is left out and listed under failed_scenes in the final "
+            "manifest; the other scenes carry on."
+        ),
+    )
+    parser.add_argument(
+        "--stream-window",
+        type=int,
+        default=int(os.environ["PIPELINE_STREAM_WINDOW"])
+        if os.getenv("PIPELINE_STREAM_WINDOW")
+        else None,
+        help=(
+            "Streaming mode for long storyboards: run at most this many scenes "
+            "at once, mux each clip as it finishes and concatenate in segment "
+            "batches, so memory stays flat as the scene count grows "
+            "(default: env PIPELINE_STREAM_WINDOW, else twice --fal-concurrency "
+            "with --hls; 0 disables)."
+        ),
+    )
+    parser.add_argument(
+        "--hls",
+        action="store_true",
+        default=os.getenv("PIPELINE_HLS", "").lower() in ("1", "true", "on"),
+        help=(
+            "Publish each muxed scene to a live fMP4 HLS playlist "
+            "(<output-dir>/hls/index.m3u8) as soon as it is ready, so the run "
+            "can be watched while later scenes render. Implies streaming mode "
+            "unless --stream-window is given; with --stream-window 0 scenes are "
+            "published once all clips exist (default: env PIPELINE_HLS)."
+        ),
+    )
+    parser.add_argument(
+        "--concat-batch",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=(
+            "With --stream-window, clips joined per segment and segments "
+            f"joined per level (default: {DEFAULT_BATCH_SIZE})."
+        ),
+    )
+    parser.add_argument(
+        "--media-engine",
+        choices=list(ENGINE_CHOICES),
+        help=(
+            "Local assembly engine for retime/mux/concat "
+            "(default: env PIPELINE_MEDIA_ENGINE or auto, which prefers PyAV)."
+        ),
+    )
+    parser.add_argument(
+        "--retime-mode",
+        default=DEFAULT_RETIME_MODE,
+        choices=list(RETIME_MODES),
+        help=(
+            "How clips are stretched to the narration length: 'timestamps' "
+            "rewrites container timestamps without decoding, 'reencode' uses "
+            f"setpts and re-encodes. Default: {DEFAULT_RETIME_MODE}."
+        ),
+    )
+    parser.add_argument(
+        "--stub-providers",
+        action="store_true",
+        help=(
+            "Use the offline stub providers (no network or API keys); see "
+            "PIPELINE_PROVIDERS and PIPELINE_STUB_* for per-provider selection, "
+            "latency and error injection."
+        ),
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help=(
+            "Append every provider request, response and latency to this JSONL "
+            "file (default: env PIPELINE_RECORD)."
+        ),
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help=(
+            "Serve provider calls from a recording made with --record instead "
+            "of the live APIs (default: env PIPELINE_REPLAY)."
+        ),
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=None,
+        help=(
+            "Divide recorded latencies by this factor when replaying; 0 replays "
+            "without delays (default: env PIPELINE_REPLAY_SPEED or 1)."
+        ),
+    )
+    parser.add_argument(
+        "--run-index",
+        default=os.getenv("PIPELINE_RUN_INDEX"),
+        help=(
+            "SQLite run index to record status, stage timings and artifacts in "
+            "(default: env PIPELINE_RUN_INDEX; disabled when unset)."
+        ),
+    )
+    parser.add_argument(
+        "--priority",
+        default=DEFAULT_PRIORITY,
+        choices=list(PRIORITY_CLASSES),
+        help=(
+            "Scheduling class for the provider slots shared with other runs. "
+            f"Default: {DEFAULT_PRIORITY}."
+        ),
+    )
     parser.add_argument(
         "--style",
         default=DEFAULT_STYLE,
@@ -332,10 +513,209 @@ def main() -> None:
             + style_choices_help()
         ),
     )
-    args = parser.parse_args()
+    return parser
 
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+def run_pipeline(args: argparse.Namespace) -> None:
+    """Run the full pipeline for parsed CLI *args*.
+
+    Kept separate from :func:`main` so warm workers (see ``workers.py``) can
+    execute runs in-process without re-importing the provider SDKs.
+    """
+    run_id = os.path.basename(os.path.abspath(args.output_dir))
+    index = RunIndex(args.run_index) if args.run_index else None
+    recorder = RunRecorder(index, run_id)
+    deadline_at = None
+    if args.deadline_seconds:
+        # Runs queued by the API count their deadline from submission.
+        queued = index.get_run(run_id) if index is not None else None
+        started = time.time()
+        if queued is not None and queued["status"] == "queued":
+            started = queued["created_at"]
+        deadline_at = started + args.deadline_seconds
+    # The API marks a run cancelled before signalling it; a SIGTERM for any
+    # other run (a warm worker's previous job) is then ignored.
+    confirm = recorder.is_cancelled if os.getenv("PIPELINE_RUN_ID") else None
+    with cancellation.handle_sigterm(confirm):
+        if not recorder.start(
+            run_dir=os.path.abspath(args.output_dir),
+            style=args.style,
+            priority=args.priority,
+        ):
+            logging.warning("Run %s was cancelled before it started", run_id)
+            raise SystemExit(cancellation.EXIT_CODE)
+        tracing.start_run(run_id)
+        try:
+            _run_pipeline_steps(args, recorder, deadline_at)
+        except BaseException as exc:
+            if not cancellation.is_cancelled():
+                recorder.status("failed", error=str(exc) or type(exc).__name__)
+                raise
+            recorder.status("cancelled", error="cancelled")
+            logging.warning("Run %s cancelled; partial artifacts are kept", run_id)
+            raise SystemExit(cancellation.EXIT_CODE) from exc
+        finally:
+            if args.hls:
+                close_playlist(os.path.join(args.output_dir, HLS_DIR))
+            metrics.flush()
+            _write_trace(args.output_dir, recorder)
+    recorder.status("succeeded")
+    if deadline_at is not None:
+        remaining = deadline_at - time.time()
+        if remaining >= 0:
+            logging.info("Deadline: met with %.1fs to spare", remaining)
+        else:
+            logging.warning("Deadline: missed by %.1fs", -remaining)
+
+
+def _write_trace(output_dir: str, recorder: RunRecorder) -> None:
+    trace_path = os.path.join(output_dir, "trace.json")
+    try:
+        summary = tracing.finish_run(trace_path)
+    except OSError as exc:
+        logging.warning("Trace: could not write %s: %s", trace_path, exc)
+        return
+    tracing.log_summary(summary)
+    if summary is not None:
+        recorder.artifact("trace", trace_path)
+
+
+@contextlib.contextmanager
+def _stage(recorder: RunRecorder, name: str) -> Iterator[None]:
+    """A pipeline stage: recorded in the run index and as a trace span."""
+    with recorder.stage(name), tracing.span(name, "stage"):
+        yield
+
+
+def _scene_id_from_clip(path: str) -> int:
+    """Parse the scene id from ``scene_NNN.mp4`` / ``scene_NNN_av.mp4``."""
+    return int(os.path.basename(path).split("_")[1].split(".")[0])
+
+
+def _mux_scene(
+    clip_path: str, audio_by_scene: Dict[int, str], video_output_dir: str,
+) -> str:
+    scene_id = _scene_id_from_clip(clip_path)
+    audio_path = audio_by_scene.get(scene_id)
+    if not audio_path:
+        raise SystemExit(f"No audio found for scene {scene_id}")
+    muxed_path = os.path.join(video_output_dir, f"scene_{scene_id:03d}_av.mp4")
+    with tracing.scene(scene_id):
+        mux_video_audio(clip_path, audio_path, muxed_path)
+    return muxed_path
+
+
+def _fold_timings(totals: Dict[tuple, Dict[str, Any]]) -> None:
+    """Move recorded step timings into per-(step, engine) totals."""
+    for timing in drain_step_timings():
+        entry = totals.setdefault(
+            (timing.step, timing.engine),
+            {"step": timing.step, "engine": timing.engine, "seconds": 0.0, "count": 0},
+        )
+        entry["seconds"] += timing.seconds
+        entry["count"] += 1
+
+
+def _open_playlist(args: argparse.Namespace, recorder: RunRecorder) -> HlsPlaylist | None:
+    if not args.hls:
+        return None
+    playlist = HlsPlaylist(os.path.join(args.output_dir, HLS_DIR))
+    recorder.artifact("hls_playlist", playlist.path)
+    return playlist
+
+
+def _stream_video_and_assemble(
+    args: argparse.Namespace,
+    recorder: RunRecorder,
+    storyboard: Any,
+    video_kwargs: Dict[str, Any],
+    audio_by_scene: Dict[int, str],
+    video_output_dir: str,
+    final_video_path: str,
+    record_fallback,
+) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Steps 2-4 for long storyboards with bounded memory.
+
+    Scenes run through a window of ``--stream-window``; each finished clip
+    is muxed right away, published to the HLS playlist with ``--hls`` and
+    fed to a :class:`SegmentConcat`, so neither clip paths nor per-step
+    timings accumulate with the scene count.
+    Returns the storyboard result and per-step timing totals.
+    """
+    logging.info(
+        "Steps 2-4/4: streaming %d scenes (window %d, concat batch %d)",
+        len(storyboard.scenes),
+        args.stream_window,
+        args.concat_batch,
+    )
+    assembler = SegmentConcat(
+        os.path.join(video_output_dir, "segments"),
+        batch_size=args.concat_batch,
+        concat=concat_videos,
+        keep_inputs=args.keep_intermediates,
+    )
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    playlist = _open_playlist(args, recorder)
+
+    def on_scene(scene: Any, scene_result: Dict[str, Any] | None, clip_path: str | None) -> None:
+        if scene_result is not None:
+            record_fallback(scene_result)
+        if clip_path:
+            recorder.artifact("clip", clip_path, scene.scene_id)
+            muxed_path = _mux_scene(clip_path, audio_by_scene, video_output_dir)
+            if args.keep_intermediates:
+                recorder.artifact("clip_av", muxed_path, scene.scene_id)
+            if playlist is not None:
+                with tracing.scene(scene.scene_id):
+                    playlist.append(muxed_path, f"scene_{scene.scene_id:03d}")
+            assembler.add(muxed_path)
+        _fold_timings(totals)
+
+    with _stage(recorder, "video"):
+        video_result = process_storyboard(
+            storyboard,
+            stream_window=args.stream_window,
+            on_scene=on_scene,
+            **video_kwargs,
+        )
+    if assembler.count == 0:
+        raise SystemExit("No scene clips were generated.")
+    with _stage(recorder, "concat"):
+        assembler.finish(final_video_path)
+    recorder.artifact("final_video", final_video_path)
+    if playlist is not None:
+        playlist.close()
+    _fold_timings(totals)
+    return video_result, list(totals.values())
+
+
+def _deadline_planner(
+    args: argparse.Namespace,
+    recorder: RunRecorder,
+    deadline_at: float | None,
+    num_scenes: int,
+) -> DeadlinePlanner:
+    reserve = sum(recorder.stage_seconds(("mux", "concat")).values()) or (
+        DEFAULT_ASSEMBLY_RESERVE_SECONDS + DEFAULT_ASSEMBLY_RESERVE_PER_SCENE * num_scenes
+    )
+    return DeadlinePlanner(
+        deadline_at,
+        history=recorder.call_seconds(),
+        reserve_seconds=reserve,
+        max_concurrency=max(args.fal_concurrency, limits_from_env()["fal"]),
+    )
+
+
+def _run_pipeline_steps(
+    args: argparse.Namespace,
+    recorder: RunRecorder,
+    deadline_at: float | None = None,
+) -> None:
+    providers.configure(True if args.stub_providers else None)
+    recording.configure(args.record, args.replay, args.replay_speed)
     load_env()
+    set_default_engine(args.media_engine)
+    reset_step_timings()
 
     art_style = get_style(args.style)
     logging.info("Using art style: %s (%s)", art_style.key, art_style.name)
@@ -344,6 +724,7 @@ def main() -> None:
         raise SystemExit("Provide exactly one of --input-file or --scene-plan.")
 
     output_root = args.output_dir
+    configure_run(run_id=recorder.run_id, priority=args.priority)
     voice_output_dir = os.path.join(output_root, "voice_output")
     video_output_dir = os.path.join(output_root, "video_output")
     ensure_dir(output_root)
@@ -358,29 +739,32 @@ def main() -> None:
             source_text = handle.read().strip()
         if not source_text:
             raise SystemExit("Input file is empty.")
-        client = OpenAI()
-        extract_result = extract_scenes(
-            client=client,
-            model=args.llm_model,
-            source_text=source_text,
-            number_of_scenes=args.number_of_scenes,
-            verbose=False,
-        )
-        warnings = list(extract_result.get("warnings", []))
-        scenes = extract_result.get("scenes", [])
-        scenes = normalize_scene_ids(scenes, warnings)
-        logging.info("Step 0.5/4: Generate scene prompts for visuals")
-        for scene in scenes:
-            logging.info("Step 0.5/4: Scene %s prompt generation", scene["scene_id"])
-            prompt_result = generate_scene_prompt(
+        client = get_openai_client()
+        with _stage(recorder, "extract"), metrics.stage_timer("extract"):
+            extract_result = extract_scenes(
                 client=client,
                 model=args.llm_model,
-                scene=scene,
+                source_text=source_text,
+                number_of_scenes=args.number_of_scenes,
                 verbose=False,
-                all_scenes=scenes,
-                style=art_style,
             )
-            scene["scene_prompt"] = prompt_result["scene_prompt"]
+        warnings = list(extract_result.get("warnings", []))
+        scenes = extract_result.get("scenes", [])
+        scenes = normalize_scene_ids(scenes, warnings)
+        logging.info("Step 0.5/4: Generate scene prompts for visuals")
+        with _stage(recorder, "prompt"):
+            for scene in scenes:
+                logging.info("Step 0.5/4: Scene %s prompt generation", scene["scene_id"])
+                with tracing.scene(scene["scene_id"]), metrics.stage_timer("prompt"):
+                    prompt_result = generate_scene_prompt(
+                        client=client,
+                        model=args.llm_model,
+                        scene=scene,
+                        verbose=False,
+                        all_scenes=scenes,
+                        style=art_style,
+                    )
+                scene["scene_prompt"] = prompt_result["scene_prompt"]
         plan = {
             "project_id": None,
             "style_preset": art_style.key,
@@ -389,6 +773,7 @@ def main() -> None:
         }
         scene_plan_path = os.path.join(output_root, "scene_plan.json")
         write_json(scene_plan_path, plan)
+        recorder.artifact("scene_plan", scene_plan_path)
     else:
         with open(args.scene_plan, "r", encoding="utf-8") as handle:
             plan = json.load(handle)
@@ -416,14 +801,15 @@ def main() -> None:
     voice_id = args.voice_id
     if args.create_custom_voice:
         logging.info("Creating custom voice from %s", args.custom_voice_audio)
-        voice_id = asyncio.run(
-            create_custom_voice(
-                audio_path=args.custom_voice_audio,
-                name=args.custom_voice_name,
-                description=args.custom_voice_description,
-                start_s=args.custom_voice_start_s,
+        with _stage(recorder, "voice_clone"), metrics.stage_timer("voice_clone"):
+            voice_id = asyncio.run(
+                create_custom_voice(
+                    audio_path=args.custom_voice_audio,
+                    name=args.custom_voice_name,
+                    description=args.custom_voice_description,
+                    start_s=args.custom_voice_start_s,
+                )
             )
-        )
         logging.info("Custom voice created: %s", voice_id)
 
     voice_config = VoiceConfig(
@@ -442,22 +828,26 @@ def main() -> None:
             voice_manifest = json.load(handle)
         voice_manifest_path = args.voice_manifest_input
     else:
-        voice_manifest = asyncio.run(
-            run_tts(
-                plan=plan,
-                scenes=plan["scenes"],
-                voice_config=voice_config,
-                text_field=args.text_field,
-                output_dir=voice_output_dir,
-                dry_run=False,
-                max_seconds=args.max_seconds,
-                words_per_sec=args.words_per_sec,
-                retries=2,
-                backoff_sec=1.0,
+        with _stage(recorder, "tts"):
+            voice_manifest = asyncio.run(
+                run_tts(
+                    plan=plan,
+                    scenes=plan["scenes"],
+                    voice_config=voice_config,
+                    text_field=args.text_field,
+                    output_dir=voice_output_dir,
+                    dry_run=False,
+                    max_seconds=args.max_seconds,
+                    words_per_sec=args.words_per_sec,
+                    retries=2,
+                    backoff_sec=1.0,
+                )
             )
-        )
         voice_manifest_path = os.path.join(output_root, args.voice_manifest)
         write_json(voice_manifest_path, voice_manifest)
+        recorder.artifact("voice_manifest", voice_manifest_path)
+        for item in voice_manifest.get("items", []):
+            recorder.artifact("audio", item["audio_path"], int(item["scene_id"]))
 
     # Resolve reference images (upload local files or use URLs directly)
     face_swap_url = None
@@ -514,8 +904,13 @@ def main() -> None:
     else:
         storyboard = load_storyboard(scene_plan_path)
     per_scene_durations = build_duration_map(voice_manifest, args.max_seconds)
-    video_result = process_storyboard(
-        storyboard,
+    planner = _deadline_planner(args, recorder, deadline_at, len(storyboard.scenes))
+    audio_by_scene = {
+        int(item["scene_id"]): item["audio_path"]
+        for item in voice_manifest.get("items", [])
+    }
+    final_video_path = os.path.join(output_root, args.final_video)
+    video_kwargs: Dict[str, Any] = dict(
         per_scene_durations=per_scene_durations,
         output_dir=video_output_dir,
         return_clips=True,
@@ -523,43 +918,118 @@ def main() -> None:
         reference_element=reference_element,
         fal_concurrency=args.fal_concurrency,
         style_key=art_style.key,
+        retime_mode=args.retime_mode,
+        planner=planner,
+        video_timeout=args.video_timeout,
+        fallback=not args.no_video_fallback,
+        scene_retries=max(0, args.scene_retries),
     )
-    clip_paths = video_result.get("clip_paths", [])
+    fallback_scenes: List[Dict[str, Any]] = []
 
-    logging.info("Step 3/4: Mux audio with per-scene video")
-    audio_by_scene = {
-        int(item["scene_id"]): item["audio_path"]
-        for item in voice_manifest.get("items", [])
-    }
-    muxed_paths: List[str] = []
-    for clip_path in clip_paths:
-        base = os.path.basename(clip_path)
-        scene_id = int(base.split("_")[1].split(".")[0])
-        audio_path = audio_by_scene.get(scene_id)
-        if not audio_path:
-            raise SystemExit(f"No audio found for scene {scene_id}")
-        muxed_path = os.path.join(video_output_dir, f"scene_{scene_id:03d}_av.mp4")
-        mux_video_audio(clip_path, audio_path, muxed_path)
-        muxed_paths.append(muxed_path)
+    def _record_fallback(scene_result: Dict[str, Any]) -> None:
+        fallback = scene_result.get("fallback")
+        if fallback:
+            scene_id = scene_result["scene"].scene_id
+            recorder.artifact("scene_image", fallback["image_path"], scene_id)
+            fallback_scenes.append({"scene_id": scene_id, **fallback})
 
-    logging.info("Step 4/4: Concatenate into final video")
-    final_video_path = os.path.join(output_root, args.final_video)
-    muxed_paths.sort()
-    concat_videos(muxed_paths, final_video_path)
+    if args.stream_window is None:
+        # Playback starts sooner when scenes are published as they finish.
+        args.stream_window = max(2, args.fal_concurrency * 2) if args.hls else 0
+    if args.stream_window > 0:
+        video_result, timings = _stream_video_and_assemble(
+            args,
+            recorder,
+            storyboard,
+            video_kwargs,
+            audio_by_scene,
+            video_output_dir,
+            final_video_path,
+            _record_fallback,
+        )
+    else:
+        with _stage(recorder, "video"):
+            video_result = process_storyboard(storyboard, **video_kwargs)
+        for scene_result in video_result.get("scenes", []):
+            _record_fallback(scene_result)
+    recorder.calls(planner.calls)
+    failed_scenes = video_result.get("failed_scenes", [])
+    if failed_scenes:
+        logging.warning(
+            "Video: %d scene(s) failed and are left out: %s",
+            len(failed_scenes),
+            ", ".join(f"{item['scene_id']} ({item['stage']})" for item in failed_scenes),
+        )
+    if fallback_scenes:
+        logging.warning(
+            "Video: %d scene(s) use Ken Burns fallbacks: %s",
+            len(fallback_scenes),
+            ", ".join(str(item["scene_id"]) for item in fallback_scenes),
+        )
 
-    if not args.keep_intermediates:
-        for path in muxed_paths:
-            if os.path.exists(path):
-                os.unlink(path)
+    if args.stream_window <= 0:
+        clip_paths = video_result.get("clip_paths", [])
+        if not clip_paths:
+            raise SystemExit("No scene clips were generated.")
+        for clip_path in clip_paths:
+            recorder.artifact("clip", clip_path, _scene_id_from_clip(clip_path))
+
+        logging.info("Step 3/4: Mux audio with per-scene video")
+        playlist = _open_playlist(args, recorder)
+        muxed_paths: List[str] = []
+        with _stage(recorder, "mux"):
+            for clip_path in sorted(clip_paths, key=_scene_id_from_clip):
+                muxed_path = _mux_scene(clip_path, audio_by_scene, video_output_dir)
+                if playlist is not None:
+                    scene_id = _scene_id_from_clip(clip_path)
+                    with tracing.scene(scene_id):
+                        playlist.append(muxed_path, f"scene_{scene_id:03d}")
+                muxed_paths.append(muxed_path)
+
+        logging.info("Step 4/4: Concatenate into final video")
+        with _stage(recorder, "concat"):
+            concat_videos(muxed_paths, final_video_path)
+        recorder.artifact("final_video", final_video_path)
+        if playlist is not None:
+            playlist.close()
+
+        if args.keep_intermediates:
+            for path in muxed_paths:
+                recorder.artifact("clip_av", path, _scene_id_from_clip(path))
+        else:
+            for path in muxed_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        timings = [asdict(timing) for timing in step_timings()]
+
+    for step in ("retime", "mux", "concat"):
+        step_total = sum(t["seconds"] for t in timings if t["step"] == step)
+        logging.info("Assembly timing: %s %.2fs total", step, step_total)
 
     final_manifest = {
         "scene_plan": args.scene_plan,
         "voice_manifest": voice_manifest_path,
         "final_video": final_video_path,
+        "assembly_timings": timings,
+        "fallback_scenes": fallback_scenes,
+        "failed_scenes": failed_scenes,
     }
-    write_json(os.path.join(output_root, "final_manifest.json"), final_manifest)
+    if "scene_results_path" in video_result:
+        final_manifest["scene_results"] = video_result["scene_results_path"]
+    if deadline_at is not None:
+        final_manifest["deadline"] = planner.summary()
+    final_manifest_path = os.path.join(output_root, "final_manifest.json")
+    write_json(final_manifest_path, final_manifest)
+    recorder.artifact("final_manifest", final_manifest_path)
     logging.info("Final video saved: %s", final_video_path)
 
 
+def main() -> None:
+    args = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    run_pipeline(args)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,342 @@
+"""Retention and garbage collection for ``pipeline_output/``.
+
+Every run directory holds four kinds of files:
+
+  - ``intermediate``: per-scene WAVs, clips and muxed clips under
+    ``voice_output/`` and ``video_output/``, and HLS segments under ``hls/``;
+  - ``upload``: the photo, voice sample and input text sent to ``/generate``;
+  - ``final``: ``final_video.mp4``;
+  - ``metadata``: small JSON manifests and ``pipeline.log``, kept for as long
+    as the run directory exists.
+
+A collection pass first applies per-kind TTLs, then, while the tree is over
+its byte budget, deletes intermediates (oldest first), then uploads, then
+evicts whole runs least-recently-accessed first, where access is the last
+time ``/video/{run_id}`` served the final video (from the run index).
+
+Queued/running runs and directories touched within ``min_age_seconds`` are
+never collected, but the budget is measured against everything under the
+output root: those runs, upload sessions in ``_uploads/`` and the run index
+included.  Only collectable runs are deleted to meet it.
+
+Run it periodically from the API (``PIPELINE_RETENTION_INTERVAL``) or by hand::
+
+    python -m video_pipeline_service.retention --budget 20G --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from video_pipeline_service.run_index import RunIndex
+
+KINDS = ("intermediate", "upload", "final", "metadata")
+
+OUTPUT_ROOT = Path(
+    os.getenv(
+        "PIPELINE_OUTPUT_ROOT",
+        str(Path(__file__).resolve().parents[1] / "pipeline_output"),
+    )
+)
+
+DEFAULT_BUDGET = "20G"
+DEFAULT_TTLS = {
+    "intermediate": 24 * 3600.0,
+    "upload": 7 * 24 * 3600.0,
+    "final": 30 * 24 * 3600.0,
+}
+DEFAULT_MIN_AGE_SECONDS = 600.0
+DEFAULT_INTERVAL_SECONDS = 600.0
+
+_UPLOAD_STEMS = ("photo", "voice", "input")
+# Resumable upload sessions; see video_pipeline_service.uploads.
+UPLOADS_DIR = "_uploads"
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Parse ``"500M"`` / ``"20G"`` / ``"1048576"`` into bytes."""
+    raw = text.strip().upper().removesuffix("B").removesuffix("I")
+    unit = raw[-1] if raw and raw[-1] in _UNITS else ""
+    number = raw[: len(raw) - len(unit)]
+    try:
+        return int(float(number) * _UNITS[unit])
+    except ValueError as exc:
+        raise ValueError(f"Invalid size {text!r}") from exc
+
+
+def classify(run_dir: Path, path: Path) -> str:
+    """Return the retention kind of *path* inside *run_dir*."""
+    relative = path.relative_to(run_dir)
+    if len(relative.parts) > 1:
+        return "intermediate"
+    if path.name == "final_video.mp4":
+        return "final"
+    if path.stem in _UPLOAD_STEMS:
+        return "upload"
+    if path.suffix in (".json", ".log"):
+        return "metadata"
+    return "intermediate"
+
+
+@dataclass
+class _File:
+    path: Path
+    kind: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class _Run:
+    run_id: str
+    run_dir: Path
+    files: list[_File]
+    last_access: float
+    newest_mtime: float
+
+    @property
+    def size(self) -> int:
+        return sum(item.size for item in self.files)
+
+
+@dataclass
+class RetentionPolicy:
+    budget_bytes: int | None = parse_size(DEFAULT_BUDGET)
+    ttls: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTLS))
+    min_age_seconds: float = DEFAULT_MIN_AGE_SECONDS
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Build a policy from ``PIPELINE_STORAGE_BUDGET`` / ``PIPELINE_TTL_*``.
+
+        A budget of ``0`` or ``off`` disables the byte budget; TTLs are in
+        hours and ``0`` disables that TTL.
+        """
+        budget = os.getenv("PIPELINE_STORAGE_BUDGET", DEFAULT_BUDGET)
+        ttls = dict(DEFAULT_TTLS)
+        for kind in ttls:
+            raw = os.getenv(f"PIPELINE_TTL_{kind.upper()}_HOURS")
+            if raw:
+                ttls[kind] = float(raw) * 3600.0
+        return cls(
+            budget_bytes=None if budget.lower() in ("0", "off") else parse_size(budget),
+            ttls={kind: ttl for kind, ttl in ttls.items() if ttl > 0},
+        )
+
+
+@dataclass
+class RetentionReport:
+    total_bytes: int = 0
+    freed_bytes: int = 0
+    files_deleted: int = 0
+    runs_evicted: list[str] = field(default_factory=list)
+    dry_run: bool = False
+
+    @property
+    def remaining_bytes(self) -> int:
+        return self.total_bytes - self.freed_bytes
+
+
+class RetentionManager:
+    """Applies a :class:`RetentionPolicy` to the run directories under *output_root*."""
+
+    def __init__(
+        self,
+        output_root: str | Path,
+        policy: RetentionPolicy | None = None,
+        index: RunIndex | None = None,
+    ) -> None:
+        self.output_root = Path(output_root)
+        self.policy = policy or RetentionPolicy.from_env()
+        self.index = index
+
+    # -- scanning -------------------------------------------------------------
+
+    def _disk_usage(self) -> int:
+        """Bytes of every file under the output root, whatever owns it."""
+        total = 0
+        for dirpath, _dirnames, filenames in os.walk(self.output_root):
+            for name in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, name)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def _scan(self) -> list[_Run]:
+        if not self.output_root.is_dir():
+            return []
+        active: set[str] = set()
+        accessed: dict[str, float] = {}
+        if self.index is not None:
+            active = {run["run_id"] for run in self.index.active_runs()}
+            accessed = self.index.access_times()
+        runs = []
+        now = time.time()
+        for run_dir in sorted(self.output_root.iterdir()):
+            if not run_dir.is_dir() or run_dir.name in active:
+                continue
+            if run_dir.name == UPLOADS_DIR:
+                continue  # upload sessions expire on their own (see uploads.py)
+            files = []
+            for path in run_dir.rglob("*"):
+                try:
+                    stat = path.lstat()
+                except OSError:
+                    continue
+                if path.is_file():
+                    files.append(
+                        _File(path, classify(run_dir, path), stat.st_size, stat.st_mtime)
+                    )
+            newest = max((item.mtime for item in files), default=run_dir.stat().st_mtime)
+            if now - newest < self.policy.min_age_seconds:
+                continue
+            final_mtime = next(
+                (item.mtime for item in files if item.kind == "final"), newest,
+            )
+            runs.append(
+                _Run(
+                    run_dir.name,
+                    run_dir,
+                    files,
+                    max(accessed.get(run_dir.name) or 0.0, final_mtime),
+                    newest,
+                )
+            )
+        return runs
+
+    # -- deletion -------------------------------------------------------------
+
+    def _delete_files(self, run: _Run, files: list[_File], report: RetentionReport) -> None:
+        deleted = []
+        for item in files:
+            if not report.dry_run:
+                try:
+                    item.path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:
+                    logging.warning("Retention: could not delete %s: %s", item.path, exc)
+                    continue
+            deleted.append(item)
+            report.freed_bytes += item.size
+            report.files_deleted += 1
+        run.files = [item for item in run.files if item not in deleted]
+        if deleted and self.index is not None and not report.dry_run:
+            self.index.drop_artifacts(run.run_id, [str(item.path) for item in deleted])
+
+    def _evict_run(self, run: _Run, report: RetentionReport) -> None:
+        report.freed_bytes += run.size
+        report.files_deleted += len(run.files)
+        report.runs_evicted.append(run.run_id)
+        run.files = []
+        if report.dry_run:
+            return
+        shutil.rmtree(run.run_dir, ignore_errors=True)
+        if self.index is not None:
+            self.index.mark_evicted(run.run_id)
+
+    # -- policy ---------------------------------------------------------------
+
+    def collect(self, *, dry_run: bool = False) -> RetentionReport:
+        """Run one TTL + budget pass and return what was (or would be) freed."""
+        report = RetentionReport(dry_run=dry_run)
+        runs = self._scan()
+        report.total_bytes = self._disk_usage()
+        now = time.time()
+
+        # 1. TTLs: whole runs whose final video went unwatched, then files.
+        final_ttl = self.policy.ttls.get("final")
+        for run in list(runs):
+            if final_ttl is not None and now - run.last_access > final_ttl:
+                self._evict_run(run, report)
+                runs.remove(run)
+        for kind in ("intermediate", "upload"):
+            ttl = self.policy.ttls.get(kind)
+            if ttl is None:
+                continue
+            for run in runs:
+                expired = [
+                    item for item in run.files
+                    if item.kind == kind and now - item.mtime > ttl
+                ]
+                self._delete_files(run, expired, report)
+
+        # 2. Byte budget: cheapest-to-lose first.
+        budget = self.policy.budget_bytes
+        if budget is not None:
+            for kind in ("intermediate", "upload"):
+                candidates = sorted(
+                    (
+                        (item, run)
+                        for run in runs
+                        for item in run.files
+                        if item.kind == kind
+                    ),
+                    key=lambda pair: pair[0].mtime,
+                )
+                for item, run in candidates:
+                    if report.remaining_bytes <= budget:
+                        break
+                    self._delete_files(run, [item], report)
+            for run in sorted(runs, key=lambda run: run.last_access):
+                if report.remaining_bytes <= budget:
+                    break
+                self._evict_run(run, report)
+
+        if report.files_deleted:
+            logging.info(
+                "Retention: %s %d files (%.1f MiB), evicted %d runs, %.1f MiB remain",
+                "would delete" if dry_run else "deleted",
+                report.files_deleted,
+                report.freed_bytes / (1 << 20),
+                len(report.runs_evicted),
+                report.remaining_bytes / (1 << 20),
+            )
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply TTLs and a byte budget to pipeline_output/."
+    )
+    parser.add_argument("--output-root", default=str(OUTPUT_ROOT))
+    parser.add_argument(
+        "--run-index",
+        default=os.getenv("PIPELINE_RUN_INDEX", str(OUTPUT_ROOT / "runs.sqlite3")),
+    )
+    parser.add_argument(
+        "--budget",
+        default=None,
+        help="Byte budget such as 20G or 500M, 'off' to disable "
+        "(default: env PIPELINE_STORAGE_BUDGET or 20G).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be deleted without deleting anything.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    policy = RetentionPolicy.from_env()
+    if args.budget is not None:
+        policy.budget_bytes = None if args.budget.lower() in ("0", "off") else parse_size(args.budget)
+    index = RunIndex(args.run_index) if os.path.exists(args.run_index) else None
+    report = RetentionManager(args.output_root, policy, index).collect(dry_run=args.dry_run)
+    print(
+        f"{'Would free' if report.dry_run else 'Freed'} {report.freed_bytes} bytes "
+        f"({report.files_deleted} files, {len(report.runs_evicted)} runs); "
+        f"{report.remaining_bytes} of {report.total_bytes} bytes remain."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,691 @@
+"""Embedded SQLite index of pipeline runs, stages and artifacts.
+
+Both the API and the pipeline CLI write to the same database (WAL mode,
+short transactions), so listing runs, checking status or locating a
+scene's clip is an indexed lookup instead of a walk over
+``pipeline_output/``.
+
+Listing uses keyset pagination on ``(created_at, run_id)``: the cursor
+returned with each page points at the last row, so every page is an
+O(log n) index seek regardless of how deep the caller paginates.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sqlite3
+import time
+from typing import Any, Iterator
+
+from pipeline_runtime import cancellation
+
+RUN_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+ACTIVE_STATUSES = ("queued", "running")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    finished_at REAL,
+    run_dir     TEXT,
+    style       TEXT,
+    priority    TEXT,
+    error       TEXT,
+    last_accessed_at REAL,
+    evicted_at  REAL,
+    idempotency_key TEXT,
+    content_hash TEXT,
+    pid         INTEGER,
+    pid_started INTEGER,
+    owner_pid   INTEGER,
+    owner_started INTEGER,
+    client      TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_created ON runs (created_at DESC, run_id DESC);
+CREATE INDEX IF NOT EXISTS runs_by_status ON runs (status, created_at DESC);
+CREATE INDEX IF NOT EXISTS runs_by_style ON runs (style, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS stages (
+    run_id      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    seconds     REAL,
+    PRIMARY KEY (run_id, stage)
+);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    scene_id    INTEGER NOT NULL DEFAULT 0,
+    path        TEXT NOT NULL,
+    bytes       INTEGER,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, kind, scene_id)
+);
+
+CREATE TABLE IF NOT EXISTS calls (
+    run_id      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    seconds     REAL NOT NULL,
+    finished_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS calls_by_model ON calls (kind, model, finished_at);
+"""
+
+_DEDUP_INDEXES = """
+DROP INDEX IF EXISTS runs_by_idempotency_key;
+CREATE INDEX IF NOT EXISTS runs_by_client_key ON runs (idempotency_key, client)
+    WHERE idempotency_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_by_content_hash ON runs (content_hash, created_at DESC)
+    WHERE content_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_by_client ON runs (client, status)
+    WHERE client IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_by_finished ON runs (finished_at)
+    WHERE finished_at IS NOT NULL;
+"""
+
+# Columns added after the first schema version; created on open if missing.
+_RUN_COLUMNS_ADDED = {
+    "last_accessed_at": "REAL",
+    "evicted_at": "REAL",
+    "idempotency_key": "TEXT",
+    "content_hash": "TEXT",
+    "pid": "INTEGER",
+    "pid_started": "INTEGER",
+    "owner_pid": "INTEGER",
+    "owner_started": "INTEGER",
+    "client": "TEXT",
+}
+_ARTIFACT_COLUMNS_ADDED = {"sha256": "TEXT"}
+
+
+class CapacityExceeded(RuntimeError):
+    """A new run would exceed an admission limit.
+
+    *scope* is ``"queue"`` (all active runs) or ``"client"``; *oldest* is
+    the creation time of the oldest active run in that scope.
+    """
+
+    def __init__(self, scope: str, limit: int, active: int, oldest: float) -> None:
+        super().__init__(f"{scope} limit of {limit} active runs reached")
+        self.scope = scope
+        self.limit = limit
+        self.active = active
+        self.oldest = oldest
+
+
+def _ewma(values: list[float], alpha: float) -> float:
+    """Exponentially weighted mean of *values*, oldest first."""
+    average = values[0]
+    for value in values[1:]:
+        average = alpha * value + (1 - alpha) * average
+    return average
+
+
+def _process_alive(pid: int, started: int | None) -> bool:
+    same = cancellation.same_process(pid, started)
+    if same is not None:
+        return same
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _encode_cursor(row: sqlite3.Row) -> str:
+    return f"{row['created_at']!r}:{row['run_id']}"
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    created_at, _, run_id = cursor.partition(":")
+    try:
+        return float(created_at), run_id
+    except ValueError as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+
+def _quantile(values: list[float], quantile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+class RunIndex:
+    """Thin data-access layer over the runs database at *path*."""
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            for table, added in (
+                ("runs", _RUN_COLUMNS_ADDED),
+                ("artifacts", _ARTIFACT_COLUMNS_ADDED),
+            ):
+                existing = {
+                    row["name"] for row in conn.execute(f"PRAGMA table_info({table})")
+                }
+                for name, kind in added.items():
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+            # After the migration: older databases lack these columns.
+            conn.executescript(_DEDUP_INDEXES)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -- runs -----------------------------------------------------------------
+
+    def upsert_run(self, run_id: str, status: str, **fields: Any) -> None:
+        """Create *run_id* or update its status and any given columns."""
+        if status not in RUN_STATUSES:
+            raise ValueError(f"Unknown run status {status!r}")
+        now = time.time()
+        columns = {"status": status, "updated_at": now, **fields}
+        if status not in ACTIVE_STATUSES:
+            columns.setdefault("finished_at", now)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (run_id, status, now, now),
+            )
+            assignments = ", ".join(f"{name} = ?" for name in columns)
+            conn.execute(
+                f"UPDATE runs SET {assignments} WHERE run_id = ?",
+                (*columns.values(), run_id),
+            )
+
+    def start_run(self, run_id: str, pid: int, **fields: Any) -> bool:
+        """Mark *run_id* running in process *pid*; False if it was cancelled.
+
+        Together with :meth:`cancel_run` this guarantees a cancelled run
+        either never starts or has a pid to signal.  The process start time
+        is stored with the pid (``pid_started``) so the pid is not mistaken
+        for a later process that reuses it.
+        """
+        now = time.time()
+        columns = {
+            "status": "running",
+            "updated_at": now,
+            "pid": pid,
+            "pid_started": cancellation.process_start_time(pid),
+            **fields,
+        }
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, status, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?)",
+                (run_id, now, now),
+            )
+            cursor = conn.execute(
+                f"UPDATE runs SET {assignments} WHERE run_id = ? AND status != 'cancelled'",
+                (*columns.values(), run_id),
+            )
+        return cursor.rowcount > 0
+
+    def cancel_run(self, run_id: str) -> dict[str, Any] | None:
+        """Mark an active run cancelled; return it (with its pid) or None.
+
+        Returns None when the run does not exist or already finished.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE runs SET status = 'cancelled', error = 'cancelled', "
+                "updated_at = ?, finished_at = ? WHERE run_id = ? AND status IN (?, ?)",
+                (now, now, run_id, *ACTIVE_STATUSES),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row)
+
+    def get_run(self, run_id: str) -> dict[str, Any] | None:
+        """Return the run with its stages and artifacts, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM runs WHERE run_id = ?", (run_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            stages = conn.execute(
+                "SELECT stage, status, started_at, finished_at, seconds FROM stages "
+                "WHERE run_id = ? ORDER BY started_at",
+                (run_id,),
+            ).fetchall()
+            artifacts = conn.execute(
+                "SELECT kind, scene_id, path, bytes, sha256, created_at FROM artifacts "
+                "WHERE run_id = ? ORDER BY kind, scene_id",
+                (run_id,),
+            ).fetchall()
+        run = dict(row)
+        run["stages"] = [dict(stage) for stage in stages]
+        run["artifacts"] = [dict(artifact) for artifact in artifacts]
+        return run
+
+    def claim_run(
+        self,
+        run_id: str,
+        *,
+        idempotency_key: str | None,
+        content_hash: str,
+        dedupe_seconds: float,
+        client: str | None = None,
+        max_active: int = 0,
+        max_per_client: int = 0,
+        **fields: Any,
+    ) -> tuple[dict[str, Any], bool]:
+        """Create queued run *run_id* unless the submission duplicates one.
+
+        A run of the same *client* with the same *idempotency_key* (keys
+        are per client, so common keys like "1" do not collide), or one
+        created in the last
+        *dedupe_seconds* with the same *content_hash*, is a duplicate unless
+        it failed, was cancelled or has been evicted.  Returns the existing
+        run and False, or the new run and True.  The check and the insert
+        share one write transaction, so concurrent duplicates cannot both
+        create a run.  Raises ValueError when *idempotency_key* was already
+        used for different content.
+
+        A new run is only admitted while fewer than *max_active* runs, and
+        fewer than *max_per_client* runs of *client*, are queued or running
+        (0 means unlimited); otherwise :class:`CapacityExceeded` is raised.
+        Duplicates are answered regardless, since they add no work.
+
+        The calling process is recorded as the run's owner until the
+        pipeline starts, so :meth:`reconcile_orphans` can tell a queued run
+        whose API process died from one still waiting for a worker.
+        """
+        reusable = "status IN (?, ?, 'succeeded') AND evicted_at IS NULL"
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = None
+            if idempotency_key is not None:
+                row = conn.execute(
+                    f"SELECT * FROM runs WHERE idempotency_key = ? AND client IS ? "
+                    f"AND {reusable} ORDER BY created_at DESC LIMIT 1",
+                    (idempotency_key, client, *ACTIVE_STATUSES),
+                ).fetchone()
+                if row is not None and row["content_hash"] != content_hash:
+                    raise ValueError(
+                        "Idempotency-Key was already used for a different submission"
+                    )
+            if row is None and dedupe_seconds > 0:
+                row = conn.execute(
+                    f"SELECT * FROM runs WHERE content_hash = ? AND created_at >= ? "
+                    f"AND {reusable} ORDER BY created_at DESC LIMIT 1",
+                    (content_hash, now - dedupe_seconds, *ACTIVE_STATUSES),
+                ).fetchone()
+            if row is not None:
+                return dict(row), False
+            limits = [("queue", max_active, "", ())]
+            if client is not None:
+                limits.append(("client", max_per_client, " AND client = ?", (client,)))
+            for scope, limit, where, params in limits:
+                if limit <= 0:
+                    continue
+                active, oldest = conn.execute(
+                    "SELECT COUNT(*), MIN(created_at) FROM runs "
+                    f"WHERE status IN (?, ?){where}",
+                    (*ACTIVE_STATUSES, *params),
+                ).fetchone()
+                if active >= limit:
+                    raise CapacityExceeded(scope, limit, active, oldest)
+            columns = {
+                "run_id": run_id,
+                "status": "queued",
+                "created_at": now,
+                "updated_at": now,
+                "idempotency_key": idempotency_key,
+                "content_hash": content_hash,
+                "client": client,
+                "owner_pid": os.getpid(),
+                "owner_started": cancellation.process_start_time(os.getpid()),
+                **fields,
+            }
+            conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                tuple(columns.values()),
+            )
+        return columns, True
+
+    def list_runs(
+        self,
+        *,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        status: str | None = None,
+        style: str | None = None,
+        created_after: float | None = None,
+        created_before: float | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Return one page of runs (newest first) and the next-page cursor.
+
+        *status* and *style* match exactly; *created_after* (inclusive) and
+        *created_before* (exclusive) bound ``created_at``.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column, value in (("status", status), ("style", style)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        if cursor:
+            created_at, run_id = _decode_cursor(cursor)
+            clauses.append("(created_at, run_id) < (?, ?)")
+            params.extend([created_at, run_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM runs {where} "
+                "ORDER BY created_at DESC, run_id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return [dict(row) for row in rows[:limit]], next_cursor
+
+    def reconcile_orphans(self, *, timeout_seconds: float = 0) -> list[str]:
+        """Fail queued/running runs that can no longer finish; return their ids.
+
+        A run is orphaned when the process responsible for it is gone: the
+        pipeline process once started, else the API process that claimed
+        it (e.g. after an API restart).  With *timeout_seconds* > 0, runs
+        created longer ago than that fail too, whatever their process, so a
+        hung run cannot hold an admission slot forever.
+        """
+        now = time.time()
+        orphaned = []
+        for run in self.active_runs():
+            if run["pid"]:
+                pid, started, role = run["pid"], run["pid_started"], "pipeline"
+            else:
+                pid, started, role = run["owner_pid"], run["owner_started"], "API"
+            error = None
+            if timeout_seconds > 0 and now - run["created_at"] > timeout_seconds:
+                error = f"timed out after {timeout_seconds:.0f}s"
+            elif pid and not _process_alive(pid, started):
+                error = f"orphaned: {role} process {pid} exited"
+            if error is None:
+                continue
+            with self._connect() as conn:
+                # Only if the run has not moved on since it was read.
+                cursor = conn.execute(
+                    "UPDATE runs SET status = 'failed', error = ?, updated_at = ?, "
+                    "finished_at = ? WHERE run_id = ? AND status = ? AND updated_at = ?",
+                    (error, now, now, run["run_id"], run["status"], run["updated_at"]),
+                )
+            if cursor.rowcount:
+                orphaned.append(run["run_id"])
+        return orphaned
+
+    def active_runs(self) -> list[dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM runs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finished_since(self, since: float) -> int:
+        """Number of runs that finished (in any state) after *since*."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM runs WHERE finished_at >= ?", (since,),
+            ).fetchone()
+        return row[0]
+
+    def run_seconds_ewma(self, *, alpha: float, window: int = 50) -> float | None:
+        """EWMA of submit-to-finish time over the last *window* successful runs."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT finished_at - created_at FROM runs WHERE status = 'succeeded' "
+                "AND finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?",
+                (window,),
+            ).fetchall()
+        if not rows:
+            return None
+        return _ewma([row[0] for row in reversed(rows)], alpha)
+
+    def touch_run(self, run_id: str) -> None:
+        """Record that the run's final video was just served."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET last_accessed_at = ? WHERE run_id = ?",
+                (time.time(), run_id),
+            )
+
+    def access_times(self) -> dict[str, float]:
+        """Map run_id to the last time its final video was served."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT run_id, last_accessed_at FROM runs "
+                "WHERE last_accessed_at IS NOT NULL"
+            ).fetchall()
+        return {row["run_id"]: row["last_accessed_at"] for row in rows}
+
+    def mark_evicted(self, run_id: str) -> None:
+        """Flag a run whose directory was removed by retention."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET evicted_at = ?, updated_at = ? WHERE run_id = ?",
+                (now, now, run_id),
+            )
+            conn.execute("DELETE FROM artifacts WHERE run_id = ?", (run_id,))
+
+    # -- stages ---------------------------------------------------------------
+
+    def start_stage(self, run_id: str, stage: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stages (run_id, stage, status, started_at) "
+                "VALUES (?, ?, 'running', ?)",
+                (run_id, stage, time.time()),
+            )
+
+    def finish_stage(self, run_id: str, stage: str, status: str = "succeeded") -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE stages SET status = ?, finished_at = ?, seconds = ? - started_at "
+                "WHERE run_id = ? AND stage = ?",
+                (status, now, now, run_id, stage),
+            )
+
+    def stage_seconds(
+        self, stages: tuple[str, ...], *, quantile: float = 0.9, window: int = 50,
+    ) -> dict[str, float]:
+        """Per-stage duration quantile over the last *window* successful runs."""
+        result: dict[str, float] = {}
+        with self._connect() as conn:
+            for stage in stages:
+                rows = conn.execute(
+                    "SELECT seconds FROM stages WHERE stage = ? AND status = 'succeeded' "
+                    "AND seconds IS NOT NULL ORDER BY finished_at DESC LIMIT ?",
+                    (stage, window),
+                ).fetchall()
+                if rows:
+                    result[stage] = _quantile([row["seconds"] for row in rows], quantile)
+        return result
+
+    def stage_ewmas(self, *, alpha: float, window: int = 50) -> dict[str, float]:
+        """Per-stage EWMA of the last *window* successful durations."""
+        result: dict[str, float] = {}
+        with self._connect() as conn:
+            stages = conn.execute("SELECT DISTINCT stage FROM stages").fetchall()
+            for (stage,) in stages:
+                rows = conn.execute(
+                    "SELECT seconds FROM stages WHERE stage = ? AND status = 'succeeded' "
+                    "AND seconds IS NOT NULL ORDER BY finished_at DESC LIMIT ?",
+                    (stage, window),
+                ).fetchall()
+                if rows:
+                    result[stage] = _ewma([row[0] for row in reversed(rows)], alpha)
+        return result
+
+    # -- provider calls -------------------------------------------------------
+
+    def add_calls(self, run_id: str, calls: list[tuple[str, str, float]]) -> None:
+        """Record ``(kind, model, seconds)`` latencies of one run's provider calls."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO calls (run_id, kind, model, seconds, finished_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, kind, model, seconds, now) for kind, model, seconds in calls],
+            )
+
+    def call_seconds(
+        self, *, quantile: float = 0.9, window: int = 200,
+    ) -> dict[str, float]:
+        """Map ``kind:model`` to its latency quantile over the last *window* calls."""
+        result: dict[str, float] = {}
+        with self._connect() as conn:
+            keys = conn.execute("SELECT DISTINCT kind, model FROM calls").fetchall()
+            for key in keys:
+                rows = conn.execute(
+                    "SELECT seconds FROM calls WHERE kind = ? AND model = ? "
+                    "ORDER BY finished_at DESC LIMIT ?",
+                    (key["kind"], key["model"], window),
+                ).fetchall()
+                result[f"{key['kind']}:{key['model']}"] = _quantile(
+                    [row["seconds"] for row in rows], quantile,
+                )
+        return result
+
+    # -- artifacts ------------------------------------------------------------
+
+    def add_artifact(
+        self, run_id: str, kind: str, path: str, scene_id: int = 0,
+    ) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(run_id, kind, scene_id, path, bytes, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, kind, scene_id, os.path.abspath(path), size, time.time()),
+            )
+
+    def drop_artifacts(self, run_id: str, paths: list[str]) -> None:
+        """Forget artifacts whose files were deleted."""
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM artifacts WHERE run_id = ? AND path = ?",
+                [(run_id, os.path.abspath(path)) for path in paths],
+            )
+
+    def find_artifact(self, run_id: str, kind: str, scene_id: int = 0) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path FROM artifacts WHERE run_id = ? AND kind = ? AND scene_id = ?",
+                (run_id, kind, scene_id),
+            ).fetchone()
+        return row["path"] if row else None
+
+    def get_artifact(
+        self, run_id: str, kind: str, scene_id: int = 0,
+    ) -> dict[str, Any] | None:
+        """Return path, bytes and cached sha256 of one artifact, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path, bytes, sha256 FROM artifacts "
+                "WHERE run_id = ? AND kind = ? AND scene_id = ?",
+                (run_id, kind, scene_id),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_artifact_digest(self, run_id: str, path: str, size: int, sha256: str) -> None:
+        """Cache the content hash of a finished artifact for ETags."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE artifacts SET bytes = ?, sha256 = ? WHERE run_id = ? AND path = ?",
+                (size, sha256, run_id, os.path.abspath(path)),
+            )
+
+
+class RunRecorder:
+    """Per-run helper used by the pipeline; a no-op when no index is configured."""
+
+    def __init__(self, index: RunIndex | None, run_id: str) -> None:
+        self.index = index
+        self.run_id = run_id
+
+    def status(self, status: str, **fields: Any) -> None:
+        if self.index is not None:
+            self.index.upsert_run(self.run_id, status, **fields)
+
+    def start(self, **fields: Any) -> bool:
+        """Mark the run running in this process; False if it was cancelled."""
+        if self.index is None:
+            return True
+        return self.index.start_run(self.run_id, os.getpid(), **fields)
+
+    def is_cancelled(self) -> bool:
+        if self.index is None:
+            return False
+        run = self.index.get_run(self.run_id)
+        return run is not None and run["status"] == "cancelled"
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.index is None:
+            yield
+            return
+        self.index.start_stage(self.run_id, name)
+        try:
+            yield
+        except BaseException:
+            status = "cancelled" if cancellation.is_cancelled() else "failed"
+            self.index.finish_stage(self.run_id, name, status)
+            raise
+        self.index.finish_stage(self.run_id, name)
+
+    def artifact(self, kind: str, path: str, scene_id: int = 0) -> None:
+        if self.index is not None:
+            self.index.add_artifact(self.run_id, kind, path, scene_id)
+
+    def stage_seconds(self, stages: tuple[str, ...]) -> dict[str, float]:
+        return self.index.stage_seconds(stages) if self.index is not None else {}
+
+    def call_seconds(self) -> dict[str, float]:
+        return self.index.call_seconds() if self.index is not None else {}
+
+    def calls(self, calls: list[tuple[str, str, float]]) -> None:
+        if self.index is not None and calls:
+            self.index.add_calls(self.run_id, calls)
@@ -0,0 +1,140 @@
+"""HTTP serving of run artifacts: strong ETags, conditional GET and caching.
+
+Every artifact response carries a strong ETag derived from the file's
+SHA-256, answers ``If-None-Match`` with 304 and supports ``Range`` /
+``If-Range`` (through Starlette's :class:`FileResponse`).  Artifacts of
+finished runs never change, so they are marked ``immutable`` for a year
+and a CDN or reverse proxy can serve repeat views without reaching us;
+artifacts of active runs must be revalidated.
+
+Digests are cached in-process per ``(path, size, mtime)`` and, for
+finished runs, in the run index, so a file is hashed at most once.
+
+``PIPELINE_SENDFILE`` hands the body to a fronting proxy instead:
+
+  - ``x-accel-redirect``: nginx ``X-Accel-Redirect`` to
+    ``PIPELINE_SENDFILE_PREFIX`` (default ``/_artifacts/``) plus the path
+    relative to the output root, served from an ``internal`` location;
+  - ``x-sendfile``: Apache/lighttpd ``X-Sendfile`` with the absolute path.
+
+Without it the ASGI server's zero-copy ``pathsend`` extension is used when
+available.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from video_pipeline_service.run_index import ACTIVE_STATUSES, RunIndex
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ACTIVE_CACHE_CONTROL = "no-cache"
+SENDFILE_MODES = ("x-accel-redirect", "x-sendfile")
+DEFAULT_SENDFILE_PREFIX = "/_artifacts/"
+_CHUNK = 1 << 20
+
+_digests: dict[tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of *path*, cached while its size and mtime are unchanged."""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        cached = _digests.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_CHUNK), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    with _digests_lock:
+        _digests[key] = value
+    return value
+
+
+def _etag(sha256: str) -> str:
+    return f'"{sha256[:32]}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 specifies for ``If-None-Match``."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _sendfile_headers(path: Path, output_root: Path) -> dict[str, str] | None:
+    mode = os.getenv("PIPELINE_SENDFILE", "").strip().lower()
+    if not mode:
+        return None
+    if mode not in SENDFILE_MODES:
+        raise RuntimeError(
+            f"Unknown PIPELINE_SENDFILE {mode!r}; use one of {', '.join(SENDFILE_MODES)}"
+        )
+    if mode == "x-sendfile":
+        return {"X-Sendfile": str(path.resolve())}
+    prefix = os.getenv("PIPELINE_SENDFILE_PREFIX", DEFAULT_SENDFILE_PREFIX)
+    relative = path.resolve().relative_to(output_root.resolve()).as_posix()
+    return {"X-Accel-Redirect": prefix.rstrip("/") + "/" + relative}
+
+
+def artifact_response(
+    request: Request,
+    index: RunIndex,
+    run_id: str,
+    path: Path,
+    *,
+    media_type: str,
+    output_root: Path,
+    filename: str | None = None,
+) -> Response:
+    """Serve *path* of *run_id* with ETag, conditional GET and cache headers."""
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Artifact not found.")
+    run = index.get_run(run_id)
+    finished = run is not None and run["status"] not in ACTIVE_STATUSES
+
+    sha256 = None
+    size = path.stat().st_size
+    if finished:
+        for artifact in run["artifacts"]:
+            if artifact["path"] == os.path.abspath(path) and artifact["sha256"]:
+                if artifact["bytes"] == size:
+                    sha256 = artifact["sha256"]
+                break
+    if sha256 is None:
+        sha256 = file_sha256(path)
+        if finished:
+            index.set_artifact_digest(run_id, str(path), size, sha256)
+
+    etag = _etag(sha256)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if finished else ACTIVE_CACHE_CONTROL,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    redirect = _sendfile_headers(path, output_root)
+    if redirect is not None:
+        headers.update(redirect)
+        if filename:
+            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return Response(media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
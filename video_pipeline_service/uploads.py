@@ -0,0 +1,290 @@
+"""Chunked, resumable uploads of ``/generate`` inputs (tus-style).
+
+A multipart ``/generate`` request is only handled once the whole body has
+been received and spooled, so a voice recording that fails halfway over a
+mobile link restarts from zero.  Instead a client can:
+
+1. ``POST /uploads`` with ``Upload-Length`` and ``Upload-Metadata``
+   (``kind`` and ``filename``, base64 as in tus); the declared length is
+   checked against the per-kind limit before any byte is sent;
+2. ``PATCH /uploads/{id}`` chunks at ``Upload-Offset``, streamed to disk as
+   they arrive (no spooling; memory per request is one chunk);
+3. after an interruption, ``HEAD /uploads/{id}`` for the offset to resume
+   from;
+4. pass the id to ``/generate`` as ``photo_upload_id`` / ``voice_upload_id``
+   / ``text_upload_id``.
+
+Data is hashed while it is written, so ``/generate`` deduplicates without
+reading the file again, and a completed upload is moved (not copied) into
+the run directory.  Sessions live under ``<output root>/_uploads`` and are
+dropped once unused for :data:`DEFAULT_SESSION_TTL_SECONDS`.
+
+Several API processes may serve the same session: writers take an
+exclusive ``fcntl`` lock on the ``.part`` file, and a cached hash is only
+extended when it covers exactly the bytes on disk, else the file is
+re-hashed.
+"""
+
+from __future__ import annotations
+
+import codecs
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Iterator
+
+from video_pipeline_service.retention import UPLOADS_DIR, parse_size
+
+TUS_VERSION = "1.0.0"
+
+DEFAULT_LIMITS = {"photo": "20M", "voice": "100M", "text": "2M"}
+DEFAULT_SESSION_TTL_SECONDS = 24 * 3600.0
+_CHUNK = 1 << 20
+
+
+class UploadNotFound(LookupError):
+    pass
+
+
+class UploadOffsetMismatch(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UploadLocked(RuntimeError):
+    """Another request is writing to (or claiming) the upload right now."""
+
+
+def upload_limits() -> dict[str, int]:
+    """Byte limit per kind, from ``PIPELINE_UPLOAD_MAX_<KIND>`` (e.g. ``100M``)."""
+    return {
+        kind: parse_size(os.getenv(f"PIPELINE_UPLOAD_MAX_{kind.upper()}", default))
+        for kind, default in DEFAULT_LIMITS.items()
+    }
+
+
+def validate_utf8(path: Path) -> None:
+    """Raise UnicodeDecodeError unless *path* is UTF-8, reading it in chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_CHUNK), b""):
+            decoder.decode(chunk)
+    decoder.decode(b"", final=True)
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    kind: str
+    length: int
+    filename: str
+    created_at: float
+    offset: int = 0
+    sha256: str | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.length
+
+
+class UploadStore:
+    """Upload sessions in *root*: ``<id>.part`` data and ``<id>.json`` metadata."""
+
+    def __init__(self, root: str | Path, limits: dict[str, int] | None = None) -> None:
+        self.root = Path(root)
+        self.limits = limits or upload_limits()
+        # upload_id -> (hasher, bytes it has consumed)
+        self._hashers: dict[str, tuple[Any, int]] = {}
+
+    def _part(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _save(self, session: UploadSession) -> None:
+        meta = asdict(session)
+        del meta["offset"]  # the size of the .part file is authoritative
+        tmp = self._meta(session.upload_id).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self._meta(session.upload_id))
+
+    def create(self, kind: str, length: int, filename: str = "") -> UploadSession:
+        if kind not in self.limits:
+            raise ValueError(f"Unknown upload kind {kind!r}; use one of {', '.join(self.limits)}")
+        if length < 0:
+            raise ValueError("Upload-Length must not be negative")
+        if length > self.limits[kind]:
+            raise UploadTooLarge(f"{kind} uploads are limited to {self.limits[kind]} bytes")
+        self.root.mkdir(parents=True, exist_ok=True)
+        session = UploadSession(
+            upload_id=uuid.uuid4().hex,
+            kind=kind,
+            length=length,
+            filename=os.path.basename(filename),
+            created_at=time.time(),
+        )
+        self._part(session.upload_id).touch()
+        if length == 0:
+            session.sha256 = hashlib.sha256().hexdigest()
+        self._save(session)
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        if not upload_id.isalnum():
+            raise UploadNotFound(upload_id)
+        try:
+            meta = json.loads(self._meta(upload_id).read_text(encoding="utf-8"))
+            offset = self._part(upload_id).stat().st_size
+        except FileNotFoundError as exc:
+            raise UploadNotFound(upload_id) from exc
+        session = UploadSession(offset=offset, **meta)
+        if session.complete and session.sha256 is None:
+            # The last chunk landed but its process died before saving the hash.
+            session.sha256 = self._hasher(session).hexdigest()
+            self._save(session)
+        return session
+
+    @contextlib.contextmanager
+    def _locked(self, upload_id: str, append: bool = False) -> Iterator[BinaryIO]:
+        """Open the ``.part`` file under an exclusive lock, or raise UploadLocked."""
+        if not upload_id.isalnum():
+            raise UploadNotFound(upload_id)
+        part = self._part(upload_id)
+        flags = os.O_WRONLY | os.O_APPEND if append else os.O_RDONLY
+        try:
+            # No O_CREAT: a deleted or claimed session must not be recreated.
+            handle = os.fdopen(os.open(part, flags), "ab" if append else "rb")
+        except FileNotFoundError as exc:
+            raise UploadNotFound(upload_id) from exc
+        with handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as exc:
+                raise UploadLocked(f"Upload {upload_id} is busy") from exc
+            try:
+                # Claimed (renamed away) or deleted between open and lock.
+                try:
+                    current = part.stat().st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != os.fstat(handle.fileno()).st_ino:
+                    raise UploadNotFound(upload_id)
+                yield handle
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _hasher(self, session: UploadSession) -> Any:
+        cached = self._hashers.get(session.upload_id)
+        if cached is not None and cached[1] == session.offset:
+            return cached[0]
+        # Resumed after a restart, or other processes appended since: the
+        # cached state no longer matches the file, so hash what is on disk.
+        hasher = hashlib.sha256()
+        remaining = session.offset
+        with self._part(session.upload_id).open("rb") as handle:
+            while remaining > 0:
+                chunk = handle.read(min(_CHUNK, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    async def append(
+        self, upload_id: str, offset: int, chunks: AsyncIterator[bytes],
+    ) -> UploadSession:
+        """Write *chunks* at *offset*, which must equal the current offset.
+
+        Bytes are on disk as soon as they are received, so a dropped
+        connection loses nothing already written.  Data past the declared
+        length raises :class:`UploadTooLarge` after the allowed part is kept.
+        A concurrent write to the same upload, from any process, raises
+        :class:`UploadLocked`.
+        """
+        with self._locked(upload_id, append=True) as handle:
+            # Read under the lock: another process may have appended.
+            session = self.get(upload_id)
+            if offset != session.offset:
+                raise UploadOffsetMismatch(
+                    f"Upload-Offset {offset} does not match current offset {session.offset}"
+                )
+            hasher = self._hasher(session)
+            try:
+                async for chunk in chunks:
+                    room = session.length - session.offset
+                    too_large = len(chunk) > room
+                    if too_large:
+                        chunk = chunk[:room]
+                    handle.write(chunk)
+                    handle.flush()
+                    hasher.update(chunk)
+                    session.offset += len(chunk)
+                    if too_large:
+                        raise UploadTooLarge(
+                            f"Upload exceeds its declared length of {session.length} bytes"
+                        )
+            finally:
+                self._hashers[upload_id] = (hasher, session.offset)
+                if session.complete and session.sha256 is None:
+                    session.sha256 = hasher.hexdigest()
+                    self._save(session)
+                    self._hashers.pop(upload_id, None)
+            return session
+
+    def claim(
+        self, upload_id: str, kind: str, run_dir: Path, stem: str, suffix: str | None = None,
+    ) -> Path:
+        """Move a completed *kind* upload into *run_dir* as ``<stem><suffix>``.
+
+        *suffix* defaults to the uploaded file name's.
+        """
+        with self._locked(upload_id):
+            session = self.get(upload_id)
+            if session.kind != kind:
+                raise ValueError(f"Upload {upload_id} is a {session.kind} upload, not {kind}")
+            if not session.complete:
+                raise UploadOffsetMismatch(f"Upload {upload_id} is incomplete")
+            if suffix is None:
+                suffix = Path(session.filename).suffix
+            path = run_dir / f"{stem}{suffix}"
+            os.replace(self._part(upload_id), path)
+        self.delete(upload_id)
+        return path
+
+    def delete(self, upload_id: str) -> None:
+        for path in (self._part(upload_id), self._meta(upload_id)):
+            path.unlink(missing_ok=True)
+        self._hashers.pop(upload_id, None)
+
+    def expire(self, max_age_seconds: float = DEFAULT_SESSION_TTL_SECONDS) -> int:
+        """Drop sessions not written to for *max_age_seconds*; return how many."""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - max_age_seconds
+        expired = 0
+        for meta in self.root.glob("*.json"):
+            upload_id = meta.stem
+            part = self._part(upload_id)
+            try:
+                mtime = max(meta.stat().st_mtime, part.stat().st_mtime if part.exists() else 0)
+            except FileNotFoundError:
+                continue
+            if mtime >= cutoff:
+                continue
+            try:
+                with self._locked(upload_id):
+                    self.delete(upload_id)
+            except (UploadLocked, UploadNotFound):
+                continue  # being written right now, or already gone
+            expired += 1
+        return expired
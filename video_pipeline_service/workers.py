@@ -0,0 +1,311 @@
+"""Warm, pre-forked pipeline workers.
+
+Launching ``cli.py`` per run costs seconds of interpreter start-up and SDK
+imports (openai, gradium, fal_client, ...).  A :class:`PipelineWorkerPool`
+instead keeps a few long-lived processes that were forked from a
+``forkserver`` with those modules already imported, and runs
+:func:`video_pipeline_service.cli.run_pipeline` for each queued job.
+
+Crash isolation is kept by recycling: a worker exits after
+``max_jobs_per_worker`` runs or right after any failed run, and a worker
+that dies with a job fails only that job.  The supervisor thread replaces
+exited workers so the pool size stays constant.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import traceback
+from dataclasses import dataclass, field
+from typing import Any
+
+# Modules imported once in the forkserver and inherited by every worker.
+# The CLI imports the provider SDKs lazily, so they are listed explicitly.
+PRELOAD_MODULES = [
+    "video_pipeline_service.cli",
+    "openai",
+    "gradium",
+    "fal_client",
+    "imageio_ffmpeg",
+    "requests",
+]
+
+DEFAULT_MAX_JOBS_PER_WORKER = 20
+
+# Return code reported when a worker process dies while running a job.
+WORKER_CRASHED = -1
+
+
+@dataclass
+class _Job:
+    job_id: int
+    argv: list[str]
+    log_path: str
+    env: dict[str, str]
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future)
+
+
+@contextlib.contextmanager
+def _redirect_to_log(log_path: str):
+    """Send stdout/stderr and root logging to *log_path* for one job."""
+    root = logging.getLogger()
+    saved_handlers = list(root.handlers)
+    saved_level = root.level
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = (os.dup(1), os.dup(2))
+    with open(log_path, "a", encoding="utf-8", buffering=1) as handle:
+        os.dup2(handle.fileno(), 1)
+        os.dup2(handle.fileno(), 2)
+        handler = logging.StreamHandler(handle)
+        handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+        try:
+            yield handle
+        finally:
+            handler.flush()
+            root.handlers = saved_handlers
+            root.setLevel(saved_level)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+
+
+@contextlib.contextmanager
+def _job_environ(overrides: dict[str, str]):
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _run_job(argv: list[str], log_path: str, env: dict[str, str]) -> int:
+    from video_pipeline_service import cli
+
+    with _job_environ(env), _redirect_to_log(log_path) as handle:
+        try:
+            args = cli.build_parser().parse_args(argv)
+            cli.run_pipeline(args)
+        except SystemExit as exc:
+            if exc.code in (None, 0):
+                return 0
+            if not isinstance(exc.code, int):
+                handle.write(f"{exc.code}\n")
+                return 1
+            return exc.code
+        except BaseException:
+            handle.write(traceback.format_exc())
+            return 1
+    return 0
+
+
+def _worker_main(jobs: Any, results: Any, max_jobs: int) -> None:
+    """Worker process loop: take jobs from this worker's own queue until recycled."""
+    from video_pipeline_service import cli
+
+    cli.load_dotenv_once()
+    for _ in range(max_jobs):
+        item = jobs.get()
+        if item is None:
+            return
+        job_id, argv, log_path, env = item
+        returncode = _run_job(argv, log_path, env)
+        results.put((job_id, returncode))
+        if returncode != 0:
+            # Recycle after a failure so leaked state cannot affect later runs.
+            return
+
+
+@dataclass
+class _Worker:
+    process: Any
+    jobs: Any
+    jobs_left: int
+    job_id: int | None = None  # job handed to this worker, until its result arrives
+
+    @property
+    def retiring(self) -> bool:
+        """Out of jobs; the process exits on its own and is then replaced."""
+        return self.jobs_left <= 0
+
+
+class PipelineWorkerPool:
+    """Fixed-size pool of warm pipeline worker processes.
+
+    The supervisor hands each job to one idle worker through that worker's
+    own queue, so it always knows which process holds which job: if the
+    process dies, that job fails whether or not it had started.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        *,
+        max_jobs_per_worker: int = DEFAULT_MAX_JOBS_PER_WORKER,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Worker pool size must be >= 1.")
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(PRELOAD_MODULES)
+        self._results = self._ctx.Queue()
+        self._workers: list[_Worker] = []
+        self._pending: dict[int, _Job] = {}
+        self._backlog: collections.deque[_Job] = collections.deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._supervisor: threading.Thread | None = None
+
+    # -- lifecycle ------------------------------------------------------------
+
+    def start(self) -> None:
+        with self._lock:
+            for _ in range(self.size):
+                self._spawn()
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="pipeline-worker-supervisor", daemon=True,
+        )
+        self._supervisor.start()
+        logging.info(
+            "Worker pool: %d warm workers (recycle after %d jobs)",
+            self.size,
+            self.max_jobs_per_worker,
+        )
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._closed.set()
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            worker.jobs.put(None)
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+        with self._lock:
+            unfinished = list(self._pending)
+            self._backlog.clear()
+        for job_id in unfinished:
+            self._finish(job_id, WORKER_CRASHED)
+
+    def _spawn(self) -> None:
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(jobs, self._results, self.max_jobs_per_worker),
+            daemon=True,
+        )
+        process.start()
+        self._workers.append(_Worker(process, jobs, self.max_jobs_per_worker))
+
+    # -- jobs -----------------------------------------------------------------
+
+    def submit(
+        self,
+        argv: list[str],
+        log_path: str,
+        env: dict[str, str] | None = None,
+    ) -> concurrent.futures.Future:
+        """Queue a pipeline run; the future resolves to its return code."""
+        if self._closed.is_set():
+            raise RuntimeError("Worker pool is shut down.")
+        job = _Job(next(self._ids), list(argv), str(log_path), dict(env or {}))
+        with self._lock:
+            self._pending[job.job_id] = job
+            self._backlog.append(job)
+            self._dispatch()
+        return job.future
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._backlog)
+
+    def pids(self) -> set[int]:
+        """Process ids of the live workers."""
+        with self._lock:
+            return {w.process.pid for w in self._workers if w.process.is_alive()}
+
+    def _dispatch(self) -> None:
+        """Hand backlog jobs to idle workers (caller holds the lock)."""
+        for worker in self._workers:
+            if not self._backlog:
+                return
+            if worker.job_id is not None or worker.retiring or not worker.process.is_alive():
+                continue
+            job = self._backlog.popleft()
+            worker.job_id = job.job_id
+            worker.jobs_left -= 1
+            worker.jobs.put((job.job_id, job.argv, job.log_path, job.env))
+
+    def _finish(self, job_id: int, returncode: int) -> None:
+        with self._lock:
+            job = self._pending.pop(job_id, None)
+        if job is not None and not job.future.done():
+            job.future.set_result(returncode)
+
+    def _on_result(self, job_id: int, returncode: int) -> None:
+        with self._lock:
+            for worker in self._workers:
+                if worker.job_id == job_id:
+                    worker.job_id = None
+                    if returncode != 0:
+                        worker.jobs_left = 0  # it exits to be recycled
+        self._finish(job_id, returncode)
+
+    def _supervise(self) -> None:
+        while not self._closed.is_set():
+            # Note exits before draining: a result a worker sent before dying
+            # is already in the pipe, so it is handled before its job is failed.
+            with self._lock:
+                exited = [w for w in self._workers if not w.process.is_alive()]
+            try:
+                self._on_result(*self._results.get(timeout=0.5))
+                while True:
+                    self._on_result(*self._results.get_nowait())
+            except queue.Empty:
+                pass
+            self._reap(exited)
+            with self._lock:
+                self._dispatch()
+
+    def _reap(self, exited: list[_Worker]) -> None:
+        for worker in exited:
+            worker.process.join()
+            with self._lock:
+                self._workers.remove(worker)
+                job_id, worker.job_id = worker.job_id, None
+            if job_id is not None:
+                logging.warning(
+                    "Worker pool: worker %s died (exit %s) during job %s",
+                    worker.process.pid,
+                    worker.process.exitcode,
+                    job_id,
+                )
+                self._finish(job_id, WORKER_CRASHED)
+            worker.jobs.close()
+            if not self._closed.is_set():
+                with self._lock:
+                    self._spawn()
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import argparse
 import asyncio
 import json
@@ -7,10 +9,16 @@ import sys
 import time
 import wave
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, List
 
 from dotenv import load_dotenv
-import gradium
+
+from pipeline_runtime import metrics, providers, recording, tracing
+from pipeline_runtime.slots import async_slot
+
+if TYPE_CHECKING:
+    import gradium
 
 
 @dataclass
@@ -22,7 +30,7 @@ class VoiceConfig:
 
 def load_env() -> None:
     load_dotenv()
-    if not os.getenv("GRADIUM_API_KEY"):
+    if providers.missing_api_keys(("gradium",)):
         raise SystemExit(
             "GRADIUM_API_KEY is not set. Add it to .env or your environment."
         )
@@ -91,6 +99,7 @@ async def create_custom_voice(
 ) -> str:
     if not os.path.isfile(audio_path):
         raise SystemExit(f"Custom voice audio file not found: {audio_path}")
+    gradium = providers.gradium_sdk()
     result = await gradium.voices.create(
         client,
         audio_file=audio_path,
@@ -110,6 +119,31 @@ async def create_custom_voice(
     return str(voice_id)
 
 
+def wav_duration(path: str) -> float | None:
+    """Return the duration of a WAV file in seconds, or None if it isn't one."""
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except wave.Error:
+        return None
+
+
+def _encode_tts_result(result: Any) -> Dict[str, Any]:
+    return {
+        "raw_data": recording.encode_bytes(result.raw_data),
+        "request_id": getattr(result, "request_id", None),
+        "sample_rate": getattr(result, "sample_rate", None),
+    }
+
+
+def _decode_tts_result(payload: Dict[str, Any]) -> Any:
+    return SimpleNamespace(
+        raw_data=recording.decode_bytes(payload["raw_data"]),
+        request_id=payload.get("request_id"),
+        sample_rate=payload.get("sample_rate"),
+    )
+
+
 async def tts_with_retry(
     client: gradium.client.GradiumClient,
     text: str,
@@ -120,18 +154,34 @@ async def tts_with_retry(
     attempt = 0
     while True:
         try:
-            return await client.tts(
-                setup={
-                    "model_name": voice_config.model_name,
-                    "voice_id": voice_config.voice_id,
-                    "output_format": voice_config.output_format,
-                },
-                text=text,
-            )
+            async with async_slot("gradium"):
+                with metrics.stage_timer("tts"), metrics.provider_call("gradium"), tracing.span(
+                    "tts", "tts", resource="gradium", attempt=attempt + 1,
+                ):
+                    setup = {
+                        "model_name": voice_config.model_name,
+                        "voice_id": voice_config.voice_id,
+                        "output_format": voice_config.output_format,
+                    }
+                    # The voice id is left out of the recorded request: a
+                    # replayed run recreates the voice under a new id.
+                    return await recording.acall(
+                        "gradium",
+                        "tts",
+                        {
+                            "model_name": voice_config.model_name,
+                            "output_format": voice_config.output_format,
+                            "text": text,
+                        },
+                        lambda: client.tts(setup=setup, text=text),
+                        encode=_encode_tts_result,
+                        decode=_decode_tts_result,
+                    )
         except Exception as exc:
             attempt += 1
             if attempt > retries:
                 raise
+            metrics.inc("pipeline_provider_retries_total", provider="gradium")
             sleep_for = backoff_sec * (2 ** (attempt - 1))
             logging.warning(
                 "TTS failed (attempt %s/%s): %s. Retrying in %.1fs",
@@ -155,7 +205,8 @@ async def run_tts(
     retries: int,
     backoff_sec: float,
 ) -> Dict[str, Any]:
-    client = gradium.client.GradiumClient()
+    gradium = providers.gradium_sdk()
+    client = providers.gradium_client()
     items: List[Dict[str, Any]] = []
 
     for scene in scenes:
@@ -185,22 +236,18 @@ async def run_tts(
             )
             continue
 
-        result = await tts_with_retry(
-            client=client,
-            text=text,
-            voice_config=voice_config,
-            retries=retries,
-            backoff_sec=backoff_sec,
-        )
+        with tracing.scene(int(scene_id)):
+            result = await tts_with_retry(
+                client=client,
+                text=text,
+                voice_config=voice_config,
+                retries=retries,
+                backoff_sec=backoff_sec,
+            )
         with open(output_path, "wb") as handle:
             handle.write(result.raw_data)
 
-        duration_sec = None
-        try:
-            with wave.open(output_path, "rb") as wav:
-                duration_sec = wav.getnframes() / float(wav.getframerate())
-        except wave.Error:
-            duration_sec = None
+        duration_sec = wav_duration(output_path)
 
         items.append(
             {
@@ -334,7 +381,7 @@ def main() -> None:
     voice_id = args.voice_id
     if args.create_custom_voice:
         logging.info("Creating custom voice from %s", args.custom_voice_audio)
-        client = gradium.client.GradiumClient()
+        client = providers.gradium_client()
         voice_id = asyncio.run(
             create_custom_voice(
                 client=client,